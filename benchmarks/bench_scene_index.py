@@ -0,0 +1,103 @@
+"""
+Compare SceneObjectIndex lookups against the linear scan the executors used before.
+
+    python benchmarks/bench_scene_index.py --objects 5000 --queries 200
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from og_vlm_planning.scene_index import SceneObjectIndex  # noqa: E402
+
+
+CATEGORIES = ["apple", "bowl", "cabinet", "countertop", "fridge", "plate", "mug", "chair", "table", "book",
+              "bottle", "carton", "drawer", "shelf", "sink", "towel", "lamp", "sofa", "pillow", "rug"]
+
+
+class _Obj:
+    reads = 0
+
+    def __init__(self, name, pos):
+        self.name = name
+        self._pos = pos
+
+    def get_position(self):
+        _Obj.reads += 1
+        return self._pos
+
+
+class _Scene:
+    def __init__(self, n, seed=0):
+        rng = np.random.default_rng(seed)
+        self.objects = [
+            _Obj(f"{CATEGORIES[i % len(CATEGORIES)]}_{i}", rng.uniform(-10, 10, size=3)) for i in range(n)
+        ]
+
+
+def linear_first(scene, name):
+    candidates = [o for o in scene.objects if hasattr(o, "name") and name.lower() in o.name.lower()]
+    return candidates[0] if candidates else None
+
+
+def linear_nearest(scene, name, base_pos):
+    objs = [o for o in scene.objects if hasattr(o, "name") and name.lower() in o.name.lower()]
+    if not objs:
+        return None
+    objs.sort(key=lambda o: np.linalg.norm(o.get_position() - base_pos))
+    return objs[0]
+
+
+def _time(fn, queries):
+    t0 = time.perf_counter()
+    out = [fn(q) for q in queries]
+    return time.perf_counter() - t0, out
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--objects", type=int, nargs="+", default=[500, 2000, 5000])
+    ap.add_argument("--queries", type=int, default=200)
+    args = ap.parse_args()
+
+    rng = random.Random(0)
+    base = np.zeros(3)
+    for n in args.objects:
+        scene = _Scene(n)
+        queries = [rng.choice(CATEGORIES) if rng.random() < 0.7 else f"{rng.choice(CATEGORIES)}_{rng.randrange(n)}"
+                   for _ in range(args.queries)]
+
+        t_build = time.perf_counter()
+        index = SceneObjectIndex(scene)
+        t_build = time.perf_counter() - t_build
+
+        t_lin_first, a = _time(lambda q: linear_first(scene, q), queries)
+        t_idx_first, b = _time(index.first, queries)
+        assert a == b
+        t_lin_near, a = _time(lambda q: linear_nearest(scene, q, base), queries)
+        t_idx_near, b = _time(lambda q: index.nearest(q, base), queries)
+        assert a == b
+
+        # As in an episode: every primitive moves objects and invalidates positions before the next query
+        def after_move(q):
+            index.invalidate_positions()
+            return index.nearest(q, base)
+
+        _Obj.reads = 0
+        t_idx_moved, b = _time(after_move, queries)
+        assert a == b
+        reads = _Obj.reads
+
+        print(f"objects={n:6d} build={t_build * 1e3:7.2f}ms | "
+              f"first: linear={t_lin_first * 1e3:8.2f}ms index={t_idx_first * 1e3:7.2f}ms | "
+              f"nearest: linear={t_lin_near * 1e3:8.2f}ms index={t_idx_near * 1e3:7.2f}ms "
+              f"invalidated={t_idx_moved * 1e3:7.2f}ms ({reads / len(queries):.0f} reads/query)")
+
+
+if __name__ == "__main__":
+    main()
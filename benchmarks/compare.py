@@ -0,0 +1,89 @@
+"""
+Compare two run_bench JSON results and flag regressions.
+
+    python -m benchmarks.compare baseline.json current.json --threshold 0.15
+
+Metrics ending in `_ms`, `_s` or `_mb` are lower-is-better, `_per_s` is higher-is-better; other
+values are reported but never flagged. By default only the stable statistics (p50/min latency,
+throughput, memory) are checked; pass `--include` to widen that. Exits with status 1 if any checked
+metric regressed by more than `--threshold` (relative) and more than `--min-abs` (absolute, to ignore
+noise on tiny timings).
+"""
+import argparse
+import json
+import re
+import sys
+from typing import Any, Dict, Optional
+
+
+def flatten(d: Dict[str, Any], prefix: str = "") -> Dict[str, float]:
+    out = {}
+    for k, v in d.items():
+        key = f"{prefix}.{k}" if prefix else k
+        if isinstance(v, dict):
+            out.update(flatten(v, key))
+        elif isinstance(v, (int, float)) and not isinstance(v, bool):
+            out[key] = float(v)
+    return out
+
+
+def direction(metric: str) -> Optional[int]:
+    """+1 if higher is better, -1 if lower is better, None if not compared."""
+    leaf = metric.rsplit(".", 1)[-1]
+    if leaf.endswith("_per_s"):
+        return 1
+    if leaf.endswith(("_ms", "_s", "_mb")):
+        return -1
+    return None
+
+
+DEFAULT_INCLUDE = r"(p50_ms|min_ms|_per_s|_mb)$"
+
+
+def compare(base: Dict[str, Any], cur: Dict[str, Any], threshold: float, min_abs: float,
+            include: str = DEFAULT_INCLUDE):
+    pattern = re.compile(include)
+    b = flatten({k: v for k, v in base.items() if k not in ("meta", "config")})
+    c = flatten({k: v for k, v in cur.items() if k not in ("meta", "config")})
+    rows = []
+    for key in sorted(set(b) & set(c)):
+        sign = direction(key)
+        old, new = b[key], c[key]
+        change = (new - old) / old if old else 0.0
+        regressed = False
+        if sign is not None and pattern.search(key) and abs(new - old) > min_abs:
+            regressed = -sign * change > threshold
+        rows.append((key, old, new, change, regressed))
+    return rows
+
+
+def main():
+    p = argparse.ArgumentParser(description="Flag benchmark regressions against a baseline")
+    p.add_argument("baseline")
+    p.add_argument("current")
+    p.add_argument("--threshold", type=float, default=0.15, help="Relative change counted as a regression")
+    p.add_argument("--min-abs", type=float, default=0.05, help="Ignore absolute differences below this")
+    p.add_argument("--include", type=str, default=DEFAULT_INCLUDE, help="Regex of metrics checked for regressions")
+    p.add_argument("--all", action="store_true", help="Print every metric, not only regressions")
+    args = p.parse_args()
+
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        base = json.load(f)
+    with open(args.current, "r", encoding="utf-8") as f:
+        cur = json.load(f)
+    if base.get("config") != cur.get("config"):
+        print("[warn] benchmark configs differ; comparison may not be meaningful")
+
+    rows = compare(base, cur, args.threshold, args.min_abs, args.include)
+    regressions = [r for r in rows if r[4]]
+    print(f"{'metric':<56}{'baseline':>12}{'current':>12}{'change':>10}")
+    for key, old, new, change, regressed in rows:
+        if args.all or regressed:
+            flag = "  REGRESSION" if regressed else ""
+            print(f"{key:<56}{old:>12.4g}{new:>12.4g}{change:>+10.1%}{flag}")
+    print(f"[info] {len(rows)} metrics compared, {len(regressions)} regression(s)")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+"""
+Offline pipeline benchmark: stub simulator + stub planner, no GPU or API keys.
+
+    python -m benchmarks.run_bench --out bench.json
+    python -m benchmarks.run_bench --objects 5000 --plan-length 16 --episodes 20 --out big.json
+    python -m benchmarks.compare baseline.json bench.json
+
+Measures episodes/sec and per-stage latency (telemetry spans) for `run_eval` with both executors,
+micro-benchmarks of `list_scene_names`, `try_rgb_image_b64`, `_build_prompt` and a single plan through
+each executor, and memory (tracemalloc peak per section and process max RSS).
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import resource
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict
+
+from benchmarks import stub_omnigibson
+
+
+def timeit(fn: Callable[[], Any], repeat: int, warmup: int = 1) -> Dict[str, float]:
+    for _ in range(warmup):
+        fn()
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    times.sort()
+    return {
+        "p50_ms": round(times[len(times) // 2] * 1e3, 4),
+        "min_ms": round(times[0] * 1e3, 4),
+        "mean_ms": round(sum(times) / len(times) * 1e3, 4),
+    }
+
+
+def peak_alloc(fn: Callable[[], Any]) -> float:
+    """Peak Python allocation (MiB) while running `fn`."""
+    tracemalloc.start()
+    try:
+        fn()
+        return round(tracemalloc.get_traced_memory()[1] / 2**20, 3)
+    finally:
+        tracemalloc.stop()
+
+
+def max_rss_mb() -> float:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # KiB on Linux, bytes on macOS
+    return round(rss / (2**20 if sys.platform == "darwin" else 2**10), 2)
+
+
+def build_eval_args(args, executor: str):
+    """run_eval arguments for this benchmark configuration, checked with `run_eval.check_args`."""
+    import run_eval
+
+    argv = ["--provider", "openai", "--model", "stub", "--activity", "stub_activity",
+            "--episodes", str(args.episodes), "--exec", executor,
+            "--catalog-tokens", str(args.catalog_tokens), "--image-codec", args.image_codec]
+    if args.pipeline:
+        argv.append("--pipeline")
+    if args.early_stop:
+        argv.append("--early-stop")
+    if args.stream:
+        argv.append("--stream")
+    if args.replan:
+        argv += ["--replan", str(args.replan)]
+    if args.validate_plans:
+        argv.append("--validate-plans")
+    if args.record_dir:
+        argv += ["--record-dir", os.path.join(args.record_dir, executor)]
+    if args.speculative:
+        argv += ["--speculative", str(args.speculative)]
+    if args.max_primitive_steps is not None:
+        argv += ["--max-primitive-steps", str(args.max_primitive_steps)]
+    parsed = run_eval.build_parser().parse_args(argv)
+    run_eval.check_args(parsed)
+    return parsed
+
+
+def bench_run_eval(args, executor: str) -> Dict[str, Any]:
+    import run_eval
+    from og_vlm_planning import telemetry
+    from benchmarks.stub_planner import StubPlanner
+
+    eval_args = build_eval_args(args, executor)
+    servers = []
+    if args.http:
+        from og_vlm_planning.vlm_clients import get_planner
+        from benchmarks.stub_planner import serve_openai_stub
+        tail_prob, tail_s, error_prob, bad_json_prob = args.http_faults or (0.0, 0.0, 0.0, 0.0)
+        server, base_url = serve_openai_stub(latency_s=args.planner_latency, plan_length=args.plan_length,
+                                             tail_prob=tail_prob, tail_latency_s=tail_s, error_prob=error_prob,
+                                             bad_json_prob=bad_json_prob, seed=args.seed)
+        servers.append(server)
+        os.environ["OPENAI_BASE_URL"] = base_url
+        os.environ.setdefault("OPENAI_API_KEY", "stub")
+        if args.hedge:
+            from og_vlm_planning.hedging import HedgedPlanner
+            fallback, fallback_url = serve_openai_stub(latency_s=args.planner_latency, plan_length=args.plan_length)
+            servers.append(fallback)
+            planner = HedgedPlanner([get_planner("openai", "stub", max_retries=0),
+                                     get_planner("openai", "stub", base_url=fallback_url, max_retries=0)],
+                                    hedge_after_s=args.hedge_after, seed=args.seed)
+        else:
+            planner = get_planner("openai", "stub")
+    else:
+        planner = StubPlanner(latency_s=args.planner_latency, plan_length=args.plan_length,
+                              noise=args.planner_noise, seed=args.seed)
+
+    tracer = telemetry.configure(True)
+    tracer.clear()
+    sink = io.StringIO()
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(sink), contextlib.redirect_stderr(sink):
+            results = run_eval.run_serial(eval_args, planner)
+        wall = time.perf_counter() - t0
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+        telemetry.configure(False)
+        if hasattr(planner, "close"):
+            planner.close()
+        for server in servers:
+            server.shutdown()
+    summary = telemetry.summarize(tracer.records)
+    tracer.clear()
+
+    n = len(results)
+    out = {
+        "episodes": n,
+        "wall_s": round(wall, 4),
+        "episodes_per_s": round(n / wall, 3) if wall > 0 else 0.0,
+        "avg_bddl_fraction": round(sum(r["bddl_fraction"] for r in results) / max(n, 1), 4),
+        "peak_alloc_mb": round(peak / 2**20, 3),
+        "stages": {name: {"p50_ms": s["p50_ms"], "p95_ms": s["p95_ms"], "count": s["count"]}
+                   for name, s in summary["spans"].items()},
+    }
+    if args.replan:
+        out["replans"] = sum(r.get("replans", 0) for r in results)
+    if args.speculative:
+        out["speculative"] = {
+            "switched": sum(1 for r in results if r["spec_chosen"] != 0),
+            "screen_s": round(sum(r["spec_screen_s"] for r in results), 4),
+            "avoided_primitive_s_est": round(sum(r["spec_avoided_s"] for r in results), 4),
+        }
+    if getattr(planner, "usage", None):
+        out["usage"] = planner.usage
+    if hasattr(planner, "report"):
+        out["hedging"] = planner.report()
+    return out
+
+
+def bench_components(args) -> Dict[str, Any]:
+    from og_vlm_planning.og_env import make_env, list_scene_names, try_rgb_image_b64
+    from og_vlm_planning.vlm_clients import _build_prompt
+    from og_vlm_planning.catalog import CatalogBuilder
+    from og_vlm_planning.executors import TeleportExecutor, PrimitiveExecutor
+    from og_vlm_planning.plan_validation import PlanValidator, scene_openable, scene_resolver
+    from benchmarks.stub_planner import StubPlanner
+
+    env = make_env("stub_activity")
+    catalog = CatalogBuilder(token_budget=args.catalog_tokens).build(env, activity="stub_activity")
+    plan = StubPlanner(plan_length=args.plan_length).plan("stub_activity", catalog)
+    repeat = args.repeat
+
+    def teleport():
+        env.reset()
+        TeleportExecutor(env).execute_plan(plan)
+
+    def primitives():
+        env.reset()
+        ex = PrimitiveExecutor(env)
+        for step in plan.plan:
+            d = step.dict()
+            op = d["op"]
+            if op == "NAVIGATE_TO":
+                ex.navigate_to(d["target"])
+            elif op == "GRASP":
+                ex.grasp(d["target"])
+            elif op == "PLACE_ON_TOP":
+                ex.place_on_top(d["object"], d["receptacle"])
+
+    cases = {
+        "list_scene_names": lambda: list_scene_names(env),
+        "try_rgb_image_b64": lambda: try_rgb_image_b64(env),
+        "build_prompt": lambda: _build_prompt("stub_activity", catalog, ""),
+        "catalog_build": lambda: CatalogBuilder(token_budget=args.catalog_tokens).build(env, "stub_activity"),
+        "validate_plan": lambda: PlanValidator(catalog, scene_resolver(env), scene_openable(env)).validate(plan),
+        "teleport_plan": teleport,
+        "primitive_plan": primitives,
+    }
+    out = {}
+    for name, fn in cases.items():
+        out[name] = timeit(fn, repeat)
+        out[name]["peak_alloc_mb"] = peak_alloc(fn)
+    return out
+
+
+def build_parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(description="Offline benchmark with a stub simulator and planner")
+    p.add_argument("--objects", type=int, default=1000, help="Objects per synthetic scene")
+    p.add_argument("--goals", type=int, default=4, help="item/receptacle goal pairs per scene")
+    p.add_argument("--plan-length", type=int, default=8, help="Steps per stub plan")
+    p.add_argument("--episodes", type=int, default=10)
+    p.add_argument("--steps-per-primitive", type=int, default=20, help="env.step calls per stub primitive")
+    p.add_argument("--step-time", type=float, default=0.0, help="Simulated wall time per env.step (s)")
+    p.add_argument("--image-size", type=int, nargs=2, default=[480, 640], metavar=("H", "W"))
+    p.add_argument("--image-codec", type=str, default="png")
+    p.add_argument("--catalog-tokens", type=int, default=400)
+    p.add_argument("--planner-latency", type=float, default=0.0, help="Simulated VLM latency (s)")
+    p.add_argument("--pipeline", action="store_true", help="Benchmark run_eval with --pipeline")
+    p.add_argument("--early-stop", action="store_true", help="Benchmark run_eval with --early-stop")
+    p.add_argument("--stream", action="store_true", help="Benchmark run_eval with --stream")
+    p.add_argument("--replan", type=int, default=0, help="Benchmark run_eval with --replan N")
+    p.add_argument("--validate-plans", action="store_true", help="Benchmark run_eval with --validate-plans")
+    p.add_argument("--record-dir", type=str, default=None, help="Benchmark run_eval with trajectory recording here")
+    p.add_argument("--speculative", type=int, default=0, help="Benchmark run_eval with --speculative K")
+    p.add_argument("--planner-noise", type=float, default=0.0,
+                   help="Probability that the in-process stub planner places an item on a wrong receptacle")
+    p.add_argument("--max-primitive-steps", type=int, default=None,
+                   help="Primitive step limit for run_eval (below --steps-per-primitive, primitives fail)")
+    p.add_argument("--http", action="store_true",
+                   help="Plan through the real OpenAI client against the local stub server instead of in-process")
+    p.add_argument("--http-faults", type=float, nargs=4, default=None,
+                   metavar=("TAIL_PROB", "TAIL_S", "ERROR_PROB", "BAD_JSON_PROB"),
+                   help="Slow responses, HTTP 503s and unparsable JSON injected by the stub server (--http)")
+    p.add_argument("--hedge", action="store_true",
+                   help="With --http, plan through HedgedPlanner with a second (fault-free) stub server as fallback")
+    p.add_argument("--hedge-after", type=float, default=1.0, help="Initial hedge delay (s) for --hedge")
+    p.add_argument("--repeat", type=int, default=20, help="Repetitions per micro-benchmark")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--out", type=str, default=None, help="Write results as JSON here")
+    return p
+
+
+def main():
+    args = build_parser().parse_args()
+    stub_omnigibson.install(
+        n_objects=args.objects,
+        n_goals=args.goals,
+        image_hw=tuple(args.image_size),
+        steps_per_primitive=args.steps_per_primitive,
+        step_time_s=args.step_time,
+        seed=args.seed,
+    )
+    # Unsupported run_eval flag combinations fail before any benchmark runs
+    build_eval_args(args, "teleport")
+    config = {k: v for k, v in vars(args).items() if k != "out"}
+    results = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "config": config,
+        "components": bench_components(args),
+        "run_eval": {kind: bench_run_eval(args, kind) for kind in ("teleport", "primitives")},
+    }
+    results["memory"] = {"max_rss_mb": max_rss_mb()}
+
+    text = json.dumps(results, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+"""
+CPU-only stand-in for the small part of the omnigibson API used by og_vlm_planning.
+
+`install()` registers fake `omnigibson` modules in `sys.modules`; import og_vlm_planning.og_env (or
+run_eval) afterwards. Scenes are synthetic: `n_objects` objects spread over a floor plan, `n_goals`
+pairs `item_k` -> `receptacle_k` whose BDDL-style goal is "item_k on top of receptacle_k".
+Physics is not simulated; env.step only counts steps (optionally sleeping `step_time_s`) and primitives
+move objects at their last action.
+"""
+import json
+import sys
+import time
+import types
+
+import numpy as np
+
+
+CONFIG = {
+    "n_objects": 1000,
+    "n_goals": 4,
+    "image_hw": (480, 640),
+    "steps_per_primitive": 20,
+    "step_time_s": 0.0,
+    "seed": 0,
+    # scene models whose task sampling fails (og.Environment raises)
+    "failing_scenes": (),
+    # activities whose task sampling fails in every scene
+    "failing_activities": (),
+}
+
+CATEGORIES = ["chair", "table", "cabinet", "book", "bottle", "bowl", "plate", "mug", "shelf", "lamp",
+              "pillow", "towel", "carton", "drawer", "sofa", "rug", "walls", "ceilings"]
+
+STEP_DT = 1.0 / 30.0
+
+
+class StubObject:
+    def __init__(self, name, category, pos, half_extent=0.1):
+        self.name = name
+        self.category = category
+        self._pos = np.asarray(pos, dtype=float)
+        self.half_extent = np.full(3, half_extent)
+
+    def get_position(self):
+        return self._pos.copy()
+
+    def set_position(self, pos):
+        self._pos = np.asarray(pos, dtype=float)[:3].copy()
+
+    @property
+    def aabb(self):
+        return self._pos - self.half_extent, self._pos + self.half_extent
+
+
+class StubRobot(StubObject):
+    def __init__(self, image_hw, seed):
+        super().__init__("robot0", "agent", [0.0, 0.0, 0.0], half_extent=0.3)
+        rng = np.random.default_rng(seed)
+        h, w = image_hw
+        self._rgb = rng.integers(0, 256, size=(h, w, 3), dtype=np.uint8)
+        self._depth = rng.uniform(0.3, 8.0, size=(h, w)).astype(np.float32)
+
+    def get_camera_images(self):
+        return {"rgb": self._rgb, "depth": self._depth}
+
+
+class _Entity:
+    def __init__(self, obj):
+        self.wrapped_obj = obj
+        self.exists = True
+
+
+class StubScene:
+    def __init__(self, activity, cfg, scene_file=None):
+        rng = np.random.default_rng(cfg["seed"])
+        self.name = "stub_scene"
+        self.robot = StubRobot(cfg["image_hw"], cfg["seed"])
+        objs = []
+        self.goals = []
+        for k in range(cfg["n_goals"]):
+            floor = rng.uniform(-10, 10, size=(2, 3)) * [1, 1, 0]
+            item = StubObject(f"item_{k}", "item", floor[0] + [0, 0, 0.5], 0.05)
+            rec = StubObject(f"receptacle_{k}", "receptacle", floor[1] + [0, 0, 0.4], 0.3)
+            objs += [item, rec]
+            self.goals.append((item, rec))
+        for i in range(max(0, cfg["n_objects"] - len(objs))):
+            cat = CATEGORIES[i % len(CATEGORIES)]
+            objs.append(StubObject(f"{cat}_{i}", cat, rng.uniform(-10, 10, 3) * [1, 1, 0.1]))
+        self.objects = objs + [self.robot]
+        if scene_file is not None:
+            with open(scene_file, "r", encoding="utf-8") as f:
+                self.load_state(np.asarray(json.load(f)["state"]), serialized=True)
+        self._initial = self.dump_state(serialized=True)
+
+    def dump_state(self, serialized=True):
+        return np.concatenate([o.get_position() for o in self.objects])
+
+    def load_state(self, state, serialized=True):
+        state = np.asarray(state, dtype=float).reshape(-1, 3)
+        for o, p in zip(self.objects, state):
+            o.set_position(p)
+
+    def reset(self):
+        self.load_state(self._initial)
+
+
+class _OnTopCondition:
+    """BDDL-style atomic formula `(ontop item receptacle)`."""
+    def __init__(self, item_inst, rec_inst, item, rec):
+        self.input = [item_inst, rec_inst]
+        self.children = []
+        self._item, self._rec = item, rec
+
+    def evaluate(self):
+        return _on_top(self._item, self._rec)
+
+
+class StubTask:
+    def __init__(self, scene, activity):
+        self.activity_name = activity
+        self.object_scope = {"agent.n.01_1": _Entity(scene.robot)}
+        self.activity_goal_conditions = []
+        for k, (item, rec) in enumerate(scene.goals):
+            item_inst, rec_inst = f"item.n.01_{k + 1}", f"receptacle.n.01_{k + 1}"
+            self.object_scope[item_inst] = _Entity(item)
+            self.object_scope[rec_inst] = _Entity(rec)
+            self.activity_goal_conditions.append(_OnTopCondition(item_inst, rec_inst, item, rec))
+
+
+class Environment:
+    def __init__(self, configs):
+        task_cfg = configs.get("task", {})
+        scene_cfg = configs.get("scene", {})
+        if (scene_cfg.get("scene_model") in CONFIG["failing_scenes"]
+                or task_cfg.get("activity_name") in CONFIG["failing_activities"]):
+            raise ValueError(f"Sampling failed for {task_cfg.get('activity_name')} in {scene_cfg['scene_model']}")
+        self.scene = StubScene(task_cfg.get("activity_name", "stub"), CONFIG, scene_cfg.get("scene_file"))
+        self.robots = [self.scene.robot]
+        self.task = StubTask(self.scene, task_cfg.get("activity_name", "stub"))
+        self.steps = 0
+        _sim.scenes = [self.scene]
+
+    def update_task(self, task_config):
+        self.task = StubTask(self.scene, task_config.get("activity_name", "stub"))
+
+    def reset(self):
+        self.scene.reset()
+        return {}, {}
+
+    def step(self, action):
+        self.steps += 1
+        if CONFIG["step_time_s"]:
+            time.sleep(CONFIG["step_time_s"])
+        return {}, 0.0, False, False, {}
+
+
+def _on_top(item, rec) -> bool:
+    lo, hi = rec.aabb
+    p = item.get_position()
+    return bool(lo[0] <= p[0] <= hi[0] and lo[1] <= p[1] <= hi[1] and p[2] >= hi[2] - 1e-6)
+
+
+class TaskMetric:
+    def __init__(self, env):
+        self.env = env
+
+    def compute(self):
+        goals = self.env.scene.goals
+        ok = sum(_on_top(i, r) for i, r in goals)
+        return {"predicate_success_fraction": ok / len(goals) if goals else 1.0}
+
+
+class StarterSemanticActionPrimitives:
+    def __init__(self, scene, robot):
+        self.scene = scene
+        self.robot = robot
+        self.n = CONFIG["steps_per_primitive"]
+
+    def _actions(self, on_done=None):
+        for _ in range(self.n):
+            yield np.zeros(8)
+        if on_done is not None:
+            on_done()
+
+    def NAVIGATE_TO(self, obj):
+        return self._actions(lambda: self.robot.set_position(obj.get_position() + [0.5, 0.0, 0.0]))
+
+    def GRASP(self, obj):
+        return self._actions()
+
+    def PLACE_ON_TOP(self, obj, rec):
+        def place():
+            lo, hi = rec.aabb
+            obj.set_position([(lo[0] + hi[0]) / 2, (lo[1] + hi[1]) / 2, hi[2] + 0.05])
+        return self._actions(place)
+
+    def PLACE_INSIDE(self, obj, rec):
+        return self.PLACE_ON_TOP(obj, rec)
+
+    def OPEN(self, obj):
+        return self._actions()
+
+    def CLOSE(self, obj):
+        return self._actions()
+
+    def RELEASE(self):
+        return self._actions()
+
+
+class _Sim:
+    def __init__(self):
+        self.scenes = []
+        self.steps = 0
+
+    def step(self):
+        self.steps += 1
+
+    def get_rendering_dt(self):
+        return STEP_DT
+
+    def save(self, json_paths):
+        for scene, path in zip(self.scenes, json_paths):
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump({"state": scene.dump_state().tolist()}, f)
+
+    def clear(self):
+        self.scenes = []
+
+
+_sim = _Sim()
+
+
+def install(**config):
+    """Register the stand-in modules (idempotent) and update CONFIG."""
+    CONFIG.update(config)
+    if getattr(sys.modules.get("omnigibson"), "__stub__", False):
+        return sys.modules["omnigibson"]
+    og = types.ModuleType("omnigibson")
+    og.Environment = Environment
+    og.sim = _sim
+    og.clear = _sim.clear
+    og.__stub__ = True
+
+    macros = types.ModuleType("omnigibson.macros")
+    macros.gm = types.SimpleNamespace(ENABLE_OBJECT_STATES=False, USE_GPU_DYNAMICS=False)
+    og.macros = macros
+
+    metric = types.ModuleType("omnigibson.learning.metrics.task_metric")
+    metric.TaskMetric = TaskMetric
+
+    sap = types.ModuleType("omnigibson.action_primitives.starter_semantic_action_primitives")
+    sap.StarterSemanticActionPrimitives = StarterSemanticActionPrimitives
+
+    modules = {
+        "omnigibson": og,
+        "omnigibson.macros": macros,
+        "omnigibson.learning": types.ModuleType("omnigibson.learning"),
+        "omnigibson.learning.metrics": types.ModuleType("omnigibson.learning.metrics"),
+        "omnigibson.learning.metrics.task_metric": metric,
+        "omnigibson.action_primitives": types.ModuleType("omnigibson.action_primitives"),
+        "omnigibson.action_primitives.starter_semantic_action_primitives": sap,
+    }
+    sys.modules.update(modules)
+    return og
+
+
+def make_stub_env(activity: str = "stub", robot: str = "r1pro", **kwargs):
+    """`--env-factory benchmarks.stub_omnigibson:make_stub_env` for run_eval."""
+    install()
+    return Environment({"task": {"activity_name": activity}, "scene": {}})
@@ -0,0 +1,236 @@
+"""
+Stand-in planners for offline benchmarks.
+
+`StubPlanner` answers in-process after an optional simulated latency. `serve_openai_stub` starts a local
+HTTP server speaking the subset of the OpenAI Responses API used by OpenAIPlanner, so the real client
+can be exercised with OPENAI_BASE_URL=http://127.0.0.1:<port>/v1.
+
+Plans pair `item_k` with `receptacle_k` from the catalog (see stub_omnigibson) and are padded with
+NAVIGATE_TO steps up to `plan_length`. A replan returns the same plan without the steps listed as completed
+in the execution update. The server reports a repeated prompt prefix (same `prompt_cache_key`, or a
+`previous_response_id` continuation) as cached input tokens, and can inject slow responses, HTTP errors and
+unparsable JSON.
+"""
+import asyncio
+import itertools
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional
+
+from og_vlm_planning.replanning import step_str
+from og_vlm_planning.vlm_clients import Plan, PlanStep, _build_prompt
+
+
+def stub_plan_dict(catalog: List[str], plan_length: int = 8, noise: float = 0.0,
+                   rng: Optional[random.Random] = None) -> dict:
+    items = {m.group(1): n for n in catalog for m in [re.fullmatch(r"item_(\d+)", n)] if m}
+    recs = {m.group(1): n for n in catalog for m in [re.fullmatch(r"receptacle_(\d+)", n)] if m}
+    steps = []
+    for k in sorted(items, key=int):
+        if k not in recs:
+            continue
+        rec = recs[k]
+        if noise and rng is not None and len(recs) > 1 and rng.random() < noise:
+            # A plausible but wrong placement, so candidate plans differ in quality
+            rec = rng.choice([r for j, r in recs.items() if j != k])
+        steps += [
+            {"op": "NAVIGATE_TO", "target": items[k]},
+            {"op": "GRASP", "target": items[k]},
+            {"op": "NAVIGATE_TO", "target": rec},
+            {"op": "PLACE_ON_TOP", "object": items[k], "receptacle": rec},
+        ]
+    steps = steps[:plan_length]
+    filler = [n for n in catalog if n not in items.values() and n not in recs.values()] or catalog
+    i = 0
+    while len(steps) < plan_length and filler:
+        steps.append({"op": "NAVIGATE_TO", "target": filler[i % len(filler)]})
+        i += 1
+    return {"plan": steps}
+
+
+def stub_remaining(plan: dict, delta: str) -> dict:
+    m = re.search(r"Completed steps: (.*)", delta)
+    completed = set(m.group(1).split("; ")) if m else set()
+    return {"plan": [s for s in plan["plan"] if step_str(PlanStep(**s)) not in completed]}
+
+
+class StubPlanner:
+    """
+    With `noise`, each placement of a `plan` / `plan_async` answer goes to a wrong receptacle with that
+    probability (seeded by `seed` and the call count), so repeated samples differ in quality.
+    """
+    provider = "stub"
+
+    def __init__(self, latency_s: float = 0.0, plan_length: int = 8, model: str = "stub", temperature: float = 0.0,
+                 noise: float = 0.0, seed: int = 0):
+        self.latency_s = latency_s
+        self.plan_length = plan_length
+        self.model = model
+        self.temperature = temperature
+        self.noise = noise
+        self.seed = seed
+        self.cache = None
+        self.calls = 0
+
+    def _sample(self, catalog: List[str]) -> Plan:
+        rng = random.Random(self.seed * 1000003 + self.calls)
+        self.calls += 1
+        return Plan(**stub_plan_dict(catalog, self.plan_length, self.noise, rng))
+
+    def plan(self, activity: str, catalog: List[str], notes: str = "", image_b64: Optional[str] = None,
+             image_mime: str = "image/png", temperature: Optional[float] = None) -> Plan:
+        _build_prompt(activity, catalog, notes)
+        if self.latency_s:
+            time.sleep(self.latency_s)
+        return self._sample(catalog)
+
+    def plan_stream(self, activity: str, catalog: List[str], notes: str = "", image_b64: Optional[str] = None,
+                    image_mime: str = "image/png"):
+        """Yields the steps spread evenly over `latency_s`, like a streamed response."""
+        _build_prompt(activity, catalog, notes)
+        plan = Plan(**stub_plan_dict(catalog, self.plan_length))
+        self.calls += 1
+        for step in plan.plan:
+            if self.latency_s:
+                time.sleep(self.latency_s / max(len(plan.plan), 1))
+            yield step
+
+    async def plan_stream_async(self, activity: str, catalog: List[str], notes: str = "",
+                                image_b64: Optional[str] = None, image_mime: str = "image/png"):
+        """Async `plan_stream`."""
+        _build_prompt(activity, catalog, notes)
+        plan = Plan(**stub_plan_dict(catalog, self.plan_length))
+        self.calls += 1
+        for step in plan.plan:
+            if self.latency_s:
+                await asyncio.sleep(self.latency_s / max(len(plan.plan), 1))
+            yield step
+
+    async def plan_async(self, activity: str, catalog: List[str], notes: str = "", image_b64: Optional[str] = None,
+                         image_mime: str = "image/png", temperature: Optional[float] = None) -> Plan:
+        _build_prompt(activity, catalog, notes)
+        if self.latency_s:
+            await asyncio.sleep(self.latency_s)
+        return self._sample(catalog)
+
+    def replan(self, activity: str, catalog: List[str], previous: Plan, delta: str, notes: str = "",
+               image_b64: Optional[str] = None, image_mime: str = "image/png") -> Plan:
+        _build_prompt(activity, catalog, notes)
+        if self.latency_s:
+            time.sleep(self.latency_s)
+        self.calls += 1
+        return Plan(**stub_remaining(stub_plan_dict(catalog, self.plan_length), delta))
+
+
+def _catalog_from_request(body: dict) -> List[str]:
+    text = json.dumps(body.get("input", body.get("contents", "")))
+    m = re.search(r"Objects & Receptacles \(subset\): (.*?)(?:\\n|$)", text)
+    return [n.strip() for n in m.group(1).split(",")] if m else []
+
+
+def _response_body(body: dict, text: str, resp_id: str = "resp_stub", n_in: Optional[int] = None,
+                   cached: int = 0) -> dict:
+    if n_in is None:
+        n_in = len(json.dumps(body)) // 4
+    return {
+        "id": resp_id, "object": "response", "created_at": int(time.time()),
+        "model": body.get("model", "stub"), "status": "completed",
+        "output": [{"type": "message", "id": "msg_stub", "role": "assistant", "status": "completed",
+                    "content": [{"type": "output_text", "text": text, "annotations": []}]}],
+        "parallel_tool_calls": False, "tool_choice": "auto", "tools": [],
+        "usage": {"input_tokens": n_in, "output_tokens": len(text) // 4, "total_tokens": n_in + len(text) // 4,
+                  "input_tokens_details": {"cached_tokens": cached},
+                  "output_tokens_details": {"reasoning_tokens": 0}},
+    }
+
+
+def serve_openai_stub(port: int = 0, latency_s: float = 0.0, plan_length: int = 8, tail_prob: float = 0.0,
+                      tail_latency_s: float = 0.0, error_prob: float = 0.0, bad_json_prob: float = 0.0, seed: int = 0):
+    """
+    Start the stub Responses API server on a daemon thread; returns (server, base_url).
+
+    Faults for testing clients: with probability `tail_prob` a response takes `tail_latency_s` longer,
+    `error_prob` answers HTTP 503, and `bad_json_prob` returns truncated (unparsable) plan JSON.
+    """
+    ids = itertools.count()
+    # response id -> (catalog, input tokens of the conversation so far); prompt_cache_key -> prefix tokens
+    conversations = {}
+    prefixes = {}
+    lock = threading.Lock()
+    rng = random.Random(seed)
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            n = int(self.headers.get("content-length", 0))
+            body = json.loads(self.rfile.read(n) or b"{}")
+            with lock:
+                tail, error, bad_json = (rng.random() < p for p in (tail_prob, error_prob, bad_json_prob))
+            if latency_s or tail:
+                time.sleep(latency_s + (tail_latency_s if tail else 0.0))
+            if error:
+                return self._send(503, {"error": {"message": "stub overloaded", "type": "server_error"}})
+            messages = body.get("input", [])
+            n_in = len(json.dumps(body)) // 4
+            with lock:
+                resp_id = f"resp_stub_{next(ids)}"
+                if body.get("previous_response_id") in conversations:
+                    catalog, cached = conversations[body["previous_response_id"]]
+                    n_in += cached
+                else:
+                    catalog = _catalog_from_request(body)
+                    key = body.get("prompt_cache_key")
+                    prefix = len(json.dumps(messages[:2])) // 4
+                    cached = min(prefixes.get(key, 0), prefix)
+                    if key:
+                        prefixes[key] = prefix
+            plan = stub_plan_dict(catalog, plan_length)
+            last = messages[-1].get("content") if messages else None
+            if isinstance(last, str) and "Completed steps:" in last:
+                plan = stub_remaining(plan, last)
+            text = json.dumps(plan)
+            if bad_json:
+                text = text[:len(text) // 2]
+            with lock:
+                conversations[resp_id] = (catalog, n_in + len(text) // 4)
+            resp = _response_body(body, text, resp_id, n_in, cached)
+            if body.get("stream"):
+                return self._stream(resp, text)
+            self._send(200, resp)
+
+        def _send(self, status: int, payload: dict):
+            data = json.dumps(payload).encode("utf-8")
+            try:
+                self.send_response(status)
+                self.send_header("content-type", "application/json")
+                self.send_header("content-length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+            except (BrokenPipeError, ConnectionResetError):
+                # The client gave up on this request (e.g. a cancelled hedge)
+                pass
+
+        def _stream(self, resp, text):
+            # Server-sent events as emitted by the Responses API with stream=True
+            self.send_response(200)
+            self.send_header("content-type", "text/event-stream")
+            self.end_headers()
+            events = [{"type": "response.created", "response": dict(resp, status="in_progress", output=[])}]
+            for i in range(0, len(text), 16):
+                events.append({"type": "response.output_text.delta", "item_id": "msg_stub", "output_index": 0,
+                               "content_index": 0, "delta": text[i:i + 16], "logprobs": []})
+            events.append({"type": "response.completed", "response": resp})
+            for seq, ev in enumerate(events):
+                ev["sequence_number"] = seq
+                self.wfile.write(f"event: {ev['type']}\ndata: {json.dumps(ev)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    threading.Thread(target=server.serve_forever, name="stub-openai", daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
@@ -0,0 +1,78 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Dict, Optional, Tuple
+
+
+class BackgroundLoop:
+    """
+    An asyncio event loop running on a daemon thread.
+
+    Lets synchronous code (the simulator loop) start coroutines such as `planner.plan_async`
+    and pick up their results later through a `concurrent.futures.Future`.
+    """
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name="og-vlm-async", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def submit(self, coro: Awaitable) -> Future:
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro: Awaitable, timeout=None):
+        return self.submit(coro).result(timeout=timeout)
+
+    def close(self):
+        if self.loop.is_closed():
+            return
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class PlanPrefetcher:
+    """
+    Plans the next episode while the current one executes (--pipeline).
+
+    Every episode starts from the same reset state, so the context observed after one episode's reset is
+    normally the next episode's context as well. `take(ctx)` returns the request for this episode: the one
+    sent ahead during the previous episode when its context equals `ctx`, else a new one (a stale prefetch is
+    cancelled). It then sends the next episode's request with `ctx` right away, so that request runs while
+    this episode waits for its plan and executes. `episodes` bounds the number of requests.
+    """
+    def __init__(self, planner, loop: BackgroundLoop, episodes: int):
+        self.planner = planner
+        self.loop = loop
+        self.left = episodes
+        self.hits = 0
+        self._next: Optional[Tuple[Dict[str, Any], Future]] = None
+
+    def take(self, ctx: Dict[str, Any]) -> Tuple[Future, bool]:
+        """(future of this episode's plan, whether it was prefetched)."""
+        self.left -= 1
+        ahead, self._next = self._next, None
+        if ahead is not None and ahead[0] == ctx:
+            self.hits += 1
+            future, prefetched = ahead[1], True
+        else:
+            if ahead is not None:
+                ahead[1].cancel()
+            future, prefetched = self.loop.submit(self.planner.plan_async(**ctx)), False
+        if self.left > 0:
+            self._next = (dict(ctx), self.loop.submit(self.planner.plan_async(**ctx)))
+        return future, prefetched
+
+    def close(self):
+        if self._next is not None:
+            self._next[1].cancel()
+            self._next = None
@@ -0,0 +1,115 @@
+import math
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+from . import telemetry
+from .scene_index import get_scene_index, name_tokens
+
+
+DEFAULT_EXCLUDE_CATEGORIES = ("walls", "ceilings", "agent")
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about 4 characters per token for identifiers)."""
+    return max(1, math.ceil(len(text) / 4))
+
+
+def task_relevant_names(env) -> List[str]:
+    """
+    Scene names of the objects (and systems) bound in the activity's BDDL object scope, in scope order.
+    Returns an empty list when the task has no object scope.
+    """
+    scope = getattr(getattr(env, "task", None), "object_scope", None) or {}
+    names = []
+    for inst, entity in scope.items():
+        if entity is None or inst.startswith("agent"):
+            continue
+        if not getattr(entity, "exists", True):
+            continue
+        obj = getattr(entity, "wrapped_obj", entity)
+        name = getattr(obj, "name", None)
+        if name:
+            names.append(name)
+    return list(dict.fromkeys(names))
+
+
+def _category(obj) -> str:
+    cat = getattr(obj, "category", None)
+    if cat:
+        return str(cat).lower()
+    tokens = name_tokens(obj.name)
+    return tokens[0] if tokens else ""
+
+
+class CatalogBuilder:
+    """
+    Builds the object catalog sent to the planner.
+
+    The task-relevant objects from the BDDL object scope are extracted once per scene and always come
+    first. The remaining objects are ranked (objects sharing a category with a task-relevant object or a
+    word of the activity name first, then by distance to the robot) and added until the estimated token
+    cost of the list reaches `token_budget`.
+    """
+    def __init__(self, token_budget: int = 400, exclude_categories: Sequence[str] = DEFAULT_EXCLUDE_CATEGORIES):
+        self.token_budget = token_budget
+        self.exclude_categories = set(exclude_categories)
+        self._relevant: Dict[int, List[str]] = {}
+
+    def relevant(self, env) -> List[str]:
+        key = id(env.scene)
+        if key not in self._relevant:
+            self._relevant[key] = task_relevant_names(env)
+        return self._relevant[key]
+
+    def invalidate(self):
+        self._relevant = {}
+
+    def build(self, env, activity: str = "", robot=None) -> List[str]:
+        with telemetry.span("catalog.build") as sp:
+            names = self._build(env, activity, robot)
+            sp.set(items=len(names))
+        return names
+
+    def _build(self, env, activity: str, robot) -> List[str]:
+        index = get_scene_index(env.scene)
+        relevant = self.relevant(env)
+        chosen = list(relevant)
+        used = sum(estimate_tokens(n) + 1 for n in chosen)
+        if used >= self.token_budget:
+            return chosen
+
+        relevant_set = set(relevant)
+        objs = index.objects
+        cats = [_category(o) for o in objs]
+        by_name = {o.name: c for o, c in zip(objs, cats)}
+        hot = {by_name[n] for n in relevant if n in by_name}
+        hot.update(name_tokens(activity))
+
+        keep = [i for i, (o, c) in enumerate(zip(objs, cats))
+                if o.name not in relevant_set and c not in self.exclude_categories]
+        if not keep:
+            return chosen
+
+        robot = robot if robot is not None else (env.robots[0] if getattr(env, "robots", None) else None)
+        if robot is not None:
+            origin = np.asarray(robot.get_position(), dtype=float)[:3]
+            dist = np.linalg.norm(index.positions(keep) - origin, axis=1)
+        else:
+            dist = np.zeros(len(keep))
+        priority = np.array([0 if cats[i] in hot else 1 for i in keep])
+        order = np.lexsort((dist, priority))
+
+        seen = set(chosen)
+        for k in order:
+            name = objs[keep[k]].name
+            if name in seen:
+                continue
+            cost = estimate_tokens(name) + 1
+            if used + cost > self.token_budget:
+                break
+            chosen.append(name)
+            seen.add(name)
+            used += cost
+        return chosen
+
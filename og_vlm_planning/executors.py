@@ -1,25 +1,52 @@
-from typing import Dict, Any
+import time
+from typing import Dict, Any, List, Optional
 import numpy as np
 
+from . import telemetry
+from .scene_index import get_scene_index
+
 
 class ExecutionResult:
     def __init__(self, success: bool, info: Dict[str, Any]):
         self.success = success
         self.info = info
 
+    def __repr__(self):
+        return f"ExecutionResult(success={self.success}, info={self.info})"
+
+
+class CompiledPlan:
+    """
+    A plan resolved against the scene: one ExecutionResult per step (None for unknown ops), and the final
+    target position of every object the plan moves, in first-move order.
+    """
+    def __init__(self, results: List[Optional[ExecutionResult]], objects: List, targets: np.ndarray):
+        self.results = results
+        self.objects = objects
+        self.targets = targets
+
+
+_PLACE_OPS = ("PLACE_ON_TOP", "PLACE_INSIDE")
+_NOOP_OPS = {"GRASP": "target", "OPEN": "target", "CLOSE": "target", "NAVIGATE_TO": "target", "RELEASE": None}
+
 
 class TeleportExecutor:
     """
     Minimal fallback: Teleports the target object onto the AABB of the receptacle, etc.
     Simplified executor for research use that omits physical behavior and directly satisfies goals.
+
+    `execute_plan` compiles a whole plan first (names resolved once, AABBs read once) and then moves each
+    object once, to its final target, followed by `settle_steps` simulator steps.
     """
-    def __init__(self, env):
+    TOP_OFFSET = np.array([0.0, 0.0, 0.05])
+
+    def __init__(self, env, settle_steps: int = 1):
         self.env = env
+        self.settle_steps = settle_steps
 
     def _obj_by_name(self, name: str):
-        # Name matching (partial match)
-        candidates = [o for o in self.env.scene.objects if hasattr(o, "name") and name.lower() in o.name.lower()]
-        return candidates[0] if candidates else None
+        # Name matching (partial match, first in scene order)
+        return get_scene_index(self.env.scene).first(name)
 
     def _aabb_center_top(self, obj):
         # AABB -> center top coordinates (simple)
@@ -31,6 +58,7 @@ class TeleportExecutor:
 
     def _set_pose(self, obj, pos, orn=None):
         obj.set_position(pos)
+        get_scene_index(self.env.scene).invalidate_positions([obj])
 
     def grasp(self, name: str):
         # In teleport execution, grasp is a no-op; the next place determines the position
@@ -62,79 +90,221 @@ class TeleportExecutor:
     def release(self):
         return ExecutionResult(True, {"op": "RELEASE"})
 
+    def compile(self, plan) -> CompiledPlan:
+        """
+        Resolve every step of `plan` to object handles and target positions without touching the scene.
+        Each AABB / position is read once; a receptacle moved earlier in the plan uses its shifted AABB.
+        """
+        index = get_scene_index(self.env.scene)
+        resolved: Dict[str, Any] = {}
+        aabbs: Dict[int, np.ndarray] = {}
+        moved: Dict[int, int] = {}
+        objects: List = []
+        targets: List[np.ndarray] = []
+        results: List[Optional[ExecutionResult]] = []
+
+        def resolve(name):
+            if name not in resolved:
+                resolved[name] = index.first(name)
+            return resolved[name]
+
+        def aabb(obj):
+            key = id(obj)
+            if key not in aabbs:
+                lo, hi = obj.aabb
+                aabbs[key] = np.array([np.asarray(lo, dtype=float), np.asarray(hi, dtype=float)])
+            return aabbs[key]
+
+        for step in plan.plan:
+            op = (step.op or "").upper()
+            if op in _NOOP_OPS:
+                field = _NOOP_OPS[op]
+                info = {"op": op} if field is None else {"op": op, field: getattr(step, field)}
+                results.append(ExecutionResult(True, info))
+                continue
+            if op not in _PLACE_OPS:
+                results.append(None)
+                continue
+            o, r = resolve(step.object), resolve(step.receptacle)
+            if o is None or r is None:
+                results.append(ExecutionResult(False, {"reason": "object or receptacle not found"}))
+                continue
+            box = aabb(r)
+            center = (box[0] + box[1]) / 2.0
+            target = np.array([center[0], center[1], box[1][2]]) + self.TOP_OFFSET
+
+            # Track where `o` ends up so later steps that use it as a receptacle see the moved AABB
+            obj_box = aabb(o)
+            k = moved.get(id(o))
+            prev = targets[k] if k is not None else np.asarray(o.get_position(), dtype=float)[:3]
+            aabbs[id(o)] = obj_box + (target - prev)
+            if k is None:
+                moved[id(o)] = len(objects)
+                objects.append(o)
+                targets.append(target)
+            else:
+                targets[k] = target
+            results.append(ExecutionResult(True, {"op": op, "object": step.object, "receptacle": step.receptacle}))
+
+        return CompiledPlan(results, objects, np.array(targets).reshape(-1, 3))
+
+    def apply(self, compiled: CompiledPlan):
+        """
+        Move each object of `compiled` to its final target (one `set_position` call per object, with no
+        simulator step in between), then run the `settle_steps` steps once for the whole plan.
+        """
+        for obj, pos in zip(compiled.objects, compiled.targets):
+            obj.set_position(pos)
+        if compiled.objects:
+            get_scene_index(self.env.scene).invalidate_positions(compiled.objects)
+            if self.settle_steps:
+                import omnigibson as og
+                for _ in range(self.settle_steps):
+                    og.sim.step()
+
+    def execute_plan(self, plan) -> List[Optional[ExecutionResult]]:
+        with telemetry.span("exec.compile", steps=len(plan.plan)):
+            compiled = self.compile(plan)
+        with telemetry.span("exec.apply", objects=len(compiled.objects)):
+            self.apply(compiled)
+        return compiled.results
+
+
+class StepBudget:
+    """Limits on env steps and wall-clock seconds; None means unlimited."""
+    def __init__(self, max_steps: Optional[int] = None, max_wall_s: Optional[float] = None):
+        self.max_steps = max_steps
+        self.max_wall_s = max_wall_s
+
+    def exceeded(self, steps: int, wall_s: float) -> Optional[str]:
+        if self.max_steps is not None and steps >= self.max_steps:
+            return f"step limit ({self.max_steps})"
+        if self.max_wall_s is not None and wall_s >= self.max_wall_s:
+            return f"time limit ({self.max_wall_s}s)"
+        return None
+
 
 class PrimitiveExecutor:
     """
     Executes plans using Starter Semantic Action Primitives.
     In environments where not available, may raise ImportError; please use try/except and fallback to TeleportExecutor.
+
+    Each primitive runs under its budget from `primitive_budgets` (keyed by op, falling back to
+    `default_budget`) and under the remaining `episode_budget`; when a limit is hit the primitive's
+    action generator is closed and the step fails. `ExecutionResult.info` records the steps taken and the
+    simulated and wall-clock time. Call `reset_episode()` at the start of each episode.
+    `step_hook`, if set, is called after every simulator step (e.g. TrajectoryRecorder.on_env_step).
     """
-    def __init__(self, env, robot=None):
+    def __init__(self, env, robot=None, primitive_budgets: Optional[Dict[str, StepBudget]] = None,
+                 default_budget: Optional[StepBudget] = None, episode_budget: Optional[StepBudget] = None):
         from omnigibson.action_primitives.starter_semantic_action_primitives import StarterSemanticActionPrimitives
+        import omnigibson as og
         self.env = env
         self.robot = robot or env.robots[0]
         self.sap = StarterSemanticActionPrimitives(scene=env.scene, robot=self.robot)
+        self.primitive_budgets = {k.upper(): v for k, v in (primitive_budgets or {}).items()}
+        self.default_budget = default_budget or StepBudget()
+        self.episode_budget = episode_budget or StepBudget()
+        self.step_dt = float(og.sim.get_rendering_dt())
+        self.step_hook = None
+        self.reset_episode()
+
+    def reset_episode(self):
+        self.episode_steps = 0
+        self.episode_wall_s = 0.0
 
     def _nearest_by_name(self, name: str):
         # SAP often takes object references, so this example matches by name and returns the nearest one
-        objs = [o for o in self.env.scene.objects if hasattr(o, "name") and name.lower() in o.name.lower()]
-        if not objs:
-            return None
-        # Sort by distance
-        base_pos = self.robot.get_position()
-        objs.sort(key=lambda o: np.linalg.norm(o.get_position() - base_pos))
-        return objs[0]
+        return get_scene_index(self.env.scene).nearest(name, self.robot.get_position())
+
+    def _run(self, op: str, actions, info: Dict[str, Any]) -> ExecutionResult:
+        with telemetry.span(f"exec.{op}") as sp:
+            res = self._run_budgeted(op, actions, info)
+            sp.set(success=res.success, steps=res.info["steps"], sim_time_s=res.info["sim_time_s"])
+        return res
+
+    def _run_budgeted(self, op: str, actions, info: Dict[str, Any]) -> ExecutionResult:
+        budget = self.primitive_budgets.get(op, self.default_budget)
+        ep = self.episode_budget
+        actions = iter(actions)
+        steps = 0
+        stopped = None
+        t0 = time.perf_counter()
+        try:
+            while True:
+                try:
+                    action = next(actions)
+                except StopIteration:
+                    break
+                # Only an action the primitive still wants to take can exceed the budget, so a primitive
+                # that finishes exactly at its limit succeeds
+                wall = time.perf_counter() - t0
+                stopped = budget.exceeded(steps, wall)
+                if stopped is None:
+                    stopped = ep.exceeded(self.episode_steps + steps, self.episode_wall_s + wall)
+                    if stopped is not None:
+                        stopped = "episode " + stopped
+                if stopped is not None:
+                    break
+                self.env.step(action)
+                steps += 1
+                if self.step_hook is not None:
+                    self.step_hook()
+        finally:
+            # Cancels the primitive cleanly (runs the generator's cleanup) if it did not finish
+            if hasattr(actions, "close"):
+                actions.close()
+            wall = time.perf_counter() - t0
+            self.episode_steps += steps
+            self.episode_wall_s += wall
+            # The robot may have moved anything it touched; positions are re-read lazily by the next queries
+            get_scene_index(self.env.scene).invalidate_positions()
+
+        info = dict(info, op=op, steps=steps, sim_time_s=steps * self.step_dt, wall_time_s=wall)
+        if stopped is not None:
+            info["reason"] = f"stopped: {stopped}"
+            return ExecutionResult(False, info)
+        return ExecutionResult(True, info)
 
     def navigate_to(self, target: str):
         tgt = self._nearest_by_name(target)
         if tgt is None:
             return ExecutionResult(False, {"reason": "target not found"})
-        for action in self.sap.NAVIGATE_TO(tgt):
-            self.env.step(action)
-        return ExecutionResult(True, {"op": "NAVIGATE_TO", "target": target})
+        return self._run("NAVIGATE_TO", self.sap.NAVIGATE_TO(tgt), {"target": target})
 
     def grasp(self, target: str):
         obj = self._nearest_by_name(target)
         if obj is None:
             return ExecutionResult(False, {"reason": "object not found"})
-        for action in self.sap.GRASP(obj):
-            self.env.step(action)
-        return ExecutionResult(True, {"op": "GRASP", "target": target})
+        return self._run("GRASP", self.sap.GRASP(obj), {"target": target})
 
     def place_on_top(self, obj_name: str, receptacle_name: str):
         obj = self._nearest_by_name(obj_name)
         rec = self._nearest_by_name(receptacle_name)
         if obj is None or rec is None:
             return ExecutionResult(False, {"reason": "object or receptacle not found"})
-        for action in self.sap.PLACE_ON_TOP(obj, rec):
-            self.env.step(action)
-        return ExecutionResult(True, {"op": "PLACE_ON_TOP", "object": obj_name, "receptacle": receptacle_name})
+        return self._run("PLACE_ON_TOP", self.sap.PLACE_ON_TOP(obj, rec),
+                         {"object": obj_name, "receptacle": receptacle_name})
 
     def place_inside(self, obj_name: str, receptacle_name: str):
         obj = self._nearest_by_name(obj_name)
         rec = self._nearest_by_name(receptacle_name)
         if obj is None or rec is None:
             return ExecutionResult(False, {"reason": "object or receptacle not found"})
-        for action in self.sap.PLACE_INSIDE(obj, rec):
-            self.env.step(action)
-        return ExecutionResult(True, {"op": "PLACE_INSIDE", "object": obj_name, "receptacle": receptacle_name})
+        return self._run("PLACE_INSIDE", self.sap.PLACE_INSIDE(obj, rec),
+                         {"object": obj_name, "receptacle": receptacle_name})
 
     def open(self, name: str):
         tgt = self._nearest_by_name(name)
         if tgt is None:
             return ExecutionResult(False, {"reason": "target not found"})
-        for action in self.sap.OPEN(tgt):
-            self.env.step(action)
-        return ExecutionResult(True, {"op": "OPEN", "target": name})
+        return self._run("OPEN", self.sap.OPEN(tgt), {"target": name})
 
     def close(self, name: str):
         tgt = self._nearest_by_name(name)
         if tgt is None:
             return ExecutionResult(False, {"reason": "target not found"})
-        for action in self.sap.CLOSE(tgt):
-            self.env.step(action)
-        return ExecutionResult(True, {"op": "CLOSE", "target": name})
+        return self._run("CLOSE", self.sap.CLOSE(tgt), {"target": name})
 
     def release(self):
-        for action in self.sap.RELEASE():
-            self.env.step(action)
-        return ExecutionResult(True, {"op": "RELEASE"})
+        return self._run("RELEASE", self.sap.RELEASE(), {})
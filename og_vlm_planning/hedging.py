@@ -0,0 +1,317 @@
+import asyncio
+import collections
+import random
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from . import telemetry
+from .async_utils import BackgroundLoop
+from .plan_cache import PlanCacheMiss
+from .vlm_clients import Plan, PlanStep, aclose_async_clients
+
+
+class CircuitOpen(RuntimeError):
+    """Every planner's circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Opens after `max_failures` consecutive failures. While open, requests are refused until `reset_s` has
+    passed; then a single trial request goes through (half-open): its success closes the breaker, its
+    failure reopens it, and other requests are refused until it finishes. `release()` ends a trial without
+    a verdict (cancelled request, plan-cache miss).
+    """
+    def __init__(self, max_failures: int = 3, reset_s: float = 30.0):
+        self.max_failures = max_failures
+        self.reset_s = reset_s
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.trips = 0
+        self.trial = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half-open" if time.monotonic() - self.opened_at >= self.reset_s else "open"
+
+    @property
+    def ready(self) -> bool:
+        """Whether `allow()` would let a request through (does not start a trial)."""
+        state = self.state
+        return state == "closed" or (state == "half-open" and not self.trial)
+
+    def allow(self) -> bool:
+        """Admit one request; in the half-open state it becomes the trial request."""
+        if not self.ready:
+            return False
+        if self.opened_at is not None:
+            self.trial = True
+        return True
+
+    def release(self):
+        self.trial = False
+
+    def success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.trial = False
+
+    def failure(self):
+        self.failures += 1
+        self.trial = False
+        if self.opened_at is not None or self.failures >= self.max_failures:
+            self.opened_at = time.monotonic()
+            self.trips += 1
+
+
+def backoff_s(attempt: int, base_s: float, max_s: float, rng: random.Random) -> float:
+    """Full-jitter exponential backoff: uniform in [0, min(max_s, base_s * 2**attempt)]."""
+    return rng.uniform(0.0, min(max_s, base_s * 2 ** attempt))
+
+
+def parse_planner_spec(spec: str) -> Tuple[str, str, Optional[str]]:
+    """`provider:model[@base_url]` -> (provider, model, base_url)."""
+    name, _, base_url = spec.partition("@")
+    provider, sep, model = name.partition(":")
+    if not sep or not model:
+        raise ValueError(f"Expected PROVIDER:MODEL[@URL], got {spec!r}")
+    return provider, model, base_url or None
+
+
+def _label(planner) -> str:
+    label = f"{planner.provider}:{planner.model}"
+    base_url = getattr(planner, "base_url", None)
+    return f"{label}@{base_url}" if base_url else label
+
+
+class HedgedPlanner:
+    """
+    Planner over several provider planners (the first is the primary) with the interface of a single one.
+
+    A request goes to the first planner whose circuit breaker is closed. If no valid plan has arrived after
+    the `hedge_quantile` of recent request latencies (`hedge_after_s` until `hedge_min_samples` latencies
+    are known), one hedged request is sent to the next planner (or again to the same one if it is the only
+    planner), and the first valid plan wins; the other request is cancelled. A failed request (HTTP error,
+    unparsable JSON, empty plan) immediately fails over to the next planner. When every planner of a round
+    has failed, the round is retried up to `retries` times after a jittered exponential backoff.
+    Each planner has its own CircuitBreaker. Plan-cache misses in replay mode are never retried, and plans
+    served from the plan cache neither count as breaker successes nor enter the latency window.
+
+    `replan` runs the planners' blocking calls on worker threads. A replan continuing a response
+    (`previous.response_id`) only goes to the planner that produced it. `plan_stream` and
+    `plan_stream_async` are not hedged and stream from the first available planner.
+    """
+    def __init__(self, planners: Sequence[Any], hedge_quantile: float = 0.9, hedge_after_s: float = 10.0,
+                 hedge_min_samples: int = 5, retries: int = 2, backoff_base_s: float = 0.5,
+                 backoff_max_s: float = 8.0, breaker_failures: int = 3, breaker_reset_s: float = 30.0,
+                 latency_window: int = 100, seed: Optional[int] = None):
+        if not planners:
+            raise ValueError("HedgedPlanner needs at least one planner")
+        self.planners = list(planners)
+        self.labels = [_label(p) for p in self.planners]
+        self.hedge_quantile = hedge_quantile
+        self.hedge_after_s = hedge_after_s
+        self.hedge_min_samples = hedge_min_samples
+        self.retries = retries
+        self.backoff_base_s = backoff_base_s
+        self.backoff_max_s = backoff_max_s
+        self.breakers = [CircuitBreaker(breaker_failures, breaker_reset_s) for _ in self.planners]
+        self.latencies: collections.deque = collections.deque(maxlen=latency_window)
+        self.stats = {"requests": 0, "hedges": 0, "hedge_wins": 0, "failovers": 0, "retries": 0, "failures": 0}
+        self.wins = [0] * len(self.planners)
+        self._rng = random.Random(seed)
+        # response_id -> index of the planner that produced it, so replans continue on that planner
+        self._origins: Dict[str, int] = {}
+        self._max_origins = 1024
+        self._loop: Optional[BackgroundLoop] = None
+
+    # Attributes of the primary planner, so callers can treat this like a single planner
+    @property
+    def provider(self) -> str:
+        return self.planners[0].provider
+
+    @property
+    def model(self) -> str:
+        return self.planners[0].model
+
+    @property
+    def temperature(self) -> float:
+        return self.planners[0].temperature
+
+    @property
+    def cache(self):
+        return getattr(self.planners[0], "cache", None)
+
+    @property
+    def usage(self) -> Dict[str, Dict[str, int]]:
+        totals: Dict[str, Dict[str, int]] = {}
+        for p in self.planners:
+            for kind, row in (getattr(p, "usage", None) or {}).items():
+                acc = totals.setdefault(kind, {})
+                for k, v in row.items():
+                    acc[k] = acc.get(k, 0) + v
+        return totals
+
+    def hedge_delay_s(self) -> float:
+        if len(self.latencies) < self.hedge_min_samples:
+            return self.hedge_after_s
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(self.hedge_quantile * len(ordered)))]
+
+    def _available(self, candidates: Optional[Sequence[int]] = None) -> List[int]:
+        candidates = range(len(self.planners)) if candidates is None else candidates
+        return [i for i in candidates if self.breakers[i].ready]
+
+    def _failed(self, i: int, e: BaseException):
+        print(f"[warn] planner {self.labels[i]} failed: {type(e).__name__}: {e}")
+        self.stats["failures"] += 1
+        if isinstance(e, PlanCacheMiss):
+            self.breakers[i].release()
+            return
+        self.breakers[i].failure()
+        if self.breakers[i].state == "open":
+            telemetry.event("vlm.breaker_open", planner=self.labels[i])
+
+    def _succeeded(self, i: int, plan: Plan, latency_s: float):
+        if plan.from_cache:
+            # Says nothing about the provider, and its near-zero latency would collapse the hedge delay
+            self.breakers[i].release()
+        else:
+            self.breakers[i].success()
+            self.latencies.append(latency_s)
+        if plan.response_id:
+            self._origins[plan.response_id] = i
+            if len(self._origins) > self._max_origins:
+                del self._origins[next(iter(self._origins))]
+        self.wins[i] += 1
+
+    async def _race(self, call: Callable[[Any], Awaitable[Plan]], candidates: Optional[Sequence[int]] = None) -> Plan:
+        queue = self._available(candidates)
+        if not queue:
+            raise CircuitOpen("all planner circuit breakers are open: " + ", ".join(self.labels))
+        hedge_to = queue[1] if len(queue) > 1 else queue[0]
+        tasks: Dict[asyncio.Future, tuple] = {}
+        errors: List[BaseException] = []
+
+        def launch(i: int, hedge: bool = False) -> bool:
+            trial = self.breakers[i].state == "half-open"
+            if not self.breakers[i].allow():
+                return False
+            if hedge:
+                self.stats["hedges"] += 1
+                telemetry.event("vlm.hedge", planner=self.labels[i])
+            tasks[asyncio.ensure_future(call(self.planners[i]))] = (i, time.perf_counter(), hedge, trial)
+            return True
+
+        def launch_next(hedge: bool = False) -> bool:
+            while queue:
+                if launch(queue.pop(0), hedge):
+                    return True
+            return False
+
+        if not launch_next():
+            raise CircuitOpen("no planner admitted the request: " + ", ".join(self.labels))
+        t_launch = time.perf_counter()
+        hedged = False
+        try:
+            while tasks:
+                timeout = None if hedged else max(0.0, self.hedge_delay_s() - (time.perf_counter() - t_launch))
+                done, _ = await asyncio.wait(list(tasks), timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    hedged = True
+                    if not launch_next(hedge=True):
+                        launch(hedge_to, hedge=True)
+                    continue
+                for task in done:
+                    i, t0, hedge, _ = tasks.pop(task)
+                    try:
+                        plan = task.result()
+                        if not plan.plan:
+                            raise ValueError("empty plan")
+                    except Exception as e:
+                        self._failed(i, e)
+                        errors.append(e)
+                        continue
+                    self._succeeded(i, plan, time.perf_counter() - t0)
+                    if hedge:
+                        self.stats["hedge_wins"] += 1
+                    return plan
+                if not tasks and launch_next():
+                    self.stats["failovers"] += 1
+                    t_launch = time.perf_counter()
+        finally:
+            for task, (i, _, _, trial) in tasks.items():
+                task.cancel()
+                if trial:
+                    self.breakers[i].release()
+        raise errors[-1]
+
+    async def _call(self, call: Callable[[Any], Awaitable[Plan]], candidates: Optional[Sequence[int]] = None) -> Plan:
+        self.stats["requests"] += 1
+        for attempt in range(self.retries + 1):
+            if attempt:
+                self.stats["retries"] += 1
+                await asyncio.sleep(backoff_s(attempt - 1, self.backoff_base_s, self.backoff_max_s, self._rng))
+            try:
+                return await self._race(call, candidates)
+            except PlanCacheMiss:
+                raise
+            except Exception:
+                if attempt == self.retries:
+                    raise
+        raise AssertionError("unreachable")
+
+    def _run(self, coro: Awaitable[Plan]) -> Plan:
+        if self._loop is None:
+            self._loop = BackgroundLoop()
+        return self._loop.run(coro)
+
+    async def plan_async(self, activity: str, catalog: List[str], notes: str = "", image_b64: Optional[str] = None,
+                         image_mime: str = "image/png", temperature: Optional[float] = None) -> Plan:
+        return await self._call(lambda p: p.plan_async(activity, catalog, notes, image_b64, image_mime,
+                                                       temperature=temperature))
+
+    def plan(self, activity: str, catalog: List[str], notes: str = "", image_b64: Optional[str] = None,
+             image_mime: str = "image/png", temperature: Optional[float] = None) -> Plan:
+        return self._run(self.plan_async(activity, catalog, notes, image_b64, image_mime, temperature))
+
+    def replan(self, activity: str, catalog: List[str], previous: Plan, delta: str, notes: str = "",
+               image_b64: Optional[str] = None, image_mime: str = "image/png") -> Plan:
+        candidates = None
+        if previous.response_id:
+            origin = self._origins.get(previous.response_id)
+            if origin is not None:
+                # The conversation only exists on the planner (provider and endpoint) that answered it
+                candidates = [origin]
+            else:
+                previous = previous.copy(update={"response_id": None})
+
+        async def call(p):
+            return await asyncio.get_running_loop().run_in_executor(
+                None, lambda: p.replan(activity, catalog, previous, delta, notes, image_b64, image_mime))
+        return self._run(self._call(call, candidates))
+
+    def plan_stream(self, activity: str, catalog: List[str], notes: str = "", image_b64: Optional[str] = None,
+                    image_mime: str = "image/png") -> Iterator[PlanStep]:
+        i = (self._available() or [0])[0]
+        return self.planners[i].plan_stream(activity, catalog, notes, image_b64, image_mime)
+
+    def plan_stream_async(self, activity: str, catalog: List[str], notes: str = "", image_b64: Optional[str] = None,
+                          image_mime: str = "image/png") -> AsyncIterator[PlanStep]:
+        i = (self._available() or [0])[0]
+        return self.planners[i].plan_stream_async(activity, catalog, notes, image_b64, image_mime)
+
+    def report(self) -> Dict[str, Any]:
+        return dict(
+            self.stats,
+            hedge_delay_s=self.hedge_delay_s(),
+            planners={label: {"wins": w, "breaker": b.state, "breaker_trips": b.trips}
+                      for label, w, b in zip(self.labels, self.wins, self.breakers)},
+        )
+
+    def close(self):
+        if self._loop is not None:
+            self._loop.run(aclose_async_clients())
+            self._loop.close()
+            self._loop = None
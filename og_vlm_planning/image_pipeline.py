@@ -0,0 +1,170 @@
+import base64
+import hashlib
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Optional
+
+import numpy as np
+
+from . import telemetry
+
+
+MIME_TYPES = {"png": "image/png", "jpeg": "image/jpeg", "webp": "image/webp"}
+OVERLAYS = ("depth", "seg")
+
+
+class EncodedImage:
+    """`nbytes` is the size of the base64 payload sent to the planner, `raw_bytes` that of the encoded image."""
+    def __init__(self, b64: str, mime_type: str, nbytes: int, encode_s: float, reused: bool = False,
+                 raw_bytes: Optional[int] = None):
+        self.b64 = b64
+        self.mime_type = mime_type
+        self.nbytes = nbytes
+        self.raw_bytes = nbytes if raw_bytes is None else raw_bytes
+        self.encode_s = encode_s
+        self.reused = reused
+
+
+def _to_numpy(x) -> np.ndarray:
+    if hasattr(x, "cpu"):
+        x = x.cpu().numpy()
+    return np.asarray(x)
+
+
+def _to_uint8_rgb(rgb: np.ndarray) -> np.ndarray:
+    rgb = rgb[..., :3]
+    if rgb.dtype != np.uint8:
+        scale = 255.0 if rgb.max(initial=0) <= 1.0 else 1.0
+        rgb = np.clip(rgb * scale, 0, 255).astype(np.uint8)
+    return rgb
+
+
+def _depth_colormap(depth: np.ndarray) -> np.ndarray:
+    import cv2
+
+    depth = np.squeeze(depth).astype(np.float32)
+    valid = np.isfinite(depth) & (depth > 0)
+    if not valid.any():
+        return np.zeros(depth.shape + (3,), dtype=np.uint8)
+    lo, hi = np.percentile(depth[valid], [1, 99])
+    norm = np.clip((depth - lo) / max(hi - lo, 1e-6), 0, 1)
+    norm[~valid] = 1.0
+    bgr = cv2.applyColorMap((255 * (1.0 - norm)).astype(np.uint8), cv2.COLORMAP_JET)
+    return bgr[..., ::-1]
+
+
+def _seg_colormap(seg: np.ndarray) -> np.ndarray:
+    seg = np.squeeze(seg).astype(np.int64)
+    # Stable pseudo-random color per id
+    ids = (seg * 2654435761) & 0xFFFFFF
+    return np.stack([(ids >> 16) & 0xFF, (ids >> 8) & 0xFF, ids & 0xFF], axis=-1).astype(np.uint8)
+
+
+class ImageEncoder:
+    """
+    Encodes camera frames for the planner.
+
+    Frames are optionally blended with a depth or segmentation overlay, downscaled so the longest side is
+    at most `max_size`, and encoded as PNG, JPEG or WebP. `submit` runs the encode on a worker thread so
+    it overlaps with the rest of episode setup. A frame identical to the previous one is not re-encoded.
+    Upload bytes and encode time are accumulated in `stats`.
+    """
+    def __init__(self, codec: str = "png", quality: int = 90, max_size: Optional[int] = None,
+                 overlay: Optional[str] = None, overlay_alpha: float = 0.4):
+        codec = codec.lower().replace("jpg", "jpeg")
+        if codec not in MIME_TYPES:
+            raise ValueError(f"Unknown image codec: {codec} (expected one of {list(MIME_TYPES)})")
+        if overlay is not None and overlay not in OVERLAYS:
+            raise ValueError(f"Unknown image overlay: {overlay} (expected one of {OVERLAYS})")
+        self.codec = codec
+        self.mime_type = MIME_TYPES[codec]
+        self.quality = int(quality)
+        self.max_size = max_size
+        self.overlay = overlay
+        self.overlay_alpha = overlay_alpha
+        self.stats = {"encoded": 0, "reused": 0, "bytes": 0, "encode_s": 0.0}
+        self._last_digest = None
+        self._last: Optional[EncodedImage] = None
+        self._pool: Optional[ThreadPoolExecutor] = None
+
+    def _overlay_frame(self, images: Dict[str, np.ndarray]) -> Optional[np.ndarray]:
+        if self.overlay == "depth":
+            for key in ("depth_linear", "depth"):
+                if key in images:
+                    return images[key]
+        elif self.overlay == "seg":
+            for key in ("seg_instance", "seg_semantic"):
+                if key in images:
+                    return images[key]
+        return None
+
+    def _digest(self, rgb: np.ndarray, extra: Optional[np.ndarray]) -> bytes:
+        h = hashlib.blake2b(digest_size=16)
+        h.update(repr((rgb.shape, str(rgb.dtype))).encode())
+        h.update(np.ascontiguousarray(rgb).data)
+        if extra is not None:
+            h.update(np.ascontiguousarray(extra).data)
+        return h.digest()
+
+    def encode(self, images: Dict[str, np.ndarray]) -> EncodedImage:
+        """Encode `images["rgb"]` (plus the configured overlay channel, if present)."""
+        with telemetry.span("image.encode", codec=self.codec) as sp:
+            out = self._encode(images)
+            sp.set(bytes=out.nbytes, raw_bytes=out.raw_bytes, reused=out.reused)
+        return out
+
+    def _encode(self, images: Dict[str, np.ndarray]) -> EncodedImage:
+        import cv2
+
+        t0 = time.perf_counter()
+        rgb = _to_numpy(images["rgb"])
+        extra = self._overlay_frame(images)
+        extra = _to_numpy(extra) if extra is not None else None
+
+        digest = self._digest(rgb, extra)
+        if digest == self._last_digest and self._last is not None:
+            self.stats["reused"] += 1
+            last = self._last
+            return EncodedImage(last.b64, last.mime_type, last.nbytes, 0.0, reused=True, raw_bytes=last.raw_bytes)
+
+        rgb = _to_uint8_rgb(rgb)
+        if extra is not None:
+            colored = _depth_colormap(extra) if self.overlay == "depth" else _seg_colormap(extra)
+            if colored.shape[:2] != rgb.shape[:2]:
+                colored = cv2.resize(colored, (rgb.shape[1], rgb.shape[0]), interpolation=cv2.INTER_NEAREST)
+            rgb = cv2.addWeighted(rgb, 1.0 - self.overlay_alpha, colored, self.overlay_alpha, 0.0)
+
+        h, w = rgb.shape[:2]
+        if self.max_size and max(h, w) > self.max_size:
+            s = self.max_size / float(max(h, w))
+            rgb = cv2.resize(rgb, (max(1, round(w * s)), max(1, round(h * s))), interpolation=cv2.INTER_AREA)
+
+        if self.codec == "jpeg":
+            params = [cv2.IMWRITE_JPEG_QUALITY, self.quality]
+        elif self.codec == "webp":
+            params = [cv2.IMWRITE_WEBP_QUALITY, self.quality]
+        else:
+            params = [cv2.IMWRITE_PNG_COMPRESSION, 1]
+        ok, buf = cv2.imencode("." + ("jpg" if self.codec == "jpeg" else self.codec),
+                               np.ascontiguousarray(rgb[..., ::-1]), params)
+        if not ok:
+            raise RuntimeError(f"cv2.imencode failed for codec {self.codec}")
+        b64 = base64.b64encode(buf.tobytes()).decode("utf-8")
+
+        out = EncodedImage(b64, self.mime_type, len(b64), time.perf_counter() - t0, raw_bytes=int(buf.nbytes))
+        self._last_digest, self._last = digest, out
+        self.stats["encoded"] += 1
+        self.stats["bytes"] += out.nbytes
+        self.stats["encode_s"] += out.encode_s
+        return out
+
+    def submit(self, images: Dict[str, np.ndarray]) -> Future:
+        """Encode on the worker thread. The frames must not be mutated until the future resolves."""
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="og-vlm-encode")
+        return self._pool.submit(self.encode, images)
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
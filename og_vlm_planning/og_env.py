@@ -1,18 +1,39 @@
-from typing import List, Optional
-import cv2
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional, Sequence
 import base64
-import omnigibson as og
-from omnigibson.macros import gm
-from omnigibson.learning.metrics.task_metric import TaskMetric
+import time
 
-gm.ENABLE_OBJECT_STATES = True
-gm.USE_GPU_DYNAMICS = True
+from . import telemetry
+from .image_pipeline import ImageEncoder
+from .scene_compat import SceneCompatCache
+from .scene_index import get_scene_index
+from .task_snapshots import TaskSnapshot, attach_initial_state, restore_initial_state
 
+# omnigibson and cv2 are imported where they are used, so importing this module (and run_eval) does not
+# start the simulator stack; the gm macros are applied before the first environment is created.
+_macros_configured = False
 
-def get_compatible_scene_model(activity_name, default_scene="house_single_floor"):
+
+def _configure_macros():
+    global _macros_configured
+    if _macros_configured:
+        return
+    from omnigibson.macros import gm
+    gm.ENABLE_OBJECT_STATES = True
+    gm.USE_GPU_DYNAMICS = True
+    _macros_configured = True
+
+
+def get_compatible_scene_model(activity_name, default_scene="house_single_floor",
+                               scene_cache: Optional[SceneCompatCache] = None, instance_id: int = 0):
     """
     Get appropriate scene model for activity (first preferred).
+    With a `scene_cache`, the first of the activity's candidate scenes known to work, else the first not
+    known to fail, is returned; None when every candidate is known to fail.
     """
+    if scene_cache is not None:
+        ordered = scene_cache.order(activity_name, get_candidate_scene_models(activity_name), instance_id)
+        return ordered[0] if ordered else None
     activity_scene_mapping = {
         "laying_wood_floors": ["house_single_floor", "house_double_floor_lower"],
         "putting_up_Christmas_decorations_inside": ["house_single_floor"],
@@ -65,38 +86,209 @@ def get_candidate_scene_models(activity_name) -> List[str]:
     return ["house_single_floor", "house_double_floor_lower", "Rs_int"]
 
 
-def make_env(activity: str, robot: str = "r1pro", headless: bool = True):
+def _task_config(activity: str, instance_id: int = 0, online_object_sampling: bool = True) -> Dict[str, Any]:
+    return {
+        "type": "BehaviorTask",
+        "activity_name": activity,
+        "activity_definition_id": 0,
+        "activity_instance_id": instance_id,
+        "online_object_sampling": online_object_sampling,
+        "use_presampled_robot_pose": False,
+    }
+
+
+def _robot_config(robot_type: str, obs_modalities: Sequence[str] = ("rgb", "depth")) -> Dict[str, Any]:
+    return {
+        "type": robot_type,
+        "obs_modalities": list(obs_modalities),
+        "action_type": "continuous",
+        "action_normalize": True,
+    }
+
+
+def _env_config(activity: str, robot_config: Dict[str, Any], scene_model: str, instance_id: int = 0,
+                scene_file: Optional[str] = None, online_object_sampling: bool = True) -> Dict[str, Any]:
+    scene_config = {
+        "type": "InteractiveTraversableScene",
+        "scene_model": scene_model,
+    }
+    if scene_file:
+        scene_config["scene_file"] = scene_file
+    return {
+        "scene": scene_config,
+        "robots": [robot_config],
+        "task": _task_config(activity, instance_id, online_object_sampling=online_object_sampling),
+    }
+
+
+def _clear_scene():
+    import omnigibson as og
+    try:
+        og.clear()
+    except Exception as e:
+        print(f"[warn] og.clear() raised: {e!r}")
+
+
+def _candidate_scenes(activity: str, instance_id: int, scene_model: Optional[str],
+                      scene_cache: Optional[SceneCompatCache]) -> List[str]:
+    candidates = [scene_model] if scene_model else get_candidate_scene_models(activity)
+    if scene_cache is None:
+        return candidates
+    ordered = scene_cache.order(activity, candidates, instance_id)
+    if not ordered:
+        raise RuntimeError(f"Every candidate scene of {activity} (instance {instance_id}) is recorded as failing in "
+                           f"{scene_cache.path}: {', '.join(candidates)}")
+    return ordered
+
+
+def make_env(activity: str, robot: str = "r1pro", headless: bool = True, instance_id: int = 0,
+             snapshot_dir: Optional[str] = None, scene_model: Optional[str] = None,
+             scene_cache: Optional[str] = None):
     """
     Create an OmniGibson environment and load a BEHAVIOR activity.
     Config follows upstream BehaviorTask signature.
+
+    If `snapshot_dir` is given, the sampled task instance is loaded from its snapshot there and online
+    object sampling only runs (and writes the snapshot) on a cache miss. `scene_model` pins the scene
+    instead of trying the activity's candidates in order.
+
+    A candidate scene that fails to load or sample is cleared (`og.clear()`) and the next one is tried.
+    With `scene_cache` (path of a SceneCompatCache), scenes known to work are tried first, scenes known to
+    fail are skipped, and every outcome is recorded.
     """
+    _configure_macros()
+    import omnigibson as og
+
     robot_type = robot.replace("r1pro", "R1Pro")
-    for scene_model in get_candidate_scene_models(activity):
-        config = {
-            "scene": {
-                "type": "InteractiveTraversableScene",
-                "scene_model": scene_model,
-            },
-            "robots": [
-                {
-                    "type": robot_type,
-                    "obs_modalities": ["rgb", "depth"],
-                    "action_type": "continuous",
-                    "action_normalize": True,
-                }
-            ],
-            "task": {
-                "type": "BehaviorTask",
-                "activity_name": activity,
-                "activity_definition_id": 0,
-                "activity_instance_id": 0,
-                "online_object_sampling": True,
-                "use_presampled_robot_pose": False,
-            },
-        }
-        env = og.Environment(configs=config)
-        env.reset()
+    robot_config = _robot_config(robot_type)
+    cache = SceneCompatCache(scene_cache) if scene_cache else None
+    errors = []
+    for scene_model in _candidate_scenes(activity, instance_id, scene_model, cache):
+        snapshot = None
+        if snapshot_dir:
+            snapshot = TaskSnapshot(snapshot_dir, activity, scene_model, instance_id, robot_type, robot_config)
+        cached = snapshot is not None and snapshot.exists()
+        config = _env_config(activity, robot_config, scene_model, instance_id,
+                             scene_file=snapshot.scene_file if cached else None, online_object_sampling=not cached)
+        t0 = time.perf_counter()
+        try:
+            with telemetry.span("env.make", activity=activity, scene_model=scene_model, snapshot_hit=cached):
+                env = og.Environment(configs=config)
+                env.reset()
+                if snapshot is not None:
+                    if not cached:
+                        snapshot.save(env)
+                    attach_initial_state(env, snapshot.load_state())
+                    restore_initial_state(env)
+        except Exception as e:
+            print(f"[warn] {activity} could not be loaded in {scene_model}: {e!r}")
+            errors.append(f"{scene_model}: {e!r}")
+            if cache is not None:
+                cache.record(activity, scene_model, instance_id, False, error=repr(e),
+                             seconds=time.perf_counter() - t0)
+            _clear_scene()
+            continue
+        if cache is not None and cache.status(activity, scene_model, instance_id) is not True:
+            cache.record(activity, scene_model, instance_id, True, seconds=time.perf_counter() - t0)
+        env._og_vlm_scene_model = scene_model
         return env
+    raise RuntimeError(f"No candidate scene could load {activity}: " + "; ".join(errors))
+
+
+def preflight_scenes(activity: str, scene_cache: SceneCompatCache, robot: str = "r1pro", instance_id: int = 0,
+                     candidates: Optional[List[str]] = None, force: bool = False) -> Dict[str, bool]:
+    """
+    Try every candidate scene of `activity` once in a lightweight mode (online sampling of the task
+    instance, but no observation modalities and no reset) and record in `scene_cache` whether it loads.
+    Combinations with a known status in the cache are skipped unless `force`. Returns {scene_model: ok}.
+    """
+    _configure_macros()
+    import omnigibson as og
+
+    robot_type = robot.replace("r1pro", "R1Pro")
+    results = {}
+    for scene_model in candidates or get_candidate_scene_models(activity):
+        known = scene_cache.status(activity, scene_model, instance_id)
+        if known is not None and not force:
+            results[scene_model] = known
+            continue
+        config = _env_config(activity, _robot_config(robot_type, obs_modalities=[]), scene_model, instance_id)
+        t0 = time.perf_counter()
+        error = None
+        try:
+            with telemetry.span("env.preflight", activity=activity, scene_model=scene_model):
+                og.Environment(configs=config)
+        except Exception as e:
+            error = repr(e)
+        results[scene_model] = error is None
+        # The preflight only loads and samples the task, so its failure is the scene's
+        scene_cache.record(activity, scene_model, instance_id, error is None, error=error,
+                           seconds=time.perf_counter() - t0, mode="preflight", decisive=True)
+        print(f"[preflight] {activity} in {scene_model}: {'ok' if error is None else error}")
+        _clear_scene()
+    return results
+
+
+def close_env(env):
+    """Release the loaded scene so another environment can be created in this process."""
+    import omnigibson as og
+    og.clear()
+
+
+def update_env_task(env, activity: str, instance_id: int = 0) -> bool:
+    """
+    Switch a loaded environment to another activity on the same scene without reloading the scene
+    (`Environment.update_task`). Returns False if the environment does not support it.
+    """
+    if not hasattr(env, "update_task"):
+        return False
+    with telemetry.span("env.update_task", activity=activity):
+        env.update_task(task_config=_task_config(activity, instance_id))
+        # A snapshot state belongs to the previous activity
+        attach_initial_state(env, None)
+        env.reset()
+    get_scene_index(env.scene).invalidate()
+    return True
+
+
+def _reset_episode_variables(env):
+    """
+    The bookkeeping part of OmniGibson's `Environment.reset` / `BaseTask.reset`: robots and controllers,
+    task variables, termination conditions and reward functions, and the environment's step counters.
+    """
+    for robot in getattr(env, "robots", ()):
+        if hasattr(robot, "reset"):
+            robot.reset()
+    task = env.task
+    if hasattr(task, "_reset_variables"):
+        task._reset_variables(env)
+    for functions in (getattr(task, "_termination_conditions", {}), getattr(task, "_reward_functions", {})):
+        for fn in functions.values():
+            fn.reset(task, env)
+    if hasattr(env, "_reset_variables"):
+        env._reset_variables()
+
+
+def reset_env(env):
+    """
+    Reset for a new episode. When the environment was built from a task snapshot, the snapshot state is
+    restored in place instead of a full `env.reset()` (which would reload the scene's initial state first),
+    so every episode starts from the same sampled instance.
+    """
+    import omnigibson as og
+
+    with telemetry.span("env.reset") as sp:
+        if getattr(env, "_og_vlm_initial_state", None) is None:
+            env.reset()
+            sp.set(restored=False)
+        else:
+            _reset_episode_variables(env)
+            restore_initial_state(env)
+            # As in env.reset(): one step so the next observation shows the restored state
+            og.sim.step()
+            sp.set(restored=True)
+    # Objects are back at their initial poses
+    get_scene_index(env.scene).invalidate_positions()
 
 
 def list_scene_names(env, max_items: int = 64) -> List[str]:
@@ -108,27 +300,53 @@ def list_scene_names(env, max_items: int = 64) -> List[str]:
     return names[:max_items]
 
 
+def get_camera_frames(env) -> Optional[Dict[str, Any]]:
+    """
+    Raw camera frames of the first robot ("rgb", and "depth" / segmentation if enabled).
+    Returns None if not available.
+    """
+    robot = env.robots[0]
+    if not hasattr(robot, "get_camera_images"):
+        return None
+    return robot.get_camera_images()
+
+
 def try_rgb_image_b64(env) -> Optional[str]:
     """
     (Optional) Get an RGB image from the environment and return as a base64 string.
     Returns None if not available.
     """
-    robot = env.robots[0]
-    if hasattr(robot, "get_camera_images"):
-        rgb = robot.get_camera_images()["rgb"]
-    else:
+    frames = get_camera_frames(env)
+    if frames is None:
         return None
+    rgb = frames["rgb"]
 
+    import cv2
     _, buf = cv2.imencode(".png", rgb[..., ::-1])
     return base64.b64encode(buf.tobytes()).decode("utf-8")
 
 
+def submit_rgb_image(env, encoder: ImageEncoder) -> Optional[Future]:
+    """
+    Read the camera on the calling (simulator) thread and encode on the encoder's worker thread.
+    The future resolves to an EncodedImage; returns None if no camera is available.
+    """
+    with telemetry.span("image.capture"):
+        frames = get_camera_frames(env)
+    if frames is None or "rgb" not in frames:
+        return None
+    return encoder.submit(frames)
+
+
 def bddl_success_fraction(env) -> float:
     """
     Returns the fraction of satisfied BDDL predicates (partial score).
     Depends on OmniGibson's Metric / TerminationCondition; if not available, returns 0/1 approximation.
     """
+    from omnigibson.learning.metrics.task_metric import TaskMetric
+
     # Use TaskMetric if available
-    metric = TaskMetric(env=env)
-    frac = metric.compute()["predicate_success_fraction"]
+    with telemetry.span("eval.bddl"):
+        metric = TaskMetric(env=env)
+        frac = metric.compute()["predicate_success_fraction"]
     return float(frac)
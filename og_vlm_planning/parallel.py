@@ -0,0 +1,177 @@
+import importlib
+import multiprocessing as mp
+import queue
+import time
+import traceback
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Type
+
+
+def load_callable(spec: str) -> Callable:
+    """Resolve a "package.module:function" string."""
+    module, _, name = spec.partition(":")
+    if not module or not name:
+        raise ValueError(f"Expected 'module:function', got {spec!r}")
+    return getattr(importlib.import_module(module), name)
+
+
+class WorkerError(RuntimeError):
+    """A worker failed outside an episode (setup) or with one of the pool's `fatal_errors`."""
+
+
+def _worker_entry(target: Callable, worker_id: int, episodes: List[int], results, payload: Any,
+                  fatal_errors: Tuple[Type[BaseException], ...] = ()):
+    """
+    Runs inside the worker process. `target(worker_id, payload)` builds per-process state (environment,
+    planner, executor) and returns a function `run_episode(episode) -> dict`.
+    """
+    try:
+        run_episode = target(worker_id, payload)
+    except Exception:
+        results.put(("fatal", worker_id, None, traceback.format_exc()))
+        return
+    for ep in episodes:
+        results.put(("start", worker_id, ep, time.time()))
+        try:
+            out = run_episode(ep)
+        except fatal_errors:
+            results.put(("fatal", worker_id, ep, traceback.format_exc()))
+            return
+        except Exception:
+            results.put(("error", worker_id, ep, traceback.format_exc()))
+            continue
+        results.put(("result", worker_id, ep, out))
+    results.put(("done", worker_id, None, None))
+
+
+class WorkerPool:
+    """
+    Shards episodes across simulator worker processes and streams per-episode results back.
+
+    Each worker process calls `target(worker_id, payload)` once to build its own environment and gets
+    back an episode runner; episode `i` goes to worker `i % n_workers`. A worker that dies, whose setup
+    (environment build and task sampling) exceeds `setup_timeout_s`, or whose current episode exceeds
+    `episode_timeout_s`, is terminated and restarted on the unfinished part of its shard. An episode that
+    takes down its worker more than `max_episode_retries` times is reported as failed instead of retried again.
+
+    An exception raised by an episode is reported as a failed record (`failed`, `error`). A failing
+    setup, a setup that times out more than `max_episode_retries` times, or an episode raising one of
+    `fatal_errors` (errors of the run rather than of the episode) stops every worker and raises WorkerError.
+
+    Workers use the "spawn" start method, since the simulator cannot be forked once initialized.
+    `target` must be importable (a module-level function) and `payload` picklable.
+    """
+    def __init__(self, target: Callable, n_workers: int, payload: Any = None,
+                 episode_timeout_s: Optional[float] = None, setup_timeout_s: Optional[float] = None,
+                 max_episode_retries: int = 1,
+                 start_method: str = "spawn", exit_grace_s: float = 2.0,
+                 fatal_errors: Tuple[Type[BaseException], ...] = ()):
+        self.target = target
+        self.n_workers = max(1, int(n_workers))
+        self.payload = payload
+        self.episode_timeout_s = episode_timeout_s
+        self.setup_timeout_s = setup_timeout_s
+        self.max_episode_retries = max_episode_retries
+        self.exit_grace_s = exit_grace_s
+        self.fatal_errors = tuple(fatal_errors)
+        self.restarts = 0
+        self._ctx = mp.get_context(start_method)
+
+    def _spawn(self, wid: int, episodes: List[int], results):
+        p = self._ctx.Process(target=_worker_entry,
+                              args=(self.target, wid, episodes, results, self.payload, self.fatal_errors),
+                              name=f"og-vlm-worker-{wid}", daemon=True)
+        p.start()
+        return p
+
+    def run(self, episodes: List[int]) -> Iterator[Dict[str, Any]]:
+        results = self._ctx.Queue()
+        pending: Dict[int, List[int]] = {w: [e for e in episodes if e % self.n_workers == w]
+                                         for w in range(self.n_workers)}
+        pending = {w: eps for w, eps in pending.items() if eps}
+        procs = {w: self._spawn(w, eps, results) for w, eps in pending.items()}
+        # (episode, start time) of what each worker is running; episode None while it sets up
+        current: Dict[int, Optional[tuple]] = {w: (None, time.time()) for w in procs}
+        crashes: Dict[int, int] = {}
+        setup_crashes: Dict[int, int] = {}
+        dead_since: Dict[int, float] = {}
+
+        def restart(wid: int, reason: str):
+            proc = procs[wid]
+            _stop(proc)
+            running = current[wid]
+            failed = []
+            if running is not None and running[0] is None:
+                setup_crashes[wid] = setup_crashes.get(wid, 0) + 1
+                if setup_crashes[wid] > self.max_episode_retries:
+                    raise WorkerError(f"worker {wid} setup failed: {reason}")
+            elif running is not None:
+                ep = running[0]
+                crashes[ep] = crashes.get(ep, 0) + 1
+                if crashes[ep] > self.max_episode_retries:
+                    pending[wid].remove(ep)
+                    failed.append({"episode": ep, "worker": wid, "error": reason, "failed": True})
+            current[wid] = None
+            if pending[wid]:
+                self.restarts += 1
+                procs[wid] = self._spawn(wid, list(pending[wid]), results)
+                current[wid] = (None, time.time())
+            else:
+                del procs[wid]
+            return failed
+
+        try:
+            while procs:
+                try:
+                    kind, wid, ep, data = results.get(timeout=0.5)
+                except queue.Empty:
+                    kind = None
+                if kind == "start":
+                    current[wid] = (ep, data)
+                elif kind in ("result", "error"):
+                    current[wid] = None
+                    # Drop duplicates from a worker that was restarted after finishing this episode
+                    if ep in pending.get(wid, []):
+                        pending[wid].remove(ep)
+                        if kind == "result":
+                            out = dict(data)
+                            out.setdefault("episode", ep)
+                            out["worker"] = wid
+                        else:
+                            out = {"episode": ep, "worker": wid, "error": data, "failed": True}
+                        yield out
+                elif kind == "done":
+                    if wid in procs and not pending[wid]:
+                        procs.pop(wid).join(timeout=10)
+                        dead_since.pop(wid, None)
+                elif kind == "fatal":
+                    # Setup failed (retrying it would fail again) or the run cannot continue
+                    where = "setup" if ep is None else f"episode {ep}"
+                    raise WorkerError(f"worker {wid} failed in {where}:\n{data}")
+
+                now = time.time()
+                for w in list(procs):
+                    running = current.get(w)
+                    if not procs[w].is_alive():
+                        # Let queued messages from the dead process drain before restarting it
+                        first_seen = dead_since.setdefault(w, now)
+                        if now - first_seen > self.exit_grace_s:
+                            dead_since.pop(w)
+                            yield from restart(w, f"worker exited with code {procs[w].exitcode}")
+                    elif running is not None:
+                        what = "setup" if running[0] is None else "episode"
+                        timeout = self.setup_timeout_s if running[0] is None else self.episode_timeout_s
+                        if timeout is not None and now - running[1] > timeout:
+                            yield from restart(w, f"{what} exceeded {timeout}s")
+        finally:
+            for proc in procs.values():
+                _stop(proc)
+
+
+def _stop(proc):
+    if proc.is_alive():
+        proc.terminate()
+        proc.join(timeout=10)
+        # A worker hung inside the simulator may ignore SIGTERM
+        if proc.is_alive():
+            proc.kill()
+    proc.join(timeout=10)
@@ -0,0 +1,149 @@
+import hashlib
+import json
+import os
+import time
+from typing import Any, Dict, Optional
+
+
+class PlanCacheMiss(KeyError):
+    """Raised in replay mode when a plan is not in the cache."""
+
+
+class PlanCache:
+    """
+    Disk-backed, content-addressed cache of VLM plans.
+
+    Entries are keyed on a hash of (provider, model, temperature, system prompt, user prompt, image bytes)
+    and stored as one JSON file each under `root`. Modes:
+        readthrough: return cached plans, call the provider on a miss and store the result
+        record:      always call the provider and store the result
+        replay:      never call the provider; a miss raises PlanCacheMiss
+    Eviction drops entries older than `max_age_s` and then the oldest entries until the cache is
+    under LOW_WATER * `max_bytes`. It scans the directory when the cache is opened (except in replay mode),
+    every `evict_every` puts and when the running size total of this process's puts exceeds `max_bytes`.
+    """
+    MODES = ("readthrough", "record", "replay")
+    # Fraction of max_bytes an eviction shrinks the cache to, so the next puts do not trigger another scan
+    LOW_WATER = 0.9
+
+    def __init__(self, root: str, mode: str = "readthrough", max_bytes: Optional[int] = None,
+                 max_age_s: Optional[float] = None, evict_every: int = 256):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown plan cache mode: {mode} (expected one of {self.MODES})")
+        self.root = root
+        self.mode = mode
+        self.max_bytes = max_bytes
+        self.max_age_s = max_age_s
+        self.evict_every = evict_every
+        self.hits = 0
+        self.misses = 0
+        # Size of the cache as of the last scan plus this process's puts since then
+        self._total_bytes = 0
+        self._puts = 0
+        os.makedirs(root, exist_ok=True)
+        if mode != "replay":
+            self.evict()
+
+    @staticmethod
+    def make_key(provider: str, model: str, temperature: float, system: str, user: str,
+                 image_b64: Optional[str] = None) -> str:
+        h = hashlib.sha256()
+        for part in (provider, model, repr(float(temperature)), system, user):
+            data = part.encode("utf-8")
+            # Length-prefix each field so adjacent fields cannot alias
+            h.update(len(data).to_bytes(8, "little"))
+            h.update(data)
+        image = image_b64.encode("ascii") if image_b64 else b""
+        h.update(len(image).to_bytes(8, "little"))
+        h.update(image)
+        return h.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key + ".json")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        # Replay must stay deterministic, so stale entries are only dropped when recording
+        if (self.max_age_s is not None and self.mode != "replay"
+                and time.time() - entry.get("created", 0) > self.max_age_s):
+            self._remove(path)
+            return None
+        return entry["plan"]
+
+    def put(self, key: str, plan: Dict[str, Any], meta: Optional[Dict[str, Any]] = None):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        entry = {"key": key, "created": time.time(), "meta": meta or {}, "plan": plan}
+        data = json.dumps(entry)
+        try:
+            replaced = os.stat(path).st_size
+        except OSError:
+            replaced = 0
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        self._total_bytes += len(data.encode("utf-8")) - replaced
+        self._puts += 1
+        if self._puts % self.evict_every == 0 or (self.max_bytes is not None and self._total_bytes > self.max_bytes):
+            self.evict()
+
+    def _remove(self, path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _entries(self):
+        for sub in os.listdir(self.root):
+            d = os.path.join(self.root, sub)
+            if not os.path.isdir(d):
+                continue
+            for name in os.listdir(d):
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(d, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                yield path, st
+
+    def evict(self):
+        """Scan the cache, drop expired entries and, over `max_bytes`, the oldest ones down to the low-water mark."""
+        if self.max_bytes is None and self.max_age_s is None:
+            return
+        now = time.time()
+        entries = []
+        for path, st in self._entries():
+            if self.max_age_s is not None and now - st.st_mtime > self.max_age_s:
+                self._remove(path)
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        if self.max_bytes is not None and total > self.max_bytes:
+            target = self.max_bytes * self.LOW_WATER
+            for _, size, path in sorted(entries):
+                if total <= target:
+                    break
+                self._remove(path)
+                total -= size
+        self._total_bytes = total
+
+    def lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        """Mode-aware read: None means the provider should be called."""
+        if self.mode == "record":
+            return None
+        plan = self.get(key)
+        if plan is not None:
+            self.hits += 1
+            return plan
+        self.misses += 1
+        if self.mode == "replay":
+            raise PlanCacheMiss(key)
+        return None
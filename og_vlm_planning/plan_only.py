@@ -0,0 +1,141 @@
+import asyncio
+import base64
+import json
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+from . import telemetry
+
+
+EXT_MIME = {".png": "image/png", ".jpg": "image/jpeg", ".jpeg": "image/jpeg", ".webp": "image/webp"}
+MIME_EXT = {"image/png": ".png", "image/jpeg": ".jpg", "image/webp": ".webp"}
+
+
+def save_context(root: str, episode: int, ctx: Dict[str, Any]):
+    """
+    Append a planner context (activity, catalog, notes and image) to `root/contexts.jsonl` so it can be
+    replayed with `--plan-only`. The image is written next to it as a file.
+    """
+    os.makedirs(root, exist_ok=True)
+    stem = f"ep{episode:04d}"
+    rec = {"episode": episode, "activity": ctx["activity"], "catalog": ctx["catalog"], "notes": ctx.get("notes", "")}
+    if ctx.get("image_b64"):
+        name = stem + MIME_EXT.get(ctx.get("image_mime", "image/png"), ".png")
+        with open(os.path.join(root, name), "wb") as f:
+            f.write(base64.b64decode(ctx["image_b64"]))
+        rec["image_file"] = name
+    # One write per line so concurrent workers do not interleave records
+    with open(os.path.join(root, "contexts.jsonl"), "a", encoding="utf-8") as f:
+        f.write(json.dumps(rec) + "\n")
+
+
+def read_image(path: str):
+    """Return (base64, mime type) of an image file."""
+    mime = EXT_MIME.get(os.path.splitext(path)[1].lower())
+    if mime is None:
+        raise ValueError(f"Unsupported image type: {path} (expected one of {sorted(EXT_MIME)})")
+    with open(path, "rb") as f:
+        return base64.b64encode(f.read()).decode("utf-8"), mime
+
+
+def load_contexts(path: str, default_activity: str, image_file: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Planner contexts from a saved catalog. `path` is a JSONL file written by `save_context` (or by hand),
+    a JSON list of such records, a single record, or a plain JSON list of object names. Records may give
+    `activity`, `catalog`, `notes` and `image_file` (relative to `path`); `image_file` overrides the image
+    of every record.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        text = f.read()
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError:
+        data = [json.loads(line) for line in text.splitlines() if line.strip()]
+    if isinstance(data, dict):
+        data = [data]
+    elif data and all(isinstance(x, str) for x in data):
+        data = [{"catalog": data}]
+
+    base = os.path.dirname(os.path.abspath(path))
+    override = read_image(image_file) if image_file else None
+    images: Dict[str, Any] = {}
+    contexts = []
+    for rec in data:
+        ctx = {
+            "activity": rec.get("activity") or default_activity,
+            "catalog": list(rec["catalog"]),
+            "notes": rec.get("notes", ""),
+            "image_b64": None,
+            "image_mime": "image/png",
+        }
+        image = override
+        if image is None and rec.get("image_file"):
+            img_path = os.path.join(base, rec["image_file"])
+            if img_path not in images:
+                images[img_path] = read_image(img_path)
+            image = images[img_path]
+        if image is not None:
+            ctx["image_b64"], ctx["image_mime"] = image
+        contexts.append(ctx)
+    return contexts
+
+
+async def _plan_all(planner, contexts: List[Dict[str, Any]], repeats: int, out, on_result=None,
+                    validate: bool = False) -> Dict[str, Any]:
+    from .plan_cache import PlanCacheMiss
+    from .plan_validation import PlanValidator
+    from .vlm_clients import aclose_async_clients
+
+    async def one(i: int, r: int, ctx: Dict[str, Any]) -> Dict[str, Any]:
+        rec: Dict[str, Any] = {"context": i, "repeat": r, "activity": ctx["activity"]}
+        t0 = time.perf_counter()
+        try:
+            with telemetry.span("plan", context=i):
+                plan = await planner.plan_async(**ctx)
+            if validate:
+                # Catalog-only check (no scene); a rejected plan is recorded as an error
+                validator = PlanValidator(ctx["catalog"])
+                plan = validator.validate(plan)
+                rec["repairs"] = validator.repairs
+            rec["plan"] = plan.dict(exclude={"response_id"})["plan"]
+        except PlanCacheMiss:
+            # An error of the run (replay cache incomplete), not of this request
+            raise
+        except Exception as e:
+            rec["error"] = f"{type(e).__name__}: {e}"
+        rec["latency_s"] = round(time.perf_counter() - t0, 4)
+        return rec
+
+    stats = {"requests": 0, "errors": 0}
+    tasks = [asyncio.ensure_future(one(i, r, ctx)) for i, ctx in enumerate(contexts) for r in range(repeats)]
+    try:
+        for fut in asyncio.as_completed(tasks):
+            rec = await fut
+            stats["requests"] += 1
+            stats["errors"] += "error" in rec
+            out.write(json.dumps(rec) + "\n")
+            if on_result is not None:
+                on_result(rec)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await aclose_async_clients()
+    return stats
+
+
+def run_plan_only(planner, contexts: List[Dict[str, Any]], out_path: str, repeats: int = 1,
+                  on_result=None, validate: bool = False) -> Dict[str, Any]:
+    """
+    Plan every context `repeats` times with the planner's async API (no simulator involved) and write one
+    JSON line per request to `out_path`, in completion order. Concurrency follows `set_async_concurrency`.
+    With `validate`, plans are checked and repaired against each context's catalog. A PlanCacheMiss
+    (replay mode) stops the run and is raised; other request errors are recorded in the output.
+    """
+    t0 = time.perf_counter()
+    with open(out_path, "w", encoding="utf-8") as out:
+        stats = asyncio.run(_plan_all(planner, contexts, repeats, out, on_result, validate))
+    stats["wall_s"] = time.perf_counter() - t0
+    stats["requests_per_hour"] = 3600.0 * stats["requests"] / stats["wall_s"] if stats["wall_s"] > 0 else None
+    return stats
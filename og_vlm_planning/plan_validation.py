@@ -0,0 +1,233 @@
+import difflib
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+from . import telemetry
+from .scene_index import get_scene_index, name_tokens, normalize_name
+from .vlm_clients import Plan, PlanStep
+
+# Argument fields each op requires (see SYSTEM_TEMPLATE)
+OP_SCHEMA: Dict[str, Tuple[str, ...]] = {
+    "NAVIGATE_TO": ("target",),
+    "OPEN": ("target",),
+    "GRASP": ("target",),
+    "PLACE_ON_TOP": ("object", "receptacle"),
+    "PLACE_INSIDE": ("object", "receptacle"),
+    "CLOSE": ("target",),
+    "RELEASE": (),
+}
+OP_ALIASES = {
+    "NAVIGATE": "NAVIGATE_TO", "GO_TO": "NAVIGATE_TO", "GOTO": "NAVIGATE_TO", "MOVE_TO": "NAVIGATE_TO",
+    "PICK": "GRASP", "PICK_UP": "GRASP", "PICKUP": "GRASP", "GRAB": "GRASP",
+    "PLACE_ON": "PLACE_ON_TOP", "PUT_ON": "PLACE_ON_TOP", "PUT_ON_TOP": "PLACE_ON_TOP",
+    "PLACE_IN": "PLACE_INSIDE", "PUT_IN": "PLACE_INSIDE", "PUT_INSIDE": "PLACE_INSIDE",
+    "DROP": "RELEASE", "PLACE": "PLACE_ON_TOP",
+}
+# Shortest name fragment accepted without an exact match ("e" would match nearly every object)
+MIN_FRAGMENT_LEN = 3
+# Used when the scene cannot tell whether a receptacle is articulated
+OPENABLE_HINTS = {"fridge", "refrigerator", "cabinet", "drawer", "oven", "microwave", "dishwasher", "washer",
+                  "dryer", "freezer", "wardrobe", "closet", "door"}
+
+
+class PlanRejected(ValueError):
+    """A plan (or streamed step) that cannot be repaired into a valid one."""
+    def __init__(self, errors: List[str]):
+        super().__init__("; ".join(errors))
+        self.errors = errors
+
+
+class _State:
+    """What the plan has done so far: held objects and opened receptacles."""
+    def __init__(self):
+        self.held: Set[str] = set()
+        self.opened: Set[str] = set()
+
+    def apply(self, step: PlanStep):
+        op = step.op
+        if op == "GRASP":
+            self.held.add(step.target)
+        elif op in ("PLACE_ON_TOP", "PLACE_INSIDE"):
+            self.held.discard(step.object)
+        elif op == "RELEASE":
+            self.held.clear()
+        elif op == "OPEN":
+            self.opened.add(step.target)
+        elif op == "CLOSE":
+            self.opened.discard(step.target)
+
+
+def scene_openable(env) -> Callable[[str], Optional[bool]]:
+    """`openable(name)` from the object's OmniGibson states; None when the name does not resolve."""
+    index = get_scene_index(env.scene)
+
+    def openable(name: str) -> Optional[bool]:
+        obj = index.first(name)
+        if obj is None:
+            return None
+        # obj.states is keyed by state class
+        return any(getattr(state, "__name__", "") == "Open" for state in getattr(obj, "states", {}))
+    return openable
+
+
+def token_match(q: str, name: str) -> bool:
+    """Whether the tokens of `q` are consecutive whole tokens of `name` ("kitchen_cabinet" in "kitchen_cabinet_3")."""
+    qt, nt = name_tokens(q), name_tokens(name)
+    return bool(qt) and any(nt[i:i + len(qt)] == qt for i in range(len(nt) - len(qt) + 1))
+
+
+def fragment_match(q: str, name: str) -> bool:
+    """Normalized `q` names `name`: equal, or at least MIN_FRAGMENT_LEN long and a token match or a prefix."""
+    if q == name:
+        return True
+    return len(q) >= MIN_FRAGMENT_LEN and (name.startswith(q) or token_match(q, name))
+
+
+def scene_resolver(env) -> Callable[[str], bool]:
+    """`resolves(name)`: whether `name` is a scene object's name or a token / prefix fragment of one."""
+    index = get_scene_index(env.scene)
+
+    def resolves(name: str) -> bool:
+        q = normalize_name(name).strip()
+        return any(fragment_match(q, normalize_name(o.name)) for o in index.find(q))
+    return resolves
+
+
+class PlanValidator:
+    """
+    Checks plans against the op schema, the planner's catalog and simple preconditions before anything is
+    executed, and repairs what it can:
+
+    - op names are normalized (case, aliases such as PICK_UP, close misspellings);
+    - object names are accepted when they equal a catalog name or are a whole-token fragment of catalog names
+      (expanded to the full name when only one matches); a unique catalog-name prefix is expanded. Fragments
+      need MIN_FRAGMENT_LEN characters. Other names not confirmed by `resolves` are replaced by the closest
+      catalog name;
+    - an object is grasped before it is placed, and an openable receptacle is opened before PLACE_INSIDE;
+    - steps without effect (RELEASE with nothing held, NAVIGATE_TO without a target) are dropped.
+
+    Anything else (unknown op, missing argument, unknown name) raises PlanRejected. `repairs` lists every
+    repair made by this validator.
+    """
+    def __init__(self, catalog: Sequence[str], resolves: Optional[Callable[[str], bool]] = None,
+                 openable: Optional[Callable[[str], Optional[bool]]] = None, cutoff: float = 0.6):
+        self.catalog = list(dict.fromkeys(catalog))
+        self._by_norm = {normalize_name(n): n for n in self.catalog}
+        self.resolves = resolves
+        self.openable = openable
+        self.cutoff = cutoff
+        self.repairs: List[str] = []
+        self._names: Dict[str, Optional[str]] = {}
+
+    def _op(self, op: str) -> Optional[str]:
+        key = "_".join(name_tokens(op)).upper()
+        key = OP_ALIASES.get(key, key)
+        if key in OP_SCHEMA:
+            return key
+        close = difflib.get_close_matches(key, list(OP_SCHEMA), n=1, cutoff=0.75)
+        return close[0] if close else None
+
+    def _name(self, name: str) -> Optional[str]:
+        if name not in self._names:
+            self._names[name] = self._match_name(name)
+        return self._names[name]
+
+    def _match_name(self, name: str) -> Optional[str]:
+        q = normalize_name(name).strip()
+        if q in self._by_norm:
+            return self._by_norm[q]
+        if len(q) >= MIN_FRAGMENT_LEN:
+            tokens = [n for n in self._by_norm if token_match(q, n)]
+            if len(tokens) == 1:
+                return self._by_norm[tokens[0]]
+            if tokens:
+                # A category ("apple" for apple_1, apple_2): the executors take the first match in scene order
+                return name
+            prefixed = [n for n in self._by_norm if n.startswith(q)]
+            if len(prefixed) == 1:
+                return self._by_norm[prefixed[0]]
+        if self.resolves is not None and self.resolves(name):
+            return name
+        close = difflib.get_close_matches(q, list(self._by_norm), n=1, cutoff=self.cutoff)
+        return self._by_norm[close[0]] if close else None
+
+    def _is_openable(self, name: str) -> bool:
+        known = self.openable(name) if self.openable is not None else None
+        if known is not None:
+            return known
+        return bool(OPENABLE_HINTS.intersection(name_tokens(name)))
+
+    def _fix_step(self, step: PlanStep, state: _State, index: int) -> List[PlanStep]:
+        op = self._op(step.op or "")
+        if op is None:
+            raise PlanRejected([f"step {index}: unknown op {step.op!r}"])
+        if op != step.op:
+            self.repairs.append(f"step {index}: op {step.op!r} -> {op}")
+        args = {"target": step.target, "object": step.object, "receptacle": step.receptacle}
+        fields = OP_SCHEMA[op]
+        if fields == ("target",) and not args["target"] and args["object"]:
+            args["target"] = args["object"]
+        if fields[:1] == ("object",) and not args["object"] and args["target"]:
+            args["object"] = args["target"]
+        fixed = {"op": op}
+        for f in fields:
+            if not args[f]:
+                if op == "NAVIGATE_TO":
+                    self.repairs.append(f"step {index}: dropped NAVIGATE_TO without a target")
+                    return []
+                raise PlanRejected([f"step {index}: {op} is missing {f!r}"])
+            name = self._name(args[f])
+            if name is None:
+                raise PlanRejected([f"step {index}: {f} {args[f]!r} is not in the catalog"])
+            if normalize_name(name) != normalize_name(args[f]):
+                self.repairs.append(f"step {index}: {f} {args[f]!r} -> {name!r}")
+            fixed[f] = name
+        step = PlanStep(**fixed)
+
+        out: List[PlanStep] = []
+        if op == "RELEASE" and not state.held:
+            self.repairs.append(f"step {index}: dropped RELEASE with nothing held")
+            return []
+        if op == "PLACE_INSIDE" and step.receptacle not in state.opened and self._is_openable(step.receptacle):
+            self.repairs.append(f"step {index}: inserted OPEN {step.receptacle!r}")
+            out.append(PlanStep(op="OPEN", target=step.receptacle))
+        if op in ("PLACE_ON_TOP", "PLACE_INSIDE") and step.object not in state.held:
+            self.repairs.append(f"step {index}: inserted GRASP {step.object!r}")
+            out.append(PlanStep(op="GRASP", target=step.object))
+        out.append(step)
+        for s in out:
+            state.apply(s)
+        return out
+
+    def _state(self, executed: Iterable[PlanStep]) -> _State:
+        state = _State()
+        for step in executed:
+            state.apply(step)
+        return state
+
+    def validate(self, plan: Plan, executed: Iterable[PlanStep] = ()) -> Plan:
+        """
+        Return the repaired plan or raise PlanRejected. `executed` are steps already run in this episode
+        (e.g. before a replan); they seed the precondition state.
+        """
+        with telemetry.span("validate", steps=len(plan.plan)) as sp:
+            n_repairs = len(self.repairs)
+            state = self._state(executed)
+            steps: List[PlanStep] = []
+            errors: List[str] = []
+            for i, step in enumerate(plan.plan):
+                try:
+                    steps.extend(self._fix_step(step, state, i))
+                except PlanRejected as e:
+                    errors.extend(e.errors)
+            if not plan.plan:
+                errors.append("empty plan")
+            sp.set(repairs=len(self.repairs) - n_repairs, errors=len(errors))
+        if errors:
+            raise PlanRejected(errors)
+        return Plan(plan=steps, response_id=plan.response_id)
+
+    def stream(self, steps: Iterable[PlanStep], executed: Iterable[PlanStep] = ()) -> Iterator[PlanStep]:
+        """Repair streamed steps one at a time; raises PlanRejected at the first step that cannot be repaired."""
+        state = self._state(executed)
+        for i, step in enumerate(steps):
+            yield from self._fix_step(step, state, i)
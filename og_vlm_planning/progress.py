@@ -0,0 +1,139 @@
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from . import telemetry
+from .scene_index import get_scene_index
+
+
+def _formula_inputs(cond) -> Optional[Set[str]]:
+    """
+    Object-scope instance names referenced by the atomic formulas under a BDDL condition.
+    Returns None when an input cannot be tied to a concrete instance (an unbound `?variable`).
+    """
+    names: Set[str] = set()
+    stack = [cond]
+    while stack:
+        node = stack.pop()
+        for term in getattr(node, "input", None) or ():
+            if not isinstance(term, str) or term.startswith("?"):
+                return None
+            names.add(term)
+        stack.extend(getattr(node, "children", None) or ())
+    return names
+
+
+def _scope_name(entity) -> Optional[str]:
+    if entity is None:
+        return None
+    obj = getattr(entity, "wrapped_obj", entity)
+    return getattr(obj, "name", None)
+
+
+class GoalProgress:
+    """
+    Incremental BDDL goal evaluation.
+
+    Each top-level goal condition of the activity (`env.task.activity_goal_conditions`) is mapped once to
+    the scene objects it depends on. `update(step)` re-evaluates only the conditions touching an object
+    named by that plan step (or currently held by the robot); conditions that cannot be mapped, or that
+    involve the agent, are re-evaluated on every update. `curve` holds the satisfied fraction after each
+    update. Call `reset()` at the start of each episode. Without goal conditions on the task the tracker
+    is disabled (`enabled` is False).
+
+    `confirm()` re-evaluates every condition; call it before acting on `done`, since physics side effects
+    (an object knocked over by another) are not tracked.
+    """
+    def __init__(self, env):
+        self.env = env
+        task = getattr(env, "task", None)
+        self.conditions = list(getattr(task, "activity_goal_conditions", None) or [])
+        self.enabled = bool(self.conditions)
+        self.deps: List[Optional[Set[str]]] = []
+        self.by_object: Dict[str, List[int]] = {}
+        self.always: List[int] = []
+        self.held: Set[str] = set()
+        self.satisfied: List[bool] = []
+        self.curve: List[float] = []
+        self.evaluations = 0
+        if self.enabled:
+            self._map_dependencies(getattr(task, "object_scope", None) or {})
+
+    def _map_dependencies(self, scope: Dict[str, Any]):
+        agents = {inst for inst in scope if inst.startswith("agent")}
+        for i, cond in enumerate(self.conditions):
+            insts = _formula_inputs(cond)
+            if insts is None or insts & agents:
+                self.deps.append(None)
+                self.always.append(i)
+                continue
+            names = set()
+            for inst in insts:
+                name = _scope_name(scope.get(inst))
+                if name is None:
+                    break
+                names.add(name)
+            else:
+                self.deps.append(names)
+                for name in names:
+                    self.by_object.setdefault(name, []).append(i)
+                continue
+            self.deps.append(None)
+            self.always.append(i)
+
+    def _evaluate(self, indices: Iterable[int]):
+        for i in indices:
+            self.satisfied[i] = bool(self.conditions[i].evaluate())
+            self.evaluations += 1
+
+    @property
+    def fraction(self) -> float:
+        if not self.satisfied:
+            return 0.0
+        return sum(self.satisfied) / len(self.satisfied)
+
+    @property
+    def done(self) -> bool:
+        return bool(self.satisfied) and all(self.satisfied)
+
+    def reset(self) -> float:
+        """Evaluate every condition from scratch (start of an episode)."""
+        self.held = set()
+        self.curve = []
+        self.satisfied = [False] * len(self.conditions)
+        with telemetry.span("eval.progress", conditions=len(self.conditions)):
+            self._evaluate(range(len(self.conditions)))
+        return self.fraction
+
+    def confirm(self, record: bool = False) -> bool:
+        """Re-evaluate every condition and return whether all goals hold (appended to `curve` if `record`)."""
+        with telemetry.span("eval.progress", conditions=len(self.conditions)):
+            self._evaluate(range(len(self.conditions)))
+        if record:
+            self.curve.append(self.fraction)
+        return self.done
+
+    def _touched(self, names: Iterable[str]) -> Set[str]:
+        index = get_scene_index(self.env.scene)
+        touched = set()
+        for name in names:
+            touched.update(o.name for o in index.find(name))
+        return touched
+
+    def update(self, step: Dict[str, Any]) -> float:
+        """Re-check the conditions affected by an executed plan step (as a dict) and record the fraction."""
+        if not self.enabled:
+            return 0.0
+        op = (step.get("op") or "").upper()
+        named = [step[k] for k in ("target", "object", "receptacle") if step.get(k)]
+        touched = self._touched(named) | self.held
+        if op == "GRASP":
+            self.held |= self._touched(named)
+        elif op in ("PLACE_ON_TOP", "PLACE_INSIDE", "RELEASE"):
+            self.held = set()
+
+        dirty = set(self.always)
+        for name in touched:
+            dirty.update(self.by_object.get(name, ()))
+        with telemetry.span("eval.progress", conditions=len(dirty)):
+            self._evaluate(sorted(dirty))
+        self.curve.append(self.fraction)
+        return self.fraction
@@ -28,3 +28,12 @@ Objects & Receptacles (subset): {catalog}
 Constraints / Notes: {notes}
 
 Return JSON only."""
+
+# Follow-up turn after a failed step. It is appended after the original request (and the previous plan), so
+# the system schema, activity and catalog stay an identical prompt prefix.
+REPLAN_TEMPLATE = """Execution update.
+Completed steps: {executed}
+Failed step: {failed} (reason: {reason})
+Objects whose state changed: {changed}
+
+Return JSON only, with the remaining plan from the current state. Do not repeat completed steps."""
@@ -0,0 +1,72 @@
+import time
+from typing import Any, Dict, List, Optional
+
+from . import telemetry
+from .plan_validation import PlanRejected
+from .prompt_templates import REPLAN_TEMPLATE
+
+# Ops whose object / target changes state when they succeed
+STATE_CHANGING_OPS = {"GRASP", "PLACE_ON_TOP", "PLACE_INSIDE", "OPEN", "CLOSE"}
+
+
+def step_str(step) -> str:
+    """Compact form of a PlanStep, e.g. `PLACE_ON_TOP(apple, table)`."""
+    args = [a for a in (step.target, step.object, step.receptacle) if a]
+    return f"{step.op}({', '.join(args)})"
+
+
+def changed_objects(steps) -> List[str]:
+    names: Dict[str, None] = {}
+    for step in steps:
+        if step.op.upper() in STATE_CHANGING_OPS:
+            for name in (step.target, step.object):
+                if name:
+                    names[name] = None
+    return list(names)
+
+
+def format_delta(executed, failed, reason: str) -> str:
+    return REPLAN_TEMPLATE.format(
+        executed="; ".join(step_str(s) for s in executed) or "None",
+        failed=step_str(failed),
+        reason=reason or "unknown",
+        changed=", ".join(changed_objects(executed)) or "None",
+    )
+
+
+class Replanner:
+    """
+    Closed-loop replanning for one episode: after a failed step, `replan` sends the planner only the
+    execution delta (completed steps, the failed step and the objects they changed) as a follow-up to the
+    original request and returns the remaining plan. At most `max_replans` requests are made per episode.
+    With a `validator`, the returned plan is repaired in the state left by the executed steps; a plan that
+    cannot be repaired ends replanning.
+    """
+    def __init__(self, planner, ctx: Dict[str, Any], max_replans: int = 1, validator=None):
+        self.planner = planner
+        self.ctx = ctx
+        self.max_replans = max_replans
+        self.validator = validator
+        self.latencies: List[float] = []
+
+    @property
+    def replans(self) -> int:
+        return len(self.latencies)
+
+    def replan(self, previous, executed, failed, reason: str) -> Optional[Any]:
+        if self.replans >= self.max_replans:
+            return None
+        delta = format_delta(executed, failed, reason)
+        print(f"[replan] {step_str(failed)} failed ({reason}); requesting the remaining plan")
+        t0 = time.perf_counter()
+        with telemetry.span("replan") as sp:
+            plan = self.planner.replan(previous=previous, delta=delta, **self.ctx)
+            sp.set(steps=len(plan.plan))
+        self.latencies.append(time.perf_counter() - t0)
+        if self.validator is not None:
+            try:
+                plan = self.validator.validate(plan, executed)
+            except PlanRejected as e:
+                print(f"[replan] rejected: {e}")
+                return None
+        return plan
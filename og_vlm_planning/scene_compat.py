@@ -0,0 +1,94 @@
+import contextlib
+import json
+import os
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+try:
+    import fcntl
+except ImportError:  # Windows: writers are not serialized
+    fcntl = None
+
+
+class SceneCompatCache:
+    """
+    Persistent record of which (activity, scene_model, instance) combinations load and sample in OmniGibson,
+    written by `og_env.preflight_scenes` and by `og_env.make_env`. Stored as one JSON file; every write
+    re-reads it and replaces it atomically under an exclusive lock on `<path>.lock`, so runs sharing the
+    file keep each other's entries.
+
+    A combination counts as failing after `max_failures` consecutive failures (a crash unrelated to the scene
+    should not blacklist it), or after one decisive failure (`record(..., decisive=True)`, e.g. a preflight
+    that only loads and samples the task). A failing entry expires `retry_after_s` after its last check. A
+    success resets the count. Delete an entry (or the file) to try a failed combination again sooner.
+    """
+    def __init__(self, path: str, max_failures: int = 2, retry_after_s: float = 7 * 24 * 3600):
+        self.path = path
+        self.max_failures = max_failures
+        self.retry_after_s = retry_after_s
+        self.entries: Dict[str, Dict[str, Any]] = self._read()
+
+    @staticmethod
+    def key(activity: str, scene_model: str, instance_id: int = 0) -> str:
+        return f"{activity}|{scene_model}|{instance_id}"
+
+    def _read(self) -> Dict[str, Dict[str, Any]]:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"[warn] Ignoring unreadable scene cache {self.path}: {e}")
+            return {}
+
+    @contextlib.contextmanager
+    def _locked(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with open(f"{self.path}.lock", "a") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def status(self, activity: str, scene_model: str, instance_id: int = 0) -> Optional[bool]:
+        """True once the combination worked, False while it is failing, None if it is unknown or due a retry."""
+        entry = self.entries.get(self.key(activity, scene_model, instance_id))
+        if entry is None:
+            return None
+        if entry["ok"]:
+            return True
+        if time.time() - entry["checked"] >= self.retry_after_s:
+            return None
+        if not entry.get("decisive") and entry.get("failures", 1) < self.max_failures:
+            return None
+        return False
+
+    def record(self, activity: str, scene_model: str, instance_id: int, ok: bool, error: Optional[str] = None,
+               seconds: Optional[float] = None, mode: str = "full", decisive: bool = False):
+        key = self.key(activity, scene_model, instance_id)
+        entry: Dict[str, Any] = {"ok": ok, "mode": mode, "checked": time.time()}
+        if error:
+            entry["error"] = error[-2000:]
+        if seconds is not None:
+            entry["seconds"] = round(seconds, 3)
+        with self._locked():
+            self.entries = self._read()
+            previous = self.entries.get(key)
+            if not ok:
+                entry["failures"] = 1 + (previous.get("failures", 1) if previous and not previous["ok"] else 0)
+                if decisive:
+                    entry["decisive"] = True
+            self.entries[key] = entry
+            tmp = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self.entries, f, indent=1, sort_keys=True)
+            os.replace(tmp, self.path)
+
+    def order(self, activity: str, candidates: Sequence[str], instance_id: int = 0) -> List[str]:
+        """`candidates` with known-good scenes first and failing scenes removed; the order is kept otherwise."""
+        status = {s: self.status(activity, s, instance_id) for s in candidates}
+        return [s for s in candidates if status[s]] + [s for s in candidates if status[s] is None]
@@ -0,0 +1,178 @@
+import re
+from bisect import bisect_right
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+
+_TOKEN_SPLIT = re.compile(r"[^0-9a-z]+")
+
+
+def normalize_name(name: str) -> str:
+    return name.lower()
+
+
+def name_tokens(name: str) -> List[str]:
+    return [t for t in _TOKEN_SPLIT.split(normalize_name(name)) if t]
+
+
+class SceneObjectIndex:
+    """
+    Name / spatial index over `scene.objects`.
+
+    Names are normalized once when the index is built. Substring queries keep the
+    scene iteration order (same semantics as a linear `name in o.name.lower()` scan),
+    are answered from a single joined string and memoized until the index is rebuilt;
+    whole-token queries are answered from a token -> objects map.
+    The index rebuilds itself when the number of scene objects or the last scene object
+    changes (scenes append new objects, so this also catches a removal followed by an addition).
+    Positions are cached per object in one (N, 3) array and read lazily, only for the objects
+    a query needs; call `invalidate_positions(objects)` after moving objects.
+    """
+    def __init__(self, scene):
+        self.scene = scene
+        self._objects: List = []
+        self._names: List[str] = []
+        self._starts: List[int] = []
+        self._blob = ""
+        self._tokens: Dict[str, List[int]] = {}
+        self._query_cache: Dict[str, List[int]] = {}
+        self._positions = np.zeros((0, 3))
+        self._fresh = np.zeros(0, dtype=bool)
+        self._slots: Dict[int, int] = {}
+        self._signature: Optional[tuple] = None
+        self.rebuild()
+
+    def __len__(self):
+        return len(self._objects)
+
+    @property
+    def objects(self) -> List:
+        self._check_stale()
+        return self._objects
+
+    def rebuild(self):
+        objs = list(self.scene.objects)
+        self._objects = [o for o in objs if hasattr(o, "name")]
+        self._names = [normalize_name(o.name) for o in self._objects]
+
+        # Names joined by a separator that cannot appear in a query, so one str.find
+        # pass answers a substring query without touching every name
+        self._starts = []
+        pos = 0
+        for n in self._names:
+            self._starts.append(pos)
+            pos += len(n) + 1
+        self._blob = "\x00".join(self._names)
+
+        self._tokens = {}
+        for i, n in enumerate(self._names):
+            for t in dict.fromkeys(name_tokens(n)):
+                self._tokens.setdefault(t, []).append(i)
+
+        self._query_cache = {}
+        self._positions = np.zeros((len(self._objects), 3))
+        self._fresh = np.zeros(len(self._objects), dtype=bool)
+        self._slots = {id(o): i for i, o in enumerate(self._objects)}
+        self._signature = self._scene_signature(objs)
+
+    def invalidate(self):
+        """Force a rebuild on next query (objects added or removed)."""
+        self._signature = None
+
+    def invalidate_positions(self, objects: Optional[Iterable] = None):
+        """Drop cached positions of `objects` (default: all objects) after they moved."""
+        if objects is None:
+            self._fresh[:] = False
+            return
+        for o in objects:
+            i = self._slots.get(id(o))
+            if i is not None:
+                self._fresh[i] = False
+
+    @staticmethod
+    def _scene_signature(objs) -> tuple:
+        # The index holds the last object, so its id cannot be reused by a new object
+        return (len(objs), id(objs[-1]) if objs else None)
+
+    def _check_stale(self):
+        if self._signature != self._scene_signature(self.scene.objects):
+            self.rebuild()
+
+    def _match_indices(self, name: str) -> List[int]:
+        q = normalize_name(name)
+        hit = self._query_cache.get(q)
+        if hit is not None:
+            return hit
+        if "\x00" in q:
+            idx = []
+        elif not q:
+            idx = list(range(len(self._names)))
+        else:
+            idx = self._find_all(q)
+        self._query_cache[q] = idx
+        return idx
+
+    def _find_all(self, q: str) -> List[int]:
+        idx = []
+        blob, starts = self._blob, self._starts
+        last = -1
+        i = blob.find(q)
+        while i != -1:
+            k = bisect_right(starts, i) - 1
+            if k != last:
+                idx.append(k)
+                last = k
+            # Skip to the next name once one match in this name is found
+            nxt = starts[k + 1] if k + 1 < len(starts) else len(blob)
+            i = blob.find(q, nxt)
+        return idx
+
+    def find(self, name: str) -> List:
+        """All objects whose name contains `name` (case-insensitive), in scene order."""
+        self._check_stale()
+        return [self._objects[i] for i in self._match_indices(name)]
+
+    def first(self, name: str):
+        self._check_stale()
+        idx = self._match_indices(name)
+        return self._objects[idx[0]] if idx else None
+
+    def find_by_token(self, token: str) -> List:
+        """Objects whose name contains `token` as a whole `_`-separated token."""
+        self._check_stale()
+        return [self._objects[i] for i in self._tokens.get(normalize_name(token), [])]
+
+    def positions(self, idx: Optional[Sequence[int]] = None) -> np.ndarray:
+        """Positions of the objects at `idx` (default: all objects), reading only the stale ones."""
+        self._check_stale()
+        idx = np.arange(len(self._objects)) if idx is None else np.asarray(idx, dtype=int)
+        stale = idx[~self._fresh[idx]]
+        for i in stale:
+            self._positions[i] = np.asarray(self._objects[i].get_position(), dtype=float)[:3]
+        self._fresh[stale] = True
+        return self._positions[idx]
+
+    def nearest(self, name: str, origin):
+        """Match for `name` closest to `origin` (e.g. the robot base position)."""
+        self._check_stale()
+        idx = self._match_indices(name)
+        if not idx:
+            return None
+        if len(idx) == 1:
+            return self._objects[idx[0]]
+        pos = self.positions(idx)
+        d = np.linalg.norm(pos - np.asarray(origin, dtype=float)[:3], axis=1)
+        return self._objects[idx[int(np.argmin(d))]]
+
+
+def get_scene_index(scene) -> SceneObjectIndex:
+    """Shared index for `scene` (one per scene object, stored on the scene)."""
+    index = getattr(scene, "_og_vlm_object_index", None)
+    if index is None:
+        index = SceneObjectIndex(scene)
+        try:
+            setattr(scene, "_og_vlm_object_index", index)
+        except AttributeError:
+            pass
+    return index
@@ -0,0 +1,178 @@
+import asyncio
+import json
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+from . import telemetry
+from .async_utils import BackgroundLoop
+from .executors import TeleportExecutor
+from .hedging import CircuitOpen
+from .og_env import bddl_success_fraction
+from .plan_validation import PlanRejected, PlanValidator
+from .scene_index import get_scene_index
+from .vlm_clients import Plan, aclose_async_clients
+
+# HTTP statuses a provider may answer differently on the next request (timeout, conflict, rate limit, 5xx)
+TRANSIENT_STATUSES = {408, 409, 429}
+
+
+def _connection_errors() -> tuple:
+    errors = [ConnectionError, TimeoutError, asyncio.TimeoutError]
+    try:
+        import httpx
+        errors.append(httpx.TransportError)
+    except ImportError:
+        pass
+    try:
+        import openai
+        errors.append(openai.APIConnectionError)
+    except ImportError:
+        pass
+    return tuple(errors)
+
+
+def is_transient(e: BaseException) -> bool:
+    """
+    Whether a candidate request failed for a reason specific to that request: a connection error or timeout,
+    a rate-limit / server-error status, open circuit breakers, or an unparseable (high-temperature) answer.
+    Anything else (PlanCacheMiss, authentication, bad requests, bugs) would fail every candidate the same way.
+    """
+    if isinstance(e, (CircuitOpen, json.JSONDecodeError) + _connection_errors()):
+        return True
+    if type(e).__name__ == "ValidationError":
+        # pydantic rejected the answer's structure
+        return True
+    status = getattr(e, "status_code", None) or getattr(e, "code", None)
+    return isinstance(status, int) and (status in TRANSIENT_STATUSES or status >= 500)
+
+
+def candidate_temperatures(k: int, base: float, top: float = 1.0) -> List[float]:
+    """`k` sampling temperatures: `base` first, the rest evenly spaced up to `top`."""
+    if k <= 1:
+        return [base]
+    top = max(top, base)
+    return [round(base + (top - base) * i / (k - 1), 3) for i in range(k)]
+
+
+class Speculation:
+    """Outcome of one `Speculator.choose` call; `scores[i]` is None for candidates that were not screened."""
+    def __init__(self, plans: List[Optional[Plan]], temperatures: List[float], scores: List[Optional[float]],
+                 chosen: int, plan_s: float, screen_s: float):
+        self.plans = plans
+        self.temperatures = temperatures
+        self.scores = scores
+        self.chosen = chosen
+        self.plan_s = plan_s
+        self.screen_s = screen_s
+
+    @property
+    def plan(self) -> Plan:
+        return self.plans[self.chosen]
+
+    def avoided_s(self, s_per_step: float) -> float:
+        """
+        Estimated executor time not spent on the base-temperature candidate (what a single request would
+        have executed) because a better-scoring candidate was chosen: its step count times `s_per_step`.
+        """
+        base = self.scores[0]
+        if self.chosen == 0 or base is None or self.scores[self.chosen] <= base:
+            return 0.0
+        return len(self.plans[0].plan) * s_per_step
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "spec_temperatures": self.temperatures,
+            "spec_scores": self.scores,
+            "spec_chosen": self.chosen,
+            "spec_plan_s": self.plan_s,
+            "spec_screen_s": self.screen_s,
+        }
+
+
+class Speculator:
+    """
+    Speculative planning: requests one candidate plan per temperature concurrently, scores each with
+    TeleportExecutor from the episode's initial state (restored from a scene state dump before every
+    candidate) using `bddl_success_fraction`, and returns the best one for the real executor. Ties go to
+    the earlier, lower-temperature candidate; screening stops at the first candidate that satisfies every goal.
+    The scene is left in the initial state. Candidates whose request failed transiently (`is_transient`) are
+    skipped; any other failure, such as PlanCacheMiss in replay mode, is raised.
+    """
+    def __init__(self, temperatures: Sequence[float], settle_steps: int = 1):
+        self.temperatures = list(temperatures)
+        self.settle_steps = settle_steps
+        self._loop: Optional[BackgroundLoop] = None
+
+    def _sample(self, planner, ctx: Dict[str, Any]) -> List[Any]:
+        if self._loop is None:
+            self._loop = BackgroundLoop()
+
+        async def gather():
+            return await asyncio.gather(*(planner.plan_async(temperature=t, **ctx) for t in self.temperatures),
+                                        return_exceptions=True)
+        return self._loop.run(gather())
+
+    def _screen(self, env, plans: List[Optional[Plan]], validator: Optional[PlanValidator]) -> List[Optional[float]]:
+        index = get_scene_index(env.scene)
+        initial = env.scene.dump_state(serialized=True)
+        teleport = TeleportExecutor(env, settle_steps=self.settle_steps)
+        scores: List[Optional[float]] = [None] * len(plans)
+        try:
+            for i, plan in enumerate(plans):
+                if plan is None:
+                    continue
+                if validator is not None:
+                    # A fresh validator, so the episode's validator only records repairs of the executed plan
+                    try:
+                        plan = PlanValidator(validator.catalog, validator.resolves, validator.openable,
+                                             validator.cutoff).validate(plan)
+                    except PlanRejected as e:
+                        print(f"[speculate] candidate {i} rejected: {e}")
+                        continue
+                env.scene.load_state(initial, serialized=True)
+                index.invalidate_positions()
+                with telemetry.span("speculate.candidate", candidate=i):
+                    teleport.execute_plan(plan)
+                    scores[i] = bddl_success_fraction(env)
+                if scores[i] >= 0.999:
+                    break
+        finally:
+            env.scene.load_state(initial, serialized=True)
+            index.invalidate_positions()
+        return scores
+
+    def choose(self, env, planner, ctx: Dict[str, Any], validator: Optional[PlanValidator] = None) -> Speculation:
+        t0 = time.perf_counter()
+        with telemetry.span("speculate.plan", candidates=len(self.temperatures)):
+            answers = self._sample(planner, ctx)
+        plan_s = time.perf_counter() - t0
+        for answer in answers:
+            if isinstance(answer, BaseException) and not is_transient(answer):
+                raise answer
+        plans = []
+        for t, answer in zip(self.temperatures, answers):
+            if isinstance(answer, BaseException):
+                print(f"[warn] candidate plan at temperature {t} failed: {answer}")
+                answer = None
+            plans.append(answer)
+        if all(p is None for p in plans):
+            raise next(a for a in answers if isinstance(a, BaseException))
+
+        t0 = time.perf_counter()
+        with telemetry.span("speculate.screen") as sp:
+            scores = self._screen(env, plans, validator)
+            sp.set(screened=sum(s is not None for s in scores))
+        screen_s = time.perf_counter() - t0
+        screened = [i for i, s in enumerate(scores) if s is not None]
+        if screened:
+            chosen = max(screened, key=lambda i: (scores[i], -i))
+        else:
+            chosen = next(i for i, p in enumerate(plans) if p is not None)
+        print(f"[speculate] scores {scores}; executing candidate {chosen} (temperature {self.temperatures[chosen]})")
+        return Speculation(plans, self.temperatures, scores, chosen, plan_s, screen_s)
+
+    def close(self):
+        if self._loop is not None:
+            self._loop.run(aclose_async_clients())
+            self._loop.close()
+            self._loop = None
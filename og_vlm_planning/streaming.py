@@ -0,0 +1,140 @@
+import asyncio
+import json
+import queue
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+from .async_utils import BackgroundLoop
+
+
+class PlanStreamParser:
+    """
+    Incremental parser for a streamed `{"plan": [...]}` response.
+
+    `feed(chunk)` returns the step objects completed by that chunk: every JSON object directly inside the
+    first array of the document is parsed as soon as its closing brace arrives. `finish()` parses the full
+    text (so a malformed response still fails like a non-streamed one) and returns it as a dict.
+    """
+    def __init__(self):
+        self._text = ""
+        self._pos = 0
+        self._stack: List[str] = []
+        self._in_str = False
+        self._esc = False
+        self._array_depth: Optional[int] = None
+        self._obj_start: Optional[int] = None
+        self.n_steps = 0
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        self._text += chunk
+        text = self._text
+        out = []
+        for i in range(self._pos, len(text)):
+            c = text[i]
+            if self._in_str:
+                if self._esc:
+                    self._esc = False
+                elif c == "\\":
+                    self._esc = True
+                elif c == '"':
+                    self._in_str = False
+                continue
+            if c == '"':
+                self._in_str = True
+            elif c == "[" or c == "{":
+                if c == "{" and self._array_depth is not None and len(self._stack) == self._array_depth:
+                    self._obj_start = i
+                self._stack.append(c)
+                if c == "[" and self._array_depth is None:
+                    self._array_depth = len(self._stack)
+            elif c == "]" or c == "}":
+                if self._stack:
+                    self._stack.pop()
+                if c == "}" and self._obj_start is not None and len(self._stack) == self._array_depth:
+                    out.append(json.loads(text[self._obj_start:i + 1]))
+                    self._obj_start = None
+        self._pos = len(text)
+        self.n_steps += len(out)
+        return out
+
+    @property
+    def text(self) -> str:
+        return self._text
+
+    def finish(self) -> Dict[str, Any]:
+        return json.loads(self._text)
+
+
+_DONE = object()
+
+
+class StepStream:
+    """
+    Runs `planner.plan_stream_async(**ctx)` as a task on an event loop thread and hands the PlanSteps to the
+    caller (the simulator thread) through a queue as soon as each one is complete. Iterating blocks until the
+    next step arrives; errors from the planner are re-raised in the caller. `close()` cancels the task, which
+    closes the HTTP response, so an abandoned stream stops generating output.
+    With a `validator` (plan_validation.PlanValidator), steps are repaired before they are handed over.
+    `loop` (a BackgroundLoop) shares one event loop and its pooled HTTP client across episodes; without it the
+    stream gets its own loop, closed by `close()`.
+    """
+    def __init__(self, planner, ctx: Dict[str, Any], validator=None, loop: Optional[BackgroundLoop] = None):
+        self._queue: "queue.Queue" = queue.Queue()
+        self.steps: List[Any] = []
+        self.t0 = time.perf_counter()
+        self.first_step_s: Optional[float] = None
+        self.plan_s: Optional[float] = None
+        self._validator = validator
+        self._own_loop = loop is None
+        self._loop = BackgroundLoop() if loop is None else loop
+
+        async def start():
+            return asyncio.ensure_future(self._produce(planner, ctx))
+        self._task: asyncio.Task = self._loop.run(start())
+
+    async def _produce(self, planner, ctx):
+        steps = planner.plan_stream_async(**ctx)
+        try:
+            async for step in steps:
+                self._queue.put(step)
+        except Exception as e:
+            self._queue.put(e)
+        finally:
+            await steps.aclose()
+            self.plan_s = time.perf_counter() - self.t0
+            self._queue.put(_DONE)
+
+    def _received(self) -> Iterator[Any]:
+        while True:
+            item = self._queue.get()
+            if item is _DONE:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+
+    def __iter__(self) -> Iterator[Any]:
+        steps = self._received() if self._validator is None else self._validator.stream(self._received())
+        for step in steps:
+            if self.first_step_s is None:
+                self.first_step_s = time.perf_counter() - self.t0
+            self.steps.append(step)
+            yield step
+
+    def close(self):
+        """Cancel the request if it is still streaming and wait until its response is closed."""
+        async def stop():
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        if not self._loop.loop.is_closed():
+            self._loop.run(stop())
+        if self._own_loop:
+            from .vlm_clients import aclose_async_clients
+            self._loop.run(aclose_async_clients())
+            self._loop.close()
+            self._own_loop = False
+
+    @property
+    def plan(self):
+        from .vlm_clients import Plan
+        return Plan(plan=list(self.steps))
@@ -0,0 +1,132 @@
+import itertools
+import json
+import os
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+from .og_env import get_candidate_scene_models, get_compatible_scene_model
+from .scene_compat import SceneCompatCache
+
+
+class Job(NamedTuple):
+    activity: str
+    provider: str
+    model: str
+    executor: str
+    robot: str
+
+    @property
+    def key(self) -> str:
+        return "|".join(self)
+
+
+def expand_grid(activities: Sequence[str], providers: Sequence[str], models: Sequence[str],
+                executors: Sequence[str], robots: Sequence[str]) -> List[Job]:
+    """
+    Cartesian product of the sweep axes. A model written as `provider:model` is only paired with that
+    provider; a bare model name is paired with every provider.
+    """
+    pairs: List[Tuple[str, str]] = []
+    for model in models:
+        if ":" in model:
+            provider, name = model.split(":", 1)
+            pairs.append((provider, name))
+        else:
+            pairs.extend((provider, model) for provider in providers)
+    pairs = list(dict.fromkeys(pairs))
+    return [Job(a, p, m, e, r) for a, (p, m), e, r in itertools.product(activities, pairs, executors, robots)]
+
+
+def scene_for(activity: str, scene_cache: Optional[SceneCompatCache] = None, instance_id: int = 0,
+              loaded: Optional[Dict[str, str]] = None) -> str:
+    """
+    Scene model an activity is loaded into: the scene it already loaded in (`loaded`, activity -> scene
+    model), else its first candidate, as in make_env. With a `scene_cache`, the first candidate known to
+    work, else the first not known to fail.
+    """
+    if loaded and activity in loaded:
+        return loaded[activity]
+    return (get_compatible_scene_model(activity, scene_cache=scene_cache, instance_id=instance_id)
+            or get_candidate_scene_models(activity)[0])
+
+
+def schedule(jobs: Iterable[Job], scene_cache: Optional[SceneCompatCache] = None, instance_id: int = 0,
+             loaded: Optional[Dict[str, str]] = None) -> List[Tuple[str, List[Job]]]:
+    """
+    Group jobs by scene model so every scene is loaded once. Within a group, jobs sharing an activity and
+    robot are adjacent so the environment is reused as is; the grid order is kept otherwise. `loaded` maps
+    activities to the scene they actually loaded in (see scene_for).
+    """
+    groups: Dict[str, List[Job]] = {}
+    for job in jobs:
+        groups.setdefault(scene_for(job.activity, scene_cache, instance_id, loaded), []).append(job)
+    ordered = []
+    for scene, group in groups.items():
+        first_seen = {}
+        for job in group:
+            first_seen.setdefault((job.robot, job.activity), len(first_seen))
+        ordered.append((scene, sorted(group, key=lambda j: first_seen[(j.robot, j.activity)])))
+    return ordered
+
+
+class ResultStore:
+    """
+    Append-only JSONL store of per-episode results. Each record carries the job fields and the episode
+    index; `done(job, episode)` tells a resumed sweep which episodes already finished. Failed episodes are
+    stored too but are retried on resume.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._done: Set[Tuple[str, int]] = set()
+        self.records: List[Dict[str, Any]] = []
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        rec = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A torn last line from an interrupted write
+                        continue
+                    self._add(rec)
+
+    def _add(self, rec: Dict[str, Any]):
+        self.records.append(rec)
+        if not rec.get("failed"):
+            self._done.add((rec["job"], rec["episode"]))
+
+    def done(self, job: Job, episode: int) -> bool:
+        return (job.key, episode) in self._done
+
+    def pending(self, job: Job, episodes: int) -> List[int]:
+        return [ep for ep in range(episodes) if not self.done(job, ep)]
+
+    def append(self, job: Job, episode: int, result: Dict[str, Any], scene_model: Optional[str] = None):
+        rec = dict(result, job=job.key, episode=episode, scene_model=scene_model, **job._asdict())
+        line = json.dumps(rec, default=str) + "\n"
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+        self._add(rec)
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """Per-job success rate and mean BDDL fraction over the latest record of every episode."""
+        latest: Dict[Tuple[str, int], Dict[str, Any]] = {}
+        for rec in self.records:
+            latest[(rec["job"], rec["episode"])] = rec
+        jobs: Dict[str, List[Dict[str, Any]]] = {}
+        for (key, _), rec in sorted(latest.items()):
+            jobs.setdefault(key, []).append(rec)
+        rows = []
+        for key, recs in jobs.items():
+            ok = [r for r in recs if not r.get("failed")]
+            rows.append({
+                **{f: recs[0][f] for f in Job._fields},
+                "scene_model": recs[0].get("scene_model"),
+                "episodes": len(ok),
+                "failed": len(recs) - len(ok),
+                "success_rate": sum(r["bddl_fraction"] >= 0.999 for r in ok) / len(ok) if ok else None,
+                "avg_bddl_fraction": sum(r["bddl_fraction"] for r in ok) / len(ok) if ok else None,
+            })
+        return rows
@@ -0,0 +1,88 @@
+import hashlib
+import json
+import os
+import time
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+
+DEFAULT_SNAPSHOT_DIR = os.path.join(os.path.expanduser("~"), ".cache", "og_vlm", "task_snapshots")
+
+
+class TaskSnapshot:
+    """
+    On-disk snapshot of a sampled BEHAVIOR task instance for one (activity, scene_model, robot, instance id).
+    The robot part of the key is the robot type plus a hash of its config (controllers, action type); the
+    observation modalities do not change the sampled state and are left out.
+
+    Two files per instance:
+        scene.json  the scene saved by `og.sim.save` after online sampling, including the sampled
+                    task objects; loading it with `online_object_sampling=False` skips sampling
+        state.npz   the serialized scene state (object poses, joint states, object states), restored
+                    in place on every episode reset
+    """
+    def __init__(self, root: str, activity: str, scene_model: str, instance_id: int = 0, robot: str = "R1Pro",
+                 robot_config: Optional[Dict[str, Any]] = None):
+        self.root = root
+        self.activity = activity
+        self.scene_model = scene_model
+        self.instance_id = int(instance_id)
+        self.robot = robot
+        self.robot_config = {k: v for k, v in (robot_config or {}).items() if k != "obs_modalities"}
+        self.robot_key = f"{robot}_{self.config_hash(self.robot_config)}"
+        self.dir = os.path.join(root, activity, scene_model, self.robot_key, f"instance_{self.instance_id}")
+        self.scene_file = os.path.join(self.dir, "scene.json")
+        self.state_file = os.path.join(self.dir, "state.npz")
+        self.meta_file = os.path.join(self.dir, "meta.json")
+
+    @staticmethod
+    def config_hash(config: Dict[str, Any]) -> str:
+        blob = json.dumps(config, sort_keys=True, default=str)
+        return hashlib.sha256(blob.encode("utf-8")).hexdigest()[:12]
+
+    def exists(self) -> bool:
+        return os.path.exists(self.scene_file) and os.path.exists(self.state_file)
+
+    def save(self, env):
+        import omnigibson as og
+
+        os.makedirs(self.dir, exist_ok=True)
+        og.sim.save(json_paths=[self.scene_file])
+        raw = env.scene.dump_state(serialized=True)
+        # Newer OmniGibson versions serialize to torch tensors; remember which to hand back
+        backend = "torch" if type(raw).__module__.startswith("torch") else "numpy"
+        state = raw.cpu().numpy() if backend == "torch" else np.asarray(raw)
+        np.savez_compressed(self.state_file, state=state, backend=backend)
+        with open(self.meta_file, "w", encoding="utf-8") as f:
+            json.dump({
+                "activity": self.activity,
+                "scene_model": self.scene_model,
+                "instance_id": self.instance_id,
+                "robot": self.robot,
+                "robot_config": self.robot_config,
+                "created": time.time(),
+                "state_size": int(state.size),
+            }, f)
+
+    def load_state(self):
+        with np.load(self.state_file) as data:
+            state = data["state"]
+            backend = str(data["backend"]) if "backend" in data else "numpy"
+        if backend == "torch":
+            import torch as th
+            return th.from_numpy(state)
+        return state
+
+
+def attach_initial_state(env, state):
+    env._og_vlm_initial_state = state
+
+
+def restore_initial_state(env) -> bool:
+    """Load the attached snapshot state into the scene in place. Returns False if none is attached."""
+    state = getattr(env, "_og_vlm_initial_state", None)
+    if state is None:
+        return False
+    env.scene.load_state(state, serialized=True)
+    return True
@@ -0,0 +1,235 @@
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Set
+
+
+class _NullSpan:
+    """Shared no-op span returned while tracing is disabled."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "attrs", "t0")
+
+    def __init__(self, tracer: "Tracer", name: str, attrs: Dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.attrs = attrs
+        self.t0 = 0
+
+    def __enter__(self):
+        self.t0 = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        t1 = time.perf_counter_ns()
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        self.tracer._records.append({
+            "type": "span",
+            "name": self.name,
+            "ts_us": (self.t0 - self.tracer._origin_ns) / 1e3,
+            "dur_us": (t1 - self.t0) / 1e3,
+            "pid": self.tracer.pid,
+            "tid": threading.get_ident(),
+            "attrs": self.attrs,
+        })
+        return False
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+
+class Tracer:
+    """
+    Minimal span recorder.
+
+    `span(name, **attrs)` is a context manager timing a block; `event(name, **attrs)` records a point
+    event (e.g. VLM token usage). While disabled both return immediately. Records are kept in memory
+    and written with `write_jsonl` / `write_chrome_trace` (chrome://tracing, Perfetto).
+    """
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.pid = os.getpid()
+        self._origin_ns = time.perf_counter_ns()
+        self._wall_origin = time.time()
+        self._records: List[Dict[str, Any]] = []
+        # Files this process has written its meta line to
+        self._anchored: Set[str] = set()
+
+    def span(self, name: str, **attrs):
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, attrs)
+
+    def event(self, name: str, **attrs):
+        if not self.enabled:
+            return
+        self._records.append({
+            "type": "event",
+            "name": name,
+            "ts_us": (time.perf_counter_ns() - self._origin_ns) / 1e3,
+            "pid": self.pid,
+            "tid": threading.get_ident(),
+            "attrs": attrs,
+        })
+
+    @property
+    def records(self) -> List[Dict[str, Any]]:
+        return list(self._records)
+
+    def clear(self):
+        self._records = []
+
+    def _meta(self) -> str:
+        # Wall-clock time of ts_us == 0 in this process
+        return json.dumps({"type": "meta", "pid": self.pid, "wall_origin": self._wall_origin}) + "\n"
+
+    def write_jsonl(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self._meta())
+            for r in self._records:
+                f.write(json.dumps(r, default=str) + "\n")
+
+    def flush_jsonl(self, path: str):
+        """
+        Append the records collected so far to `path` and drop them from memory. The first flush of this
+        process to a (new) file writes its meta line first.
+        """
+        records, self._records = self._records, []
+        with open(path, "a", encoding="utf-8") as f:
+            if path not in self._anchored or f.tell() == 0:
+                f.write(self._meta())
+                self._anchored.add(path)
+            for r in records:
+                f.write(json.dumps(r, default=str) + "\n")
+
+    def write_chrome_trace(self, path: str):
+        write_chrome_trace(self._records, path)
+
+
+def load_jsonl(path: str) -> List[Dict[str, Any]]:
+    """
+    Records of a `write_jsonl` / `flush_jsonl` file. Timestamps of processes with a meta line are shifted onto
+    the wall clock (microseconds since the epoch), so records of different processes can be merged.
+    """
+    origins: Dict[int, float] = {}
+    records = []
+    with open(path, "r", encoding="utf-8") as f:
+        for r in (json.loads(line) for line in f if line.strip()):
+            if r.get("type") == "meta":
+                origins[r["pid"]] = r["wall_origin"] * 1e6
+                continue
+            if r.get("pid") in origins:
+                r["ts_us"] += origins[r["pid"]]
+            records.append(r)
+    return records
+
+
+def write_chrome_trace(records: Iterable[Dict[str, Any]], path: str):
+    """Chrome trace of `records`, with the earliest one at time 0."""
+    records = list(records)
+    t0 = min((r["ts_us"] for r in records), default=0)
+    events = []
+    for r in records:
+        e = {"name": r["name"], "ts": r["ts_us"] - t0, "pid": r["pid"], "tid": r["tid"], "args": r.get("attrs", {})}
+        if r["type"] == "span":
+            e.update(ph="X", dur=r["dur_us"])
+        else:
+            e.update(ph="i", s="t")
+        events.append(e)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f, default=str)
+
+
+# Numeric attributes that identify a span rather than measure it
+_ID_ATTRS = {"episode", "worker", "context", "candidate", "pid", "tid"}
+
+
+def _percentile(sorted_vals: List[float], q: float) -> float:
+    if not sorted_vals:
+        return 0.0
+    k = (len(sorted_vals) - 1) * q
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_vals) - 1)
+    return sorted_vals[lo] + (sorted_vals[hi] - sorted_vals[lo]) * (k - lo)
+
+
+def summarize(records: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Per-span-name count / p50 / p95 / total (ms) and per-name sums of numeric attributes
+    (e.g. token counts on "vlm.request" spans, or event payloads).
+    """
+    durs: Dict[str, List[float]] = {}
+    totals: Dict[str, Dict[str, float]] = {}
+    for r in records:
+        if r["type"] == "span":
+            durs.setdefault(r["name"], []).append(r["dur_us"] / 1e3)
+        numeric = {k: v for k, v in r.get("attrs", {}).items()
+                   if isinstance(v, (int, float)) and not isinstance(v, bool) and k not in _ID_ATTRS}
+        if r["type"] == "event" or numeric:
+            acc = totals.setdefault(r["name"], {"count": 0})
+            acc["count"] += 1
+            for k, v in numeric.items():
+                acc[k] = acc.get(k, 0) + v
+    spans = {}
+    for name, vals in sorted(durs.items()):
+        vals.sort()
+        spans[name] = {
+            "count": len(vals),
+            "p50_ms": round(_percentile(vals, 0.5), 3),
+            "p95_ms": round(_percentile(vals, 0.95), 3),
+            "total_ms": round(sum(vals), 3),
+        }
+    return {"spans": spans, "totals": totals}
+
+
+def format_summary(summary: Dict[str, Any]) -> str:
+    lines = [f"{'stage':<28}{'count':>8}{'p50 ms':>12}{'p95 ms':>12}{'total ms':>14}"]
+    for name, s in summary["spans"].items():
+        lines.append(f"{name:<28}{s['count']:>8}{s['p50_ms']:>12.2f}{s['p95_ms']:>12.2f}{s['total_ms']:>14.1f}")
+    for name, acc in summary["totals"].items():
+        fields = ", ".join(f"{k}={v:g}" for k, v in acc.items())
+        lines.append(f"{name}: {fields}")
+    return "\n".join(lines)
+
+
+_tracer = Tracer(enabled=False)
+
+
+def get_tracer() -> Tracer:
+    return _tracer
+
+
+def configure(enabled: bool = True) -> Tracer:
+    """Enable or disable the process-wide tracer (records are kept)."""
+    _tracer.enabled = enabled
+    if _tracer.pid != os.getpid():
+        # A forked child: its records need their own meta lines
+        _tracer.pid = os.getpid()
+        _tracer._anchored = set()
+    return _tracer
+
+
+def span(name: str, **attrs):
+    return _tracer.span(name, **attrs) if _tracer.enabled else _NULL_SPAN
+
+
+def event(name: str, **attrs):
+    if _tracer.enabled:
+        _tracer.event(name, **attrs)
+
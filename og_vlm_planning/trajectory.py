@@ -0,0 +1,350 @@
+import glob
+import json
+import os
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from . import telemetry
+from .progress import _scope_name
+
+# Per-object state columns: position, orientation quaternion (xyzw), AABB min / max corners
+POS, QUAT, AABB_LO, AABB_HI = slice(0, 3), slice(3, 7), slice(7, 10), slice(10, 13)
+STATE_DIM = 13
+INDEX_FILE = "index.json"
+INDEX_VERSION = 1
+
+
+def _row_dtype(n_objects: int) -> np.dtype:
+    return np.dtype([("env_step", "<i8"), ("plan_step", "<i4"), ("state", "<f4", (n_objects, STATE_DIM))])
+
+
+def _goal_tree(cond) -> Dict[str, Any]:
+    return {
+        "type": type(cond).__name__,
+        "input": [t for t in (getattr(cond, "input", None) or ()) if isinstance(t, str)],
+        "children": [_goal_tree(c) for c in (getattr(cond, "children", None) or ())],
+    }
+
+
+def _to_json(value):
+    return json.loads(json.dumps(value, default=str))
+
+
+class TrajectoryRecorder:
+    """
+    Writes one episode to `root/`: per-row object states and subsampled RGB frames in fixed-size chunks of
+    memory-mapped .npy files, plus a small `index.json` (object names, goal structure, the executed
+    PlanSteps with their ExecutionResults, chunk list).
+
+    A row (robot + tracked object poses and AABBs) is written at the start, after every plan step and every
+    `sample_every` simulator steps inside a primitive (via `PrimitiveExecutor.step_hook`). Rows and frames
+    are copied straight into the open chunk; a full chunk is flushed and unmapped before the next one is
+    created, so memory stays bounded by one chunk of each kind however long the episode runs.
+    Tracked objects are the task's object scope and the robot (`objects="scope"`) or every scene object.
+    """
+    def __init__(self, root: str, env, episode: int = 0, activity: str = "", sample_every: int = 10,
+                 frame_every: int = 1, frame_stride: int = 4, objects: str = "scope", chunk_rows: int = 256,
+                 frame_chunk: int = 32):
+        os.makedirs(root, exist_ok=True)
+        for stale in glob.glob(os.path.join(root, "*.npy")):
+            os.remove(stale)
+        self.root = root
+        self.env = env
+        self.sample_every = max(1, sample_every)
+        self.frame_every = frame_every
+        self.frame_stride = max(1, frame_stride)
+        self.chunk_rows = chunk_rows
+        self.frame_chunk = frame_chunk
+        self.objects = self._tracked(env, objects)
+        self._has_orientation = all(hasattr(o, "get_orientation") for o in self.objects)
+        self.dtype = _row_dtype(len(self.objects))
+        self.env_steps = 0
+        self.plan_step = -1
+        self._since_sample = 0
+        self._rows: Optional[np.memmap] = None
+        self._frames: Optional[np.memmap] = None
+        task = getattr(env, "task", None)
+        scope = getattr(task, "object_scope", None) or {}
+        robot = env.robots[0] if getattr(env, "robots", None) else None
+        self.index: Dict[str, Any] = {
+            "version": INDEX_VERSION,
+            "episode": episode,
+            "activity": activity,
+            "objects": [o.name for o in self.objects],
+            "robot": self.objects.index(robot) if robot in self.objects else None,
+            "scope": {inst: _scope_name(ent) for inst, ent in scope.items()},
+            "goals": [_goal_tree(c) for c in (getattr(task, "activity_goal_conditions", None) or [])],
+            "chunk_rows": chunk_rows,
+            "rows": 0,
+            "row_chunks": [],
+            "frame_chunk": frame_chunk,
+            "frame_shape": None,
+            "frames": 0,
+            "frame_rows": [],
+            "frame_chunks": [],
+            "steps": [],
+            "result": None,
+        }
+        self._sample()
+        if frame_every > 0:
+            self._frame()
+
+    @staticmethod
+    def _tracked(env, objects: str) -> List:
+        if objects == "all":
+            return list(env.scene.objects)
+        robots = list(getattr(env, "robots", None) or [])
+        scope = getattr(getattr(env, "task", None), "object_scope", None) or {}
+        tracked = {id(o): o for o in robots}
+        for ent in scope.values():
+            obj = getattr(ent, "wrapped_obj", ent)
+            if obj is not None and hasattr(obj, "get_position"):
+                tracked.setdefault(id(obj), obj)
+        return list(tracked.values()) or list(env.scene.objects)
+
+    def _open(self, kind: str, dtype, shape) -> np.memmap:
+        k = len(self.index[f"{kind}_chunks"])
+        name = f"{kind}.{k:05d}.npy"
+        self.index[f"{kind}_chunks"].append(name)
+        return np.lib.format.open_memmap(os.path.join(self.root, name), mode="w+", dtype=dtype, shape=shape)
+
+    def _sample(self):
+        n = self.index["rows"]
+        if n % self.chunk_rows == 0:
+            self._release("_rows")
+            self._rows = self._open("row", self.dtype, (self.chunk_rows,))
+            self._write_index()
+        row = self._rows[n % self.chunk_rows]
+        row["env_step"] = self.env_steps
+        row["plan_step"] = self.plan_step
+        state = row["state"]
+        # One conversion per field rather than per object
+        objs = self.objects
+        state[:, POS] = np.asarray([o.get_position() for o in objs], dtype=np.float32)[:, :3]
+        if self._has_orientation:
+            state[:, QUAT] = np.asarray([o.get_orientation() for o in objs], dtype=np.float32)[:, :4]
+        else:
+            state[:, QUAT] = (0.0, 0.0, 0.0, 1.0)
+        aabbs = np.asarray([o.aabb for o in objs], dtype=np.float32)
+        state[:, AABB_LO] = aabbs[:, 0, :3]
+        state[:, AABB_HI] = aabbs[:, 1, :3]
+        self.index["rows"] = n + 1
+        self._since_sample = 0
+
+    def _frame(self):
+        from .og_env import get_camera_frames
+        frames = get_camera_frames(self.env)
+        if frames is None or "rgb" not in frames:
+            return
+        s = self.frame_stride
+        rgb = np.asarray(frames["rgb"])[::s, ::s, :3]
+        if self.index["frame_shape"] is None:
+            self.index["frame_shape"] = list(rgb.shape)
+        elif list(rgb.shape) != self.index["frame_shape"]:
+            return
+        n = self.index["frames"]
+        if n % self.frame_chunk == 0:
+            self._release("_frames")
+            self._frames = self._open("frame", np.uint8, (self.frame_chunk, *rgb.shape))
+        self._frames[n % self.frame_chunk] = rgb
+        self.index["frames"] = n + 1
+        self.index["frame_rows"].append(self.index["rows"] - 1)
+
+    def _release(self, attr: str):
+        chunk = getattr(self, attr)
+        if chunk is not None:
+            chunk.flush()
+            setattr(self, attr, None)
+
+    def _write_index(self):
+        tmp = os.path.join(self.root, INDEX_FILE + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.index, f)
+        os.replace(tmp, os.path.join(self.root, INDEX_FILE))
+
+    def on_env_step(self):
+        self.env_steps += 1
+        self._since_sample += 1
+        if self._since_sample >= self.sample_every:
+            self._sample()
+
+    def step(self, step, res, progress=None, batched: bool = False):
+        """Record an executed PlanStep and its ExecutionResult (None for an unknown op)."""
+        with telemetry.span("record.step"):
+            self.plan_step += 1
+            self._sample()
+            rec = {
+                "plan_step": step.dict(exclude_none=True),
+                "success": None if res is None else bool(res.success),
+                "info": None if res is None else _to_json(res.info),
+                "row": self.index["rows"] - 1,
+                "env_step": self.env_steps,
+                "frame": None,
+                "goals": list(progress.satisfied) if progress is not None and progress.satisfied else None,
+                "batched": batched,
+            }
+            if self.frame_every > 0 and self.plan_step % self.frame_every == 0:
+                before = self.index["frames"]
+                self._frame()
+                if self.index["frames"] > before:
+                    rec["frame"] = before
+            self.index["steps"].append(rec)
+
+    def close(self, **result):
+        self._release("_rows")
+        self._release("_frames")
+        self.index["result"] = _to_json(result) if result else None
+        self._write_index()
+
+
+# Offline approximations of BDDL's kinematic predicates from recorded AABBs
+def _ontop(a, b, below: float = 0.05, above: float = 0.1) -> bool:
+    c = (a[AABB_LO] + a[AABB_HI]) / 2
+    return bool(b[AABB_LO][0] <= c[0] <= b[AABB_HI][0] and b[AABB_LO][1] <= c[1] <= b[AABB_HI][1]
+                and b[AABB_HI][2] - below <= a[AABB_LO][2] <= b[AABB_HI][2] + above)
+
+
+def _inside(a, b) -> bool:
+    c = (a[AABB_LO] + a[AABB_HI]) / 2
+    return bool(np.all(b[AABB_LO] <= c) and np.all(c <= b[AABB_HI]))
+
+
+def _under(a, b, tol: float = 0.05) -> bool:
+    c = (a[AABB_LO] + a[AABB_HI]) / 2
+    return bool(b[AABB_LO][0] <= c[0] <= b[AABB_HI][0] and b[AABB_LO][1] <= c[1] <= b[AABB_HI][1]
+                and a[AABB_HI][2] <= b[AABB_LO][2] + tol)
+
+
+def _nextto(a, b, gap: float = 0.1) -> bool:
+    d = np.maximum(0.0, np.maximum(a[AABB_LO] - b[AABB_HI], b[AABB_LO] - a[AABB_HI]))
+    return bool(np.linalg.norm(d) <= gap)
+
+
+PREDICATES = {"ontop": _ontop, "inside": _inside, "under": _under, "nextto": _nextto}
+
+
+class TrajectoryReader:
+    """
+    Reads a recorded episode without the simulator: chunks are memory-mapped read-only on demand.
+    `rescore()` recomputes the progress curve and episode metrics offline.
+    """
+    def __init__(self, root: str):
+        self.root = root
+        with open(os.path.join(root, INDEX_FILE), "r", encoding="utf-8") as f:
+            self.index = json.load(f)
+        self.objects: List[str] = self.index["objects"]
+        self.steps: List[Dict[str, Any]] = self.index["steps"]
+        self._columns = {name: i for i, name in enumerate(self.objects)}
+        self._chunks: Dict[str, np.ndarray] = {}
+
+    def __len__(self):
+        return self.index["rows"]
+
+    def _chunk(self, name: str) -> np.ndarray:
+        if name not in self._chunks:
+            self._chunks[name] = np.load(os.path.join(self.root, name), mmap_mode="r")
+        return self._chunks[name]
+
+    def row(self, r: int):
+        """Row `r` as a record with `env_step`, `plan_step` and `state` (n_objects, 13) fields (a view)."""
+        if not 0 <= r < len(self):
+            raise IndexError(r)
+        n = self.index["chunk_rows"]
+        return self._chunk(self.index["row_chunks"][r // n])[r % n]
+
+    def rows(self) -> Iterator[Tuple[int, Any]]:
+        for r in range(len(self)):
+            yield r, self.row(r)
+
+    def frame(self, i: int) -> np.ndarray:
+        if not 0 <= i < self.index["frames"]:
+            raise IndexError(i)
+        n = self.index["frame_chunk"]
+        return self._chunk(self.index["frame_chunks"][i // n])[i % n]
+
+    def positions(self, name: str) -> np.ndarray:
+        """(rows, 3) position track of one object."""
+        col = self._columns[name]
+        n, total = self.index["chunk_rows"], len(self)
+        parts = []
+        for k, chunk in enumerate(self.index["row_chunks"]):
+            rows = min(n, total - k * n)
+            parts.append(np.asarray(self._chunk(chunk)["state"][:rows, col, POS]))
+        return np.concatenate(parts) if parts else np.zeros((0, 3), dtype=np.float32)
+
+    def _eval(self, node: Dict[str, Any], state: np.ndarray) -> Optional[bool]:
+        kind = node["type"].lower().replace("_", "")
+        children = node["children"]
+        if children:
+            vals = [self._eval(c, state) for c in children]
+            if any(v is None for v in vals):
+                return None
+            if "disjunction" in kind or kind == "or":
+                return any(vals)
+            if "negation" in kind or kind == "not":
+                return not vals[0]
+            if "conjunction" in kind or kind in ("and", "head"):
+                return all(vals)
+            return None
+        pred = next((fn for key, fn in PREDICATES.items() if key in kind), None)
+        if pred is None or len(node["input"]) != 2:
+            return None
+        cols = []
+        for inst in node["input"]:
+            name = self.index["scope"].get(inst)
+            if name not in self._columns:
+                return None
+            cols.append(self._columns[name])
+        return pred(state[cols[0]], state[cols[1]])
+
+    def goals_at(self, r: int) -> List[Optional[bool]]:
+        """Offline truth value of every goal condition at row `r` (None where it cannot be evaluated)."""
+        state = np.asarray(self.row(r)["state"])
+        return [self._eval(g, state) for g in self.index["goals"]]
+
+    def rescore(self) -> Dict[str, Any]:
+        """
+        Recompute progress and metrics from the recording: per-step goal fraction (offline geometry, with
+        the recorded online value for goals that cannot be evaluated offline), the step at which all goals
+        first held and how many simulator steps ran after it, and per-op success counts.
+        """
+        curve, done_at = [], None
+        for i, s in enumerate(self.steps):
+            vals = self.goals_at(s["row"])
+            recorded = s.get("goals")
+            if recorded is not None:
+                vals = [rec if v is None else v for v, rec in zip(vals, recorded)]
+            known = [v for v in vals if v is not None]
+            frac = sum(known) / len(known) if known else None
+            curve.append(frac)
+            if done_at is None and known and len(known) == len(vals) and all(known):
+                done_at = i
+        final = self.goals_at(len(self) - 1) if len(self) else []
+        known = [v for v in final if v is not None]
+        env_steps = int(self.row(len(self) - 1)["env_step"]) if len(self) else 0
+        ops: Dict[str, Dict[str, int]] = {}
+        for s in self.steps:
+            acc = ops.setdefault(s["plan_step"].get("op", "?"), {"n": 0, "ok": 0})
+            acc["n"] += 1
+            acc["ok"] += bool(s["success"])
+        result = self.index.get("result") or {}
+        return {
+            "episode": self.index["episode"],
+            "steps": len(self.steps),
+            "env_steps": env_steps,
+            "ops": ops,
+            "progress": curve,
+            "final_fraction": sum(known) / len(known) if known else None,
+            "goals_evaluable": len(known),
+            "goals": len(final),
+            "bddl_fraction": result.get("bddl_fraction"),
+            "goals_done_at_step": done_at,
+            "env_steps_after_done": None if done_at is None else env_steps - self.steps[done_at]["env_step"],
+        }
+
+
+def load_trajectories(root: str) -> List[TrajectoryReader]:
+    """Readers for every recorded episode under `root` (directories containing an index.json)."""
+    paths = sorted(glob.glob(os.path.join(root, "**", INDEX_FILE), recursive=True))
+    return [TrajectoryReader(os.path.dirname(p)) for p in paths]
@@ -1,10 +1,17 @@
+import asyncio
+import hashlib
 import json
 import os
-from typing import List, Optional, Tuple, Any
+import weakref
+import time
+from typing import AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple, Any
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
 
+from . import telemetry
+from .plan_cache import PlanCache
 from .prompt_templates import SYSTEM_TEMPLATE, USER_TEMPLATE
+from .streaming import PlanStreamParser
 
 
 class PlanStep(BaseModel):
@@ -16,22 +23,212 @@ class PlanStep(BaseModel):
 
 class Plan(BaseModel):
     plan: List[PlanStep] = Field(default_factory=list)
+    # Provider response that produced the plan (OpenAI); lets `replan` continue the same conversation
+    response_id: Optional[str] = None
+    _from_cache: bool = PrivateAttr(default=False)
+
+    @property
+    def from_cache(self) -> bool:
+        """Whether the plan was served from the PlanCache instead of the provider."""
+        return self._from_cache
+
+
+def _cached_plan(cached: dict) -> Plan:
+    plan = Plan(**cached)
+    plan._from_cache = True
+    return plan
 
 
 def _build_prompt(activity: str, catalog: List[str], notes: str) -> Tuple[str, str]:
+    # The catalog arrives ranked and budgeted (see catalog.CatalogBuilder); keep its order
     system = SYSTEM_TEMPLATE
-    user = USER_TEMPLATE.format(activity=activity, catalog=", ".join(sorted(set(catalog))[:40]), notes=notes or "None")
+    user = USER_TEMPLATE.format(activity=activity, catalog=", ".join(dict.fromkeys(catalog)), notes=notes or "None")
     return system, user
 
 
-def _attach_image_openai(content: List[dict], image_b64: Optional[str]):
+def _prompt_cache_key(activity: str, catalog: List[str]) -> str:
+    # Identifies the stable prompt prefix (schema, activity, catalog) so requests sharing it hit the same cache
+    prefix = "\n".join([SYSTEM_TEMPLATE, activity, *dict.fromkeys(catalog)])
+    return "ogvlm-" + hashlib.sha256(prefix.encode("utf-8")).hexdigest()[:32]
+
+
+def _add_usage(totals: Dict[str, Dict[str, int]], kind: str, usage: dict):
+    row = totals.setdefault(kind, {"requests": 0, "input_tokens": 0, "output_tokens": 0, "cached_tokens": 0})
+    row["requests"] += 1
+    for k, v in usage.items():
+        row[k] = row.get(k, 0) + v
+
+
+def _openai_usage(resp) -> dict:
+    usage = getattr(resp, "usage", None)
+    if usage is None:
+        return {}
+    details = getattr(usage, "input_tokens_details", None)
+    return {
+        "input_tokens": getattr(usage, "input_tokens", 0) or 0,
+        "output_tokens": getattr(usage, "output_tokens", 0) or 0,
+        "cached_tokens": getattr(details, "cached_tokens", 0) or 0,
+    }
+
+
+def _gemini_usage(resp) -> dict:
+    usage = getattr(resp, "usage_metadata", None)
+    if usage is None:
+        return {}
+    return {
+        "input_tokens": getattr(usage, "prompt_token_count", 0) or 0,
+        "output_tokens": getattr(usage, "candidates_token_count", 0) or 0,
+        "cached_tokens": getattr(usage, "cached_content_token_count", 0) or 0,
+    }
+
+
+def _plan_json(plan: Plan) -> str:
+    # The plan as the assistant turn of a follow-up request
+    return plan.json(exclude={"response_id"}, exclude_none=True)
+
+
+def _parse_plan(txt: str) -> Plan:
+    data = json.loads(txt)
+    return Plan(**data)
+
+
+def _through_cache(cache: Optional[PlanCache], provider: str, model: str, temperature: float,
+                   system: str, user: str, image_b64: Optional[str], request: Callable[[], "Plan"]) -> "Plan":
+    if cache is None:
+        return request()
+    key = PlanCache.make_key(provider, model, temperature, system, user, image_b64)
+    cached = cache.lookup(key)
+    if cached is not None:
+        telemetry.event("vlm.cache_hit", provider=provider, model=model)
+        return _cached_plan(cached)
+    plan = request()
+    cache.put(key, plan.dict(exclude={"response_id"}),
+              meta={"provider": provider, "model": model, "temperature": temperature})
+    return plan
+
+
+async def _through_cache_async(cache: Optional[PlanCache], provider: str, model: str, temperature: float,
+                               system: str, user: str, image_b64: Optional[str],
+                               request: Callable[[], Awaitable["Plan"]]) -> "Plan":
+    if cache is None:
+        return await request()
+    key = PlanCache.make_key(provider, model, temperature, system, user, image_b64)
+    cached = cache.lookup(key)
+    if cached is not None:
+        telemetry.event("vlm.cache_hit", provider=provider, model=model)
+        return _cached_plan(cached)
+    plan = await request()
+    cache.put(key, plan.dict(exclude={"response_id"}),
+              meta={"provider": provider, "model": model, "temperature": temperature})
+    return plan
+
+
+def _stream_through_cache(cache: Optional[PlanCache], provider: str, model: str, temperature: float,
+                          system: str, user: str, image_b64: Optional[str],
+                          chunks: Callable[[dict], Iterator[str]]) -> Iterator[PlanStep]:
+    """
+    Yield PlanSteps as they complete in the streamed response text from `chunks(usage)`, which fills
+    `usage` when the provider reports it. A cache hit yields the stored plan; a fully received plan is
+    stored.
+    """
+    key = None
+    if cache is not None:
+        key = PlanCache.make_key(provider, model, temperature, system, user, image_b64)
+        cached = cache.lookup(key)
+        if cached is not None:
+            telemetry.event("vlm.cache_hit", provider=provider, model=model)
+            yield from Plan(**cached).plan
+            return
+    parser = PlanStreamParser()
+    usage: dict = {}
+    t0 = time.perf_counter()
+    with telemetry.span("vlm.stream", provider=provider, model=model) as sp:
+        for chunk in chunks(usage):
+            for step in parser.feed(chunk):
+                if parser.n_steps == 1:
+                    sp.set(first_step_ms=round((time.perf_counter() - t0) * 1e3, 2))
+                yield PlanStep(**step)
+        sp.set(steps=parser.n_steps, **usage)
+    plan = Plan(**parser.finish())
+    # Steps the incremental parser could not see (unexpected layout) are emitted from the full parse
+    yield from plan.plan[parser.n_steps:]
+    if cache is not None:
+        cache.put(key, plan.dict(exclude={"response_id"}),
+              meta={"provider": provider, "model": model, "temperature": temperature})
+
+
+async def _stream_through_cache_async(cache: Optional[PlanCache], provider: str, model: str, temperature: float,
+                                      system: str, user: str, image_b64: Optional[str],
+                                      chunks: Callable[[dict], AsyncIterator[str]]) -> AsyncIterator[PlanStep]:
+    """Async `_stream_through_cache`; cancelling the consuming task closes the response."""
+    key = None
+    if cache is not None:
+        key = PlanCache.make_key(provider, model, temperature, system, user, image_b64)
+        cached = cache.lookup(key)
+        if cached is not None:
+            telemetry.event("vlm.cache_hit", provider=provider, model=model)
+            for step in Plan(**cached).plan:
+                yield step
+            return
+    parser = PlanStreamParser()
+    usage: dict = {}
+    t0 = time.perf_counter()
+    with telemetry.span("vlm.stream", provider=provider, model=model) as sp:
+        async for chunk in chunks(usage):
+            for step in parser.feed(chunk):
+                if parser.n_steps == 1:
+                    sp.set(first_step_ms=round((time.perf_counter() - t0) * 1e3, 2))
+                yield PlanStep(**step)
+        sp.set(steps=parser.n_steps, **usage)
+    plan = Plan(**parser.finish())
+    for step in plan.plan[parser.n_steps:]:
+        yield step
+    if cache is not None:
+        cache.put(key, plan.dict(exclude={"response_id"}),
+                  meta={"provider": provider, "model": model, "temperature": temperature})
+
+
+# Async requests share one pooled HTTP client and one concurrency limit per event loop
+ASYNC_MAX_CONCURRENCY = 8
+ASYNC_HTTP_TIMEOUT_S = 120.0
+_ASYNC_RESOURCES = weakref.WeakKeyDictionary()
+
+
+def set_async_concurrency(n: int):
+    """Set the max number of in-flight async planner requests (applies to loops created afterwards)."""
+    global ASYNC_MAX_CONCURRENCY
+    ASYNC_MAX_CONCURRENCY = max(1, int(n))
+
+
+def _async_resources():
+    loop = asyncio.get_running_loop()
+    res = _ASYNC_RESOURCES.get(loop)
+    if res is None:
+        import httpx
+        http_client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=ASYNC_MAX_CONCURRENCY, max_keepalive_connections=ASYNC_MAX_CONCURRENCY),
+            timeout=ASYNC_HTTP_TIMEOUT_S,
+        )
+        res = {"http": http_client, "sem": asyncio.Semaphore(ASYNC_MAX_CONCURRENCY)}
+        _ASYNC_RESOURCES[loop] = res
+    return res
+
+
+async def aclose_async_clients():
+    """Close the pooled HTTP client of the running loop."""
+    res = _ASYNC_RESOURCES.pop(asyncio.get_running_loop(), None)
+    if res is not None:
+        await res["http"].aclose()
+
+
+def _attach_image_openai(content: List[dict], image_b64: Optional[str], image_mime: str = "image/png"):
     if image_b64:
         content.append(
             {
                 "role": "user",
                 "content": [
                     {"type": "input_text", "text": "Latest RGB observation."},
-                    {"type": "input_image", "image_url": f"data:image/png;base64,{image_b64}"},
+                    {"type": "input_image", "image_url": f"data:{image_mime};base64,{image_b64}"},
                 ],
             }
         )
@@ -41,45 +238,206 @@ class OpenAIPlanner:
     """
     OpenAI Responses API client for GPT-5 (multimodal).
 
+    Requests share a `prompt_cache_key` per stable prompt prefix (schema, activity, catalog) so they are
+    routed to the same prompt cache; `usage` accumulates token counts (incl. cached input) per request kind.
+
+    `base_url` points the client at another Responses-compatible endpoint (default: OPENAI_BASE_URL or the
+    OpenAI API); `max_retries` overrides the SDK's own retry count.
+
     Requires:
         pip install openai>=1.40
         export OPENAI_API_KEY=...
     """
-    def __init__(self, model: str = "gpt-5", temperature: float = 0.1):
-        from openai import OpenAI
-        self.client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
+    provider = "openai"
+
+    def __init__(self, model: str = "gpt-5", temperature: float = 0.1, cache: Optional[PlanCache] = None,
+                 base_url: Optional[str] = None, max_retries: Optional[int] = None):
+        from openai import OpenAI, AsyncOpenAI
+        self._client_cls = OpenAI
+        self._aclient_cls = AsyncOpenAI
+        self._client = None
+        self._aclients = weakref.WeakKeyDictionary()
         self.model = model
         self.temperature = temperature
+        self.cache = cache
+        self.base_url = base_url
+        self.max_retries = max_retries
+        self.usage: Dict[str, Dict[str, int]] = {}
+
+    def _client_kwargs(self) -> dict:
+        kwargs: Dict[str, Any] = {"api_key": os.environ.get("OPENAI_API_KEY")}
+        if self.base_url:
+            kwargs["base_url"] = self.base_url
+        if self.max_retries is not None:
+            kwargs["max_retries"] = self.max_retries
+        return kwargs
+
+    @property
+    def client(self):
+        # Created on first request so replay-only runs need no API key
+        if self._client is None:
+            self._client = self._client_cls(**self._client_kwargs())
+        return self._client
+
+    def plan(self, activity: str, catalog: List[str], notes: str = "", image_b64: Optional[str] = None,
+             image_mime: str = "image/png", temperature: Optional[float] = None) -> Plan:
+        system, user = _build_prompt(activity, catalog, notes)
+        key = _prompt_cache_key(activity, catalog)
+        t = self.temperature if temperature is None else temperature
+        return _through_cache(self.cache, self.provider, self.model, t, system, user, image_b64,
+                              lambda: self._request(self._request_kwargs(system, user, image_b64, image_mime, key, t)))
 
-    def plan(self, activity: str, catalog: List[str], notes: str = "", image_b64: Optional[str] = None) -> Plan:
+    def replan(self, activity: str, catalog: List[str], previous: Plan, delta: str, notes: str = "",
+               image_b64: Optional[str] = None, image_mime: str = "image/png") -> Plan:
+        """
+        Remaining plan after the execution update `delta` (see replanning.format_delta). The original
+        request is continued through `previous_response_id` when `previous` came from this API (only the
+        update is uploaded); otherwise the same request is resent followed by the previous plan, so its
+        prefix is still served from the prompt cache.
+        """
         system, user = _build_prompt(activity, catalog, notes)
+        key = _prompt_cache_key(activity, catalog)
+        history = "\n\n".join([user, _plan_json(previous), delta])
+        return _through_cache(
+            self.cache, self.provider, self.model, self.temperature, system, history, image_b64,
+            lambda: self._request(self._replan_kwargs(system, user, image_b64, image_mime, key, previous, delta),
+                                  kind="replan"),
+        )
+
+    def _aclient(self):
+        loop = asyncio.get_running_loop()
+        client = self._aclients.get(loop)
+        if client is None:
+            client = self._aclient_cls(http_client=_async_resources()["http"], **self._client_kwargs())
+            self._aclients[loop] = client
+        return client
+
+    async def plan_async(self, activity: str, catalog: List[str], notes: str = "",
+                         image_b64: Optional[str] = None, image_mime: str = "image/png",
+                         temperature: Optional[float] = None) -> Plan:
+        system, user = _build_prompt(activity, catalog, notes)
+        key = _prompt_cache_key(activity, catalog)
+        t = self.temperature if temperature is None else temperature
+        return await _through_cache_async(
+            self.cache, self.provider, self.model, t, system, user, image_b64,
+            lambda: self._request_async(self._request_kwargs(system, user, image_b64, image_mime, key, t)),
+        )
 
+    def _request_kwargs(self, system: str, user: str, image_b64: Optional[str], image_mime: str,
+                        cache_key: str, temperature: Optional[float] = None) -> dict:
+        # Stable parts first (system schema, then activity + catalog); the image and any follow-up turns last
         content = [
             {"role": "system", "content": system},
             {"role": "user", "content": user},
         ]
-        _attach_image_openai(content, image_b64)
-
-        resp = self.client.responses.create(
+        _attach_image_openai(content, image_b64, image_mime)
+        return dict(
             model=self.model,
             input=content,
-            temperature=self.temperature,
+            temperature=self.temperature if temperature is None else temperature,
             text={"format": {"type": "json_object"}},
+            # Sent as a raw body field so SDK versions without the parameter accept it
+            extra_body={"prompt_cache_key": cache_key},
         )
-        txt = resp.output_text
-        data = json.loads(txt)
-        return Plan(**data)
+
+    def _replan_kwargs(self, system: str, user: str, image_b64: Optional[str], image_mime: str, cache_key: str,
+                       previous: Plan, delta: str) -> dict:
+        if previous.response_id:
+            kwargs = self._request_kwargs(system, user, None, image_mime, cache_key)
+            kwargs.update(input=[{"role": "user", "content": delta}], previous_response_id=previous.response_id)
+            return kwargs
+        kwargs = self._request_kwargs(system, user, image_b64, image_mime, cache_key)
+        kwargs["input"] += [
+            {"role": "assistant", "content": _plan_json(previous)},
+            {"role": "user", "content": delta},
+        ]
+        return kwargs
+
+    def plan_stream(self, activity: str, catalog: List[str], notes: str = "", image_b64: Optional[str] = None,
+                    image_mime: str = "image/png") -> Iterator[PlanStep]:
+        """Like `plan`, but yields each step as soon as it is complete in the streamed response."""
+        system, user = _build_prompt(activity, catalog, notes)
+        key = _prompt_cache_key(activity, catalog)
+
+        def chunks(usage: dict) -> Iterator[str]:
+            kwargs = self._request_kwargs(system, user, image_b64, image_mime, key)
+            stream = self.client.responses.create(stream=True, **kwargs)
+            try:
+                for event in stream:
+                    if event.type == "response.output_text.delta":
+                        yield event.delta
+                    elif event.type == "response.completed":
+                        usage.update(_openai_usage(event.response))
+            finally:
+                stream.close()
+                # A stream closed early (e.g. on a failed step) still counts as a request
+                _add_usage(self.usage, "plan", usage)
+
+        return _stream_through_cache(self.cache, self.provider, self.model, self.temperature, system, user,
+                                     image_b64, chunks)
+
+    def plan_stream_async(self, activity: str, catalog: List[str], notes: str = "",
+                          image_b64: Optional[str] = None, image_mime: str = "image/png") -> AsyncIterator[PlanStep]:
+        """Async `plan_stream` on the pooled client; cancelling the consuming task closes the response."""
+        system, user = _build_prompt(activity, catalog, notes)
+        key = _prompt_cache_key(activity, catalog)
+
+        async def chunks(usage: dict) -> AsyncIterator[str]:
+            kwargs = self._request_kwargs(system, user, image_b64, image_mime, key)
+            async with _async_resources()["sem"]:
+                stream = await self._aclient().responses.create(stream=True, **kwargs)
+                try:
+                    async for event in stream:
+                        if event.type == "response.output_text.delta":
+                            yield event.delta
+                        elif event.type == "response.completed":
+                            usage.update(_openai_usage(event.response))
+                finally:
+                    await stream.close()
+                    _add_usage(self.usage, "plan", usage)
+
+        return _stream_through_cache_async(self.cache, self.provider, self.model, self.temperature, system, user,
+                                           image_b64, chunks)
+
+    def _request(self, kwargs: dict, kind: str = "plan") -> Plan:
+        with telemetry.span("vlm.request", provider=self.provider, model=self.model, kind=kind) as sp:
+            resp = self.client.responses.create(**kwargs)
+            usage = _openai_usage(resp)
+            sp.set(**usage)
+        _add_usage(self.usage, kind, usage)
+        plan = _parse_plan(resp.output_text)
+        plan.response_id = getattr(resp, "id", None)
+        return plan
+
+    async def _request_async(self, kwargs: dict, kind: str = "plan") -> Plan:
+        async with _async_resources()["sem"]:
+            with telemetry.span("vlm.request", provider=self.provider, model=self.model, kind=kind) as sp:
+                resp = await self._aclient().responses.create(**kwargs)
+                usage = _openai_usage(resp)
+                sp.set(**usage)
+        _add_usage(self.usage, kind, usage)
+        plan = _parse_plan(resp.output_text)
+        plan.response_id = getattr(resp, "id", None)
+        return plan
 
 
 class GeminiPlanner:
     """
     Google GenAI SDK client for Gemini 2.5 Pro (multimodal).
 
+    The stable prompt parts come first, so Gemini's implicit prompt caching applies to repeated requests;
+    `usage` accumulates token counts (incl. cached input) per request kind.
+
+    `base_url` points the client at another endpoint (e.g. a local stand-in server).
+
     Requires:
         pip install google-genai
         export GEMINI_API_KEY=...
     """
-    def __init__(self, model: str = "gemini-2.5-pro", temperature: float = 0.1):
+    provider = "gemini"
+
+    def __init__(self, model: str = "gemini-2.5-pro", temperature: float = 0.1, cache: Optional[PlanCache] = None,
+                 base_url: Optional[str] = None):
         try:
             from genai import Client, types
         except Exception as e:
@@ -88,33 +446,146 @@ class GeminiPlanner:
                 "or run with --provider openai."
             ) from e
 
-        self.client = Client(api_key=os.environ.get("GEMINI_API_KEY"))
+        self._client_cls = Client
+        self._client = None
         self.model = model
         self.temperature = temperature
+        self.cache = cache
+        self.base_url = base_url
+        self.usage: Dict[str, Dict[str, int]] = {}
         self._types = types
 
-    def plan(self, activity: str, catalog: List[str], notes: str = "", image_b64: Optional[str] = None) -> Plan:
+    @property
+    def client(self):
+        # Created on first request so replay-only runs need no API key
+        if self._client is None:
+            kwargs: Dict[str, Any] = {"api_key": os.environ.get("GEMINI_API_KEY")}
+            if self.base_url:
+                kwargs["http_options"] = self._types.HttpOptions(base_url=self.base_url)
+            self._client = self._client_cls(**kwargs)
+        return self._client
+
+    def plan(self, activity: str, catalog: List[str], notes: str = "", image_b64: Optional[str] = None,
+             image_mime: str = "image/png", temperature: Optional[float] = None) -> Plan:
+        system, user = _build_prompt(activity, catalog, notes)
+        t = self.temperature if temperature is None else temperature
+        return _through_cache(self.cache, self.provider, self.model, t, system, user, image_b64,
+                              lambda: self._request(self._request_kwargs(system, user, image_b64, image_mime, t)))
+
+    def replan(self, activity: str, catalog: List[str], previous: Plan, delta: str, notes: str = "",
+               image_b64: Optional[str] = None, image_mime: str = "image/png") -> Plan:
+        """
+        Remaining plan after the execution update `delta`: the original request is resent unchanged, followed
+        by the previous plan and the update, so the cached prefix is reused.
+        """
+        system, user = _build_prompt(activity, catalog, notes)
+        history = "\n\n".join([user, _plan_json(previous), delta])
+        return _through_cache(
+            self.cache, self.provider, self.model, self.temperature, system, history, image_b64,
+            lambda: self._request(self._replan_kwargs(system, user, image_b64, image_mime, previous, delta),
+                                  kind="replan"),
+        )
+
+    async def plan_async(self, activity: str, catalog: List[str], notes: str = "",
+                         image_b64: Optional[str] = None, image_mime: str = "image/png",
+                         temperature: Optional[float] = None) -> Plan:
         system, user = _build_prompt(activity, catalog, notes)
+        t = self.temperature if temperature is None else temperature
+        return await _through_cache_async(
+            self.cache, self.provider, self.model, t, system, user, image_b64,
+            lambda: self._request_async(self._request_kwargs(system, user, image_b64, image_mime, t)),
+        )
 
+    def _request_kwargs(self, system: str, user: str, image_b64: Optional[str], image_mime: str,
+                        temperature: Optional[float] = None) -> dict:
         parts: List[Any] = [self._types.Part.from_text(system + "\n\n" + user)]
         if image_b64:
-            parts.append(self._types.Part.from_bytes(b64_data=image_b64, mime_type="image/png"))
-
-        resp = self.client.models.generate_content(
+            parts.append(self._types.Part.from_bytes(b64_data=image_b64, mime_type=image_mime))
+        return dict(
             model=self.model,
             contents=parts,
-            config=self._types.GenerateContentConfig(temperature=self.temperature, response_mime_type="application/json"),
+            config=self._types.GenerateContentConfig(
+                temperature=self.temperature if temperature is None else temperature,
+                response_mime_type="application/json",
+            ),
         )
-        txt = resp.text
-        data = json.loads(txt)
-        return Plan(**data)
+
+    def _replan_kwargs(self, system: str, user: str, image_b64: Optional[str], image_mime: str, previous: Plan,
+                       delta: str) -> dict:
+        types = self._types
+        kwargs = self._request_kwargs(system, user, image_b64, image_mime)
+        kwargs["contents"] = [
+            types.Content(role="user", parts=kwargs["contents"]),
+            types.Content(role="model", parts=[types.Part.from_text(_plan_json(previous))]),
+            types.Content(role="user", parts=[types.Part.from_text(delta)]),
+        ]
+        return kwargs
+
+    def plan_stream(self, activity: str, catalog: List[str], notes: str = "", image_b64: Optional[str] = None,
+                    image_mime: str = "image/png") -> Iterator[PlanStep]:
+        """Like `plan`, but yields each step as soon as it is complete in the streamed response."""
+        system, user = _build_prompt(activity, catalog, notes)
+
+        def chunks(usage: dict) -> Iterator[str]:
+            kwargs = self._request_kwargs(system, user, image_b64, image_mime)
+            try:
+                for chunk in self.client.models.generate_content_stream(**kwargs):
+                    if getattr(chunk, "usage_metadata", None) is not None:
+                        usage.update(_gemini_usage(chunk))
+                    if chunk.text:
+                        yield chunk.text
+            finally:
+                _add_usage(self.usage, "plan", usage)
+
+        return _stream_through_cache(self.cache, self.provider, self.model, self.temperature, system, user,
+                                     image_b64, chunks)
+
+    def plan_stream_async(self, activity: str, catalog: List[str], notes: str = "",
+                          image_b64: Optional[str] = None, image_mime: str = "image/png") -> AsyncIterator[PlanStep]:
+        """Async `plan_stream` on the SDK's aio client; cancelling the consuming task closes the response."""
+        system, user = _build_prompt(activity, catalog, notes)
+
+        async def chunks(usage: dict) -> AsyncIterator[str]:
+            kwargs = self._request_kwargs(system, user, image_b64, image_mime)
+            async with _async_resources()["sem"]:
+                try:
+                    async for chunk in await self.client.aio.models.generate_content_stream(**kwargs):
+                        if getattr(chunk, "usage_metadata", None) is not None:
+                            usage.update(_gemini_usage(chunk))
+                        if chunk.text:
+                            yield chunk.text
+                finally:
+                    _add_usage(self.usage, "plan", usage)
+
+        return _stream_through_cache_async(self.cache, self.provider, self.model, self.temperature, system, user,
+                                           image_b64, chunks)
+
+    def _request(self, kwargs: dict, kind: str = "plan") -> Plan:
+        with telemetry.span("vlm.request", provider=self.provider, model=self.model, kind=kind) as sp:
+            resp = self.client.models.generate_content(**kwargs)
+            usage = _gemini_usage(resp)
+            sp.set(**usage)
+        _add_usage(self.usage, kind, usage)
+        return _parse_plan(resp.text)
+
+    async def _request_async(self, kwargs: dict, kind: str = "plan") -> Plan:
+        # The SDK's aio client keeps its own connection pool; the shared limit bounds concurrency
+        async with _async_resources()["sem"]:
+            with telemetry.span("vlm.request", provider=self.provider, model=self.model, kind=kind) as sp:
+                resp = await self.client.aio.models.generate_content(**kwargs)
+                usage = _gemini_usage(resp)
+                sp.set(**usage)
+        _add_usage(self.usage, kind, usage)
+        return _parse_plan(resp.text)
 
 
-def get_planner(provider: str, model: str, temperature: float = 0.1):
+def get_planner(provider: str, model: str, temperature: float = 0.1, cache: Optional[PlanCache] = None,
+                base_url: Optional[str] = None, max_retries: Optional[int] = None):
     provider = provider.lower()
     if provider == "openai":
-        return OpenAIPlanner(model=model, temperature=temperature)
+        return OpenAIPlanner(model=model, temperature=temperature, cache=cache, base_url=base_url,
+                             max_retries=max_retries)
     elif provider == "gemini":
-        return GeminiPlanner(model=model, temperature=temperature)
+        return GeminiPlanner(model=model, temperature=temperature, cache=cache, base_url=base_url)
     else:
         raise ValueError(f"Unknown provider: {provider}")
@@ -0,0 +1,35 @@
+import argparse
+import json
+
+from og_vlm_planning.og_env import preflight_scenes
+from og_vlm_planning.scene_compat import SceneCompatCache
+
+
+def build_parser() -> argparse.ArgumentParser:
+    ap = argparse.ArgumentParser(
+        description="Try every candidate scene of each activity once and record which ones load and sample "
+                    "(used by run_eval / run_sweep --scene-cache)"
+    )
+    ap.add_argument("activities", type=str, nargs="+")
+    ap.add_argument("--scene-cache", type=str, default="scene_cache.json", help="JSON file the results go to")
+    ap.add_argument("--robot", type=str, default="R1Pro")
+    ap.add_argument("--instance-id", type=int, default=0, help="BEHAVIOR activity instance id")
+    ap.add_argument("--scenes", type=str, nargs="*", default=None,
+                    help="Scene models to try instead of each activity's candidates")
+    ap.add_argument("--force", action="store_true", help="Also retry combinations already in the cache")
+    return ap
+
+
+def main():
+    args = build_parser().parse_args()
+    cache = SceneCompatCache(args.scene_cache)
+    results = {}
+    for activity in args.activities:
+        results[activity] = preflight_scenes(activity, cache, robot=args.robot, instance_id=args.instance_id,
+                                             candidates=args.scenes, force=args.force)
+    print(json.dumps({"scene_cache": args.scene_cache, "instance_id": args.instance_id, "results": results},
+                     indent=2))
+
+
+if __name__ == "__main__":
+    main()
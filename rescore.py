@@ -0,0 +1,52 @@
+import argparse
+import json
+from typing import Any, Dict, List
+
+from og_vlm_planning.trajectory import load_trajectories
+
+
+def build_parser() -> argparse.ArgumentParser:
+    ap = argparse.ArgumentParser(
+        description="Re-score episodes recorded with run_eval --record-dir, without the simulator"
+    )
+    ap.add_argument("record_dir", type=str, help="Directory passed to --record-dir (searched recursively)")
+    ap.add_argument("--out", type=str, default=None, help="Write per-episode results as JSONL here")
+    return ap
+
+
+def _mean(values: List[Any]):
+    values = [v for v in values if v is not None]
+    return sum(values) / len(values) if values else None
+
+
+def main():
+    args = build_parser().parse_args()
+    readers = load_trajectories(args.record_dir)
+    if not readers:
+        raise SystemExit(f"No recorded episodes under {args.record_dir}")
+    rows: List[Dict[str, Any]] = []
+    for reader in readers:
+        res = reader.rescore()
+        res["path"] = reader.root
+        rows.append(res)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            for res in rows:
+                f.write(json.dumps(res) + "\n")
+
+    done = [r for r in rows if r["goals_done_at_step"] is not None]
+    print(json.dumps({
+        "episodes": len(rows),
+        "avg_final_fraction": _mean([r["final_fraction"] for r in rows]),
+        "avg_bddl_fraction": _mean([r["bddl_fraction"] for r in rows]),
+        "success_rate": sum(1 for r in rows if (r["final_fraction"] or 0.0) >= 0.999) / len(rows),
+        "avg_steps": _mean([r["steps"] for r in rows]),
+        "avg_env_steps": _mean([r["env_steps"] for r in rows]),
+        # Simulator steps an early stop would have saved
+        "episodes_done_early": len(done),
+        "avg_env_steps_after_done": _mean([r["env_steps_after_done"] for r in done]),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
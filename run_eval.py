@@ -1,12 +1,29 @@
 import argparse
+import glob
 import json
-from typing import Dict, Any
+import os
+import time
+from typing import Dict, Any, List, Optional
 
-from tqdm import trange
+from tqdm import trange, tqdm
 
-from og_vlm_planning.vlm_clients import get_planner
-from og_vlm_planning.og_env import make_env, list_scene_names, try_rgb_image_b64, bddl_success_fraction
-from og_vlm_planning.executors import TeleportExecutor, PrimitiveExecutor
+from og_vlm_planning import telemetry
+from og_vlm_planning.vlm_clients import Plan, PlanStep, get_planner, set_async_concurrency, aclose_async_clients
+from og_vlm_planning.async_utils import BackgroundLoop, PlanPrefetcher
+from og_vlm_planning.plan_cache import PlanCache, PlanCacheMiss
+from og_vlm_planning.parallel import WorkerPool, load_callable
+from og_vlm_planning.og_env import make_env, reset_env, submit_rgb_image, bddl_success_fraction
+from og_vlm_planning.catalog import CatalogBuilder
+from og_vlm_planning.image_pipeline import ImageEncoder, MIME_TYPES, OVERLAYS
+from og_vlm_planning.executors import TeleportExecutor, PrimitiveExecutor, StepBudget
+from og_vlm_planning.progress import GoalProgress
+from og_vlm_planning.plan_only import load_contexts, run_plan_only, save_context
+from og_vlm_planning.streaming import StepStream
+from og_vlm_planning.replanning import Replanner
+from og_vlm_planning.plan_validation import PlanRejected, PlanValidator, scene_openable, scene_resolver
+from og_vlm_planning.trajectory import TrajectoryRecorder
+from og_vlm_planning.speculative import Speculator, candidate_temperatures
+from og_vlm_planning.hedging import HedgedPlanner, parse_planner_spec
 
 
 def exec_step(executor, step: Dict[str, Any]):
@@ -28,7 +45,7 @@ def exec_step(executor, step: Dict[str, Any]):
     return None
 
 
-def main():
+def build_parser() -> argparse.ArgumentParser:
     ap = argparse.ArgumentParser()
     ap.add_argument("--provider", type=str, default="openai", choices=["openai", "gemini"])
     ap.add_argument("--model", type=str, default="gpt-5")
@@ -37,71 +54,687 @@ def main():
     ap.add_argument("--robot", type=str, default="R1Pro")
     ap.add_argument("--exec", dest="executor", type=str, default="primitives", choices=["primitives", "teleport"])
     ap.add_argument("--temperature", type=float, default=0.1)
-    args = ap.parse_args()
+    ap.add_argument("--base-url", type=str, default=None,
+                    help="API endpoint of the planner (e.g. a local stand-in server); default: the provider's")
+    ap.add_argument("--hedge", action="store_true",
+                    help="Send a hedged second request when a plan request runs past the --hedge-quantile of "
+                         "recent latencies; retry failed requests with jittered backoff behind a circuit breaker")
+    ap.add_argument("--fallback", type=str, nargs="*", default=[], metavar="PROVIDER:MODEL[@URL]",
+                    help="Planners for hedged and failover requests, in order (implies --hedge)")
+    ap.add_argument("--hedge-quantile", type=float, default=0.9, help="Latency quantile that triggers a hedge")
+    ap.add_argument("--hedge-after", type=float, default=10.0,
+                    help="Hedge delay (s) until enough request latencies are known")
+    ap.add_argument("--retries", type=int, default=2, help="Retries after every hedged / failover planner failed")
+    ap.add_argument("--breaker-failures", type=int, default=3,
+                    help="Consecutive failures that open a planner's circuit breaker")
+    ap.add_argument("--breaker-reset", type=float, default=30.0,
+                    help="Seconds before an open circuit breaker lets a trial request through")
+    ap.add_argument("--plan-cache", type=str, default=None,
+                    help="Directory of the on-disk plan cache (disabled if unset)")
+    ap.add_argument("--plan-cache-mode", type=str, default="readthrough", choices=list(PlanCache.MODES),
+                    help="replay never calls the VLM and fails on a cache miss")
+    ap.add_argument("--plan-cache-max-mb", type=float, default=None)
+    ap.add_argument("--plan-cache-max-age-days", type=float, default=None)
+    ap.add_argument("--pipeline", action="store_true",
+                    help="Request the next episode's plan while the current episode executes (used when the "
+                         "next episode's observation after reset matches the one it was requested with)")
+    ap.add_argument("--max-concurrency", type=int, default=8, help="Max in-flight async planner requests")
+    ap.add_argument("--workers", type=int, default=1,
+                    help="Number of simulator worker processes; each owns its own environment")
+    ap.add_argument("--episode-timeout", type=float, default=None,
+                    help="Restart a worker whose current episode runs longer than this many seconds (--workers > 1)")
+    ap.add_argument("--setup-timeout", type=float, default=None,
+                    help="Restart a worker whose setup (environment build and task sampling) runs longer than this "
+                         "many seconds (--workers > 1)")
+    ap.add_argument("--env-factory", type=str, default=None,
+                    help="'module:function' used instead of make_env(activity=..., robot=...), e.g. a stub environment")
+    ap.add_argument("--snapshot-dir", type=str, default=None,
+                    help="Directory of sampled task snapshots; online sampling only runs on a miss")
+    ap.add_argument("--instance-id", type=int, default=0, help="BEHAVIOR activity instance id")
+    ap.add_argument("--scene-cache", type=str, default=None,
+                    help="JSON file recording which activity / scene / instance combinations load; known-good "
+                         "scenes are tried first and known-bad ones skipped (see preflight_scenes.py)")
+    ap.add_argument("--image-codec", type=str, default="png", choices=list(MIME_TYPES))
+    ap.add_argument("--image-quality", type=int, default=90, help="JPEG / WebP quality (0-100)")
+    ap.add_argument("--image-max-size", type=int, default=None,
+                    help="Downscale so the longest image side is at most this")
+    ap.add_argument("--image-overlay", type=str, default=None, choices=list(OVERLAYS))
+    ap.add_argument("--no-image", action="store_true", help="Plan from text only")
+    ap.add_argument("--catalog-tokens", type=int, default=400,
+                    help="Token budget of the object catalog; task-relevant objects are always included")
+    ap.add_argument("--max-primitive-steps", type=int, default=None, help="Default env-step limit per primitive")
+    ap.add_argument("--max-primitive-seconds", type=float, default=None, help="Default wall-clock limit per primitive")
+    ap.add_argument("--primitive-max-steps", type=str, nargs="*", default=[], metavar="OP=N",
+                    help="Per-primitive step limits, e.g. NAVIGATE_TO=3000 GRASP=1500")
+    ap.add_argument("--max-episode-steps", type=int, default=None,
+                    help="Env-step limit for all primitives of an episode")
+    ap.add_argument("--max-episode-seconds", type=float, default=None,
+                    help="Wall-clock limit for all primitives of an episode")
+    ap.add_argument("--track-progress", action="store_true",
+                    help="Re-check affected BDDL goals after every step and record per-step progress")
+    ap.add_argument("--early-stop", action="store_true",
+                    help="Stop executing a plan once all BDDL goals are satisfied (implies --track-progress)")
+    ap.add_argument("--stream", action="store_true",
+                    help="Stream the plan and start executing each step as soon as it is complete")
+    ap.add_argument("--replan", type=int, default=0, metavar="N",
+                    help="After a failed step, request the remaining plan (sending only the execution delta) "
+                         "up to N times per episode")
+    ap.add_argument("--validate-plans", action="store_true",
+                    help="Check plans against the op schema, catalog and preconditions before execution; repair "
+                         "names / missing GRASP or OPEN steps and skip plans that cannot be repaired")
+    ap.add_argument("--speculative", type=int, default=0, metavar="K",
+                    help="Request K candidate plans concurrently at different temperatures, score each with a "
+                         "teleport simulation from the initial state and execute only the best one")
+    ap.add_argument("--speculative-temps", type=float, nargs="*", default=None,
+                    help="Candidate temperatures for --speculative (default: --temperature up to 1.0)")
+    ap.add_argument("--record-dir", type=str, default=None,
+                    help="Record per-step poses, plan steps, results and subsampled frames of every episode here "
+                         "(memory-mapped chunks; re-score offline with rescore.py)")
+    ap.add_argument("--record-sample-every", type=int, default=10,
+                    help="Also record object poses every N simulator steps inside a primitive")
+    ap.add_argument("--record-frame-every", type=int, default=1,
+                    help="Record an RGB frame every N plan steps (0: no frames)")
+    ap.add_argument("--record-frame-stride", type=int, default=4, help="Spatial subsampling of recorded frames")
+    ap.add_argument("--record-objects", type=str, default="scope", choices=["scope", "all"],
+                    help="Record the task's object scope + robot, or every scene object")
+    ap.add_argument("--save-contexts", type=str, default=None,
+                    help="Save each episode's planner context (catalog, notes, image) to this directory")
+    ap.add_argument("--plan-only", action="store_true",
+                    help="Only run the planner on saved contexts (--contexts); no simulator is started")
+    ap.add_argument("--contexts", type=str, default=None,
+                    help="Saved contexts for --plan-only: contexts.jsonl from --save-contexts, or a JSON list of names")
+    ap.add_argument("--image-file", type=str, default=None, help="Image attached to every --plan-only request")
+    ap.add_argument("--plan-repeats", type=int, default=1, help="Requests per context in --plan-only mode")
+    ap.add_argument("--plans-out", type=str, default="plans.jsonl", help="JSONL output of --plan-only")
+    ap.add_argument("--trace-dir", type=str, default=None,
+                    help="Record stage spans and VLM token usage to JSONL and Chrome trace files in this directory")
+    return ap
 
-    # env
-    print("[info] Environment setup...")
-    env = make_env(activity=args.activity, robot=args.robot)
 
-    # planner
-    print("[info] Initializing planner...")
-    planner = get_planner(provider=args.provider, model=args.model, temperature=args.temperature)
+def _primitive_budgets(args) -> Dict[str, StepBudget]:
+    budgets = {}
+    for spec in args.primitive_max_steps:
+        op, _, n = spec.partition("=")
+        if not n:
+            raise ValueError(f"Expected OP=N, got {spec!r}")
+        budgets[op.upper()] = StepBudget(max_steps=int(n), max_wall_s=args.max_primitive_seconds)
+    return budgets
+
+
+def build_env(args, scene_model: Optional[str] = None):
+    factory = load_callable(args.env_factory) if args.env_factory else make_env
+    kwargs = {}
+    if args.snapshot_dir:
+        kwargs["snapshot_dir"] = args.snapshot_dir
+    if args.instance_id:
+        kwargs["instance_id"] = args.instance_id
+    if args.scene_cache:
+        kwargs["scene_cache"] = args.scene_cache
+    if scene_model:
+        kwargs["scene_model"] = scene_model
+    return factory(activity=args.activity, robot=args.robot, **kwargs)
+
 
-    # executor
-    if args.executor == "primitives":
+def build_planner(args):
+    cache = None
+    if args.plan_cache:
+        cache = PlanCache(
+            args.plan_cache,
+            mode=args.plan_cache_mode,
+            max_bytes=int(args.plan_cache_max_mb * 1024 * 1024) if args.plan_cache_max_mb is not None else None,
+            max_age_s=args.plan_cache_max_age_days * 86400 if args.plan_cache_max_age_days is not None else None,
+        )
+    hedged = args.hedge or bool(args.fallback)
+    # HedgedPlanner does its own retries, so the SDK's are turned off
+    max_retries = 0 if hedged else None
+    planner = get_planner(provider=args.provider, model=args.model, temperature=args.temperature, cache=cache,
+                          base_url=args.base_url, max_retries=max_retries)
+    if not hedged:
+        return planner
+    planners = [planner] + [
+        get_planner(provider=provider, model=model, temperature=args.temperature, cache=cache, base_url=base_url,
+                    max_retries=max_retries)
+        for provider, model, base_url in map(parse_planner_spec, args.fallback)
+    ]
+    return HedgedPlanner(planners, hedge_quantile=args.hedge_quantile, hedge_after_s=args.hedge_after,
+                         retries=args.retries, breaker_failures=args.breaker_failures,
+                         breaker_reset_s=args.breaker_reset)
+
+
+def build_executor(env, kind: str, args=None):
+    if kind == "primitives":
         try:
-            executor = PrimitiveExecutor(env)
+            if args is None:
+                return PrimitiveExecutor(env)
+            return PrimitiveExecutor(
+                env,
+                primitive_budgets=_primitive_budgets(args),
+                default_budget=StepBudget(args.max_primitive_steps, args.max_primitive_seconds),
+                episode_budget=StepBudget(args.max_episode_steps, args.max_episode_seconds),
+            )
         except Exception as e:
             print(f"[warn] PrimitiveExecutor unavailable ({e}); falling back to TeleportExecutor")
-            executor = TeleportExecutor(env)
-    else:
-        executor = TeleportExecutor(env)
-
-    success = 0
-    frac_sum = 0.0
-
-    for _ in trange(args.episodes, desc="episodes"):
-        env.reset()
-
-        # context
-        catalog = list_scene_names(env)
-        image_b64 = try_rgb_image_b64(env)
-
-        # plan
-        print("[info] Planning with context:", {
-            "activity": args.activity,
-            "robot": args.robot,
-            "scene": env.scene.name if hasattr(env.scene, "name") else "unknown",
-            "objects": catalog,
-            "image_b64": image_b64 is not None,
-        })
-        plan = planner.plan(activity=args.activity, catalog=catalog, notes="", image_b64=image_b64)
-        print("[info] Plan:", plan)
-
-        # execute
-        for step in plan.plan:
-            res = exec_step(executor, step.dict())
+            return TeleportExecutor(env)
+    return TeleportExecutor(env)
+
+
+def build_encoder(args) -> ImageEncoder:
+    return ImageEncoder(codec=args.image_codec, quality=args.image_quality, max_size=args.image_max_size,
+                        overlay=args.image_overlay)
+
+
+def episode_context(env, args, encoder: ImageEncoder, catalog_builder: CatalogBuilder,
+                    stats: Dict[str, Any], episode: int = 0) -> Dict[str, Any]:
+    # Encoding runs on the encoder thread while the catalog is built
+    image_future = None if args.no_image else submit_rgb_image(env, encoder)
+    catalog = catalog_builder.build(env, activity=args.activity)
+    image = image_future.result() if image_future is not None else None
+    if image is not None:
+        stats["image_bytes"] = image.nbytes
+        stats["image_encode_s"] = image.encode_s
+    print("[info] Planning with context:", {
+        "activity": args.activity,
+        "robot": args.robot,
+        "scene": env.scene.name if hasattr(env.scene, "name") else "unknown",
+        "objects": catalog,
+        "image": None if image is None else {"mime": image.mime_type, "bytes": image.nbytes,
+                                             "encode_ms": round(image.encode_s * 1e3, 2), "reused": image.reused},
+    })
+    ctx = {
+        "activity": args.activity,
+        "catalog": catalog,
+        "notes": "",
+        "image_b64": image.b64 if image is not None else None,
+        "image_mime": image.mime_type if image is not None else "image/png",
+    }
+    if args.save_contexts:
+        save_context(args.save_contexts, episode, ctx)
+    return ctx
+
+
+def build_progress(env, args) -> Optional[GoalProgress]:
+    if not (args.track_progress or args.early_stop):
+        return None
+    progress = GoalProgress(env)
+    if not progress.enabled:
+        print("[warn] Task exposes no goal conditions; progress tracking disabled")
+        return None
+    return progress
+
+
+def execute_plan(executor, plan, progress: Optional[GoalProgress] = None, early_stop: bool = False,
+                 stats: Optional[Dict[str, Any]] = None, replanner: Optional[Replanner] = None,
+                 recorder: Optional[TrajectoryRecorder] = None):
+    """
+    Execute a Plan, or an iterable of PlanSteps (a StepStream) step by step as the steps arrive.
+    With a `replanner`, a failed step ends the current plan and the remaining plan returned by
+    `replanner.replan` is executed instead, until no step fails or the replan limit is reached.
+    Every executed step and its result are passed to the `recorder`.
+    """
+    if progress is not None:
+        progress.reset()
+    if hasattr(executor, "reset_episode"):
+        executor.reset_episode()
+    executed = 0
+    stopped = False
+    done: List[PlanStep] = []
+    while plan is not None:
+        steps = plan.plan if isinstance(plan, Plan) else plan
+        # Executors that can compile a whole plan (TeleportExecutor) apply a complete plan in one batch
+        batched = isinstance(plan, Plan) and hasattr(executor, "execute_plan")
+        if batched:
+            results = executor.execute_plan(plan)
+        else:
+            results = (exec_step(executor, step.dict()) for step in steps)
+        failed = None
+        goals_done = False
+        for i, (step, res) in enumerate(zip(steps, results), 1):
+            executed += 1
             print(f"[step] {step.op} {step} => {res}")
             if res is None:
                 print(f"[skip] unknown op: {step.op}")
+                if recorder is not None:
+                    recorder.step(step, None, None, batched)
                 continue
+            if res.success:
+                done.append(step)
+            elif replanner is not None and failed is None:
+                failed = (step, res.info.get("reason", ""))
+            if progress is not None and not batched:
+                frac = progress.update(step.dict())
+                print(f"[progress] {frac:.3f}")
+            if recorder is not None:
+                # A batch is already applied in full, so per-step goal values are not meaningful there
+                recorder.step(step, res, None if batched else progress, batched)
+            if early_stop and progress is not None and not batched and progress.done and progress.confirm():
+                goals_done = True
+                stopped = not isinstance(steps, list) or i < len(steps)
+                if stopped:
+                    print("[info] All goals satisfied; skipping the remaining step(s)")
+                break
+            if failed is not None and not batched:
+                # The rest of this plan assumed the failed step succeeded
+                break
+        if progress is not None and batched:
+            # The whole plan is already applied, so there is a single progress point
+            progress.confirm(record=True)
+        if goals_done or failed is None:
+            break
+        if isinstance(plan, Plan):
+            previous = plan
+        else:
+            # Stop generating the stale plan; what arrived of it is the previous turn
+            plan.close()
+            previous = plan.plan
+        plan = replanner.replan(previous, done, *failed)
+    if stats is not None:
+        stats["steps_executed"] = executed
+        if progress is not None:
+            stats["progress"] = list(progress.curve)
+            stats["early_stop"] = stopped
+        if replanner is not None:
+            stats["replans"] = replanner.replans
+            stats["replan_s"] = sum(replanner.latencies)
+
+
+def build_validator(env, args, ctx: Dict[str, Any]) -> Optional[PlanValidator]:
+    if not args.validate_plans:
+        return None
+    return PlanValidator(ctx["catalog"], resolves=scene_resolver(env), openable=scene_openable(env))
+
+
+def execute_validated(executor, plan: Plan, validator: Optional[PlanValidator], args, out: Dict[str, Any],
+                      progress: Optional[GoalProgress] = None, replanner: Optional[Replanner] = None,
+                      recorder: Optional[TrajectoryRecorder] = None):
+    """Execute a complete plan after validating it; a plan that cannot be repaired is not executed at all."""
+    if validator is not None:
+        try:
+            plan = validator.validate(plan)
+        except PlanRejected as e:
+            print(f"[warn] Plan rejected before execution: {e}")
+            out["plan_rejected"] = e.errors
+            return
+        if validator.repairs:
+            print("[info] Repaired plan:", plan, validator.repairs)
+    with telemetry.span("execute", steps=len(plan.plan)):
+        execute_plan(executor, plan, progress, args.early_stop, out, replanner, recorder)
+
+
+def build_speculator(args) -> Optional[Speculator]:
+    if not args.speculative:
+        return None
+    return Speculator(args.speculative_temps or candidate_temperatures(args.speculative, args.temperature))
+
+
+def execute_speculative(env, planner, executor, speculator: Speculator, ctx: Dict[str, Any],
+                        validator: Optional[PlanValidator], args, out: Dict[str, Any],
+                        progress: Optional[GoalProgress] = None, replanner: Optional[Replanner] = None,
+                        recorder: Optional[TrajectoryRecorder] = None):
+    """Screen candidate plans with teleport simulation, then execute the best one."""
+    with telemetry.span("plan", speculative=True):
+        spec = speculator.choose(env, planner, ctx, validator)
+    out.update(spec.stats())
+    print("[info] Plan:", spec.plan)
+    t0 = time.perf_counter()
+    execute_validated(executor, spec.plan, validator, args, out, progress, replanner, recorder)
+    out["execute_s"] = time.perf_counter() - t0
+    out["spec_avoided_s"] = spec.avoided_s(out["execute_s"] / max(out.get("steps_executed", 0), 1))
+
+
+def start_recording(env, executor, args, episode: int) -> Optional[TrajectoryRecorder]:
+    if not args.record_dir:
+        return None
+    recorder = TrajectoryRecorder(
+        os.path.join(args.record_dir, f"ep{episode:04d}"), env, episode=episode, activity=args.activity,
+        sample_every=args.record_sample_every, frame_every=args.record_frame_every,
+        frame_stride=args.record_frame_stride, objects=args.record_objects,
+    )
+    if hasattr(executor, "step_hook"):
+        executor.step_hook = recorder.on_env_step
+    return recorder
+
+
+def stop_recording(recorder: Optional[TrajectoryRecorder], executor, out: Dict[str, Any]):
+    if recorder is None:
+        return
+    if hasattr(executor, "step_hook"):
+        executor.step_hook = None
+    recorder.close(**{k: out[k] for k in ("bddl_fraction", "steps_executed", "early_stop", "replans") if k in out})
+
+
+def run_episode(env, planner, executor, encoder, catalog_builder, args, episode: int = 0,
+                progress: Optional[GoalProgress] = None, speculator: Optional[Speculator] = None,
+                loop: Optional[BackgroundLoop] = None, prefetcher: Optional[PlanPrefetcher] = None) -> Dict[str, Any]:
+    """
+    One episode: reset, observe, plan, execute and score. `loop` runs the streamed request of --stream.
+    With a `prefetcher` (--pipeline) the plan comes from the request sent during the previous episode when
+    this episode's observation matches it, and the next episode's request is sent before this one executes.
+    """
+    t_ep = time.perf_counter()
+    out: Dict[str, Any] = {}
+    with telemetry.span("episode", episode=episode):
+        reset_env(env)
+        ctx = episode_context(env, args, encoder, catalog_builder, out, episode)
+        pending = None
+        if prefetcher is not None:
+            pending, out["plan_prefetched"] = prefetcher.take(ctx)
+        validator = build_validator(env, args, ctx)
+        replanner = Replanner(planner, ctx, args.replan, validator) if args.replan else None
+        recorder = start_recording(env, executor, args, episode)
+        if args.stream:
+            # Steps are executed while the rest of the plan is still being generated
+            stream = StepStream(planner, ctx, validator, loop=loop)
+            with telemetry.span("execute", streamed=True) as sp:
+                try:
+                    execute_plan(executor, stream, progress, args.early_stop, out, replanner, recorder)
+                except PlanRejected as e:
+                    # Steps before the invalid one have already run
+                    print(f"[warn] Streamed plan rejected: {e}")
+                    out["plan_rejected"] = e.errors
+                finally:
+                    stream.close()
+                sp.set(steps=len(stream.steps))
+            print("[info] Plan:", stream.plan)
+            out["first_step_s"] = stream.first_step_s
+        elif speculator is not None:
+            execute_speculative(env, planner, executor, speculator, ctx, validator, args, out, progress, replanner,
+                                recorder)
+        else:
+            t_plan = time.perf_counter()
+            with telemetry.span("plan", pipelined=pending is not None):
+                plan = pending.result() if pending is not None else planner.plan(**ctx)
+            out["plan_wait_s"] = time.perf_counter() - t_plan
+            print("[info] Plan:", plan)
+            execute_validated(executor, plan, validator, args, out, progress, replanner, recorder)
+        if validator is not None:
+            out["plan_repairs"] = len(validator.repairs)
+        out["bddl_fraction"] = bddl_success_fraction(env)
+        stop_recording(recorder, executor, out)
+    out["episode_s"] = time.perf_counter() - t_ep
+    return out
+
 
-        # evaluate by BDDL fraction
-        frac = bddl_success_fraction(env)
-        frac_sum += frac
-        if frac >= 0.999:
-            success += 1
+def _trace_file(args, worker_id=None) -> str:
+    name = "trace.jsonl" if worker_id is None else f"trace.w{worker_id}.jsonl"
+    return os.path.join(args.trace_dir, name)
 
-    print(json.dumps({
+
+def start_trace(args):
+    """Enables tracing into `args.trace_dir`, removing trace files of earlier runs."""
+    os.makedirs(args.trace_dir, exist_ok=True)
+    for stale in glob.glob(os.path.join(args.trace_dir, "trace*.jsonl")):
+        os.remove(stale)
+    telemetry.configure(True)
+
+
+def finish_trace(args) -> List[Dict[str, Any]]:
+    """
+    Flushes this process's spans, merges them with the worker trace files in `args.trace_dir` into
+    trace.chrome.json and prints the stage latency summary. Returns the merged records.
+    """
+    telemetry.get_tracer().flush_jsonl(_trace_file(args))
+    records = []
+    for path in sorted(glob.glob(os.path.join(args.trace_dir, "trace*.jsonl"))):
+        records.extend(telemetry.load_jsonl(path))
+    telemetry.write_chrome_trace(records, os.path.join(args.trace_dir, "trace.chrome.json"))
+    print("[info] Stage latency summary:")
+    print(telemetry.format_summary(telemetry.summarize(records)))
+    return records
+
+
+def planner_counters(planner) -> Dict[str, Any]:
+    """Cumulative request counters of `planner`: token usage, plan cache hits/misses and hedging stats."""
+    counters: Dict[str, Any] = {}
+    usage = getattr(planner, "usage", None)
+    if usage:
+        counters["usage"] = {kind: dict(row) for kind, row in usage.items()}
+    cache = getattr(planner, "cache", None)
+    if cache is not None:
+        counters["plan_cache"] = {"hits": cache.hits, "misses": cache.misses}
+    if isinstance(planner, HedgedPlanner):
+        counters["hedging"] = dict(planner.stats, planners={
+            label: {"wins": w, "breaker_trips": b.trips}
+            for label, w, b in zip(planner.labels, planner.wins, planner.breakers)})
+    return counters
+
+
+def add_counters(total: Dict[str, Any], counters: Dict[str, Any], sign: int = 1) -> Dict[str, Any]:
+    """Adds the nested integer `counters` into `total` (subtracts them with sign=-1)."""
+    for k, v in counters.items():
+        if isinstance(v, dict):
+            add_counters(total.setdefault(k, {}), v, sign)
+        else:
+            total[k] = total.get(k, 0) + sign * v
+    return total
+
+
+def _worker_setup(worker_id: int, args):
+    """
+    WorkerPool target: builds this process's environment, planner and executor. Each result carries the
+    planner counters accumulated since the previous one (`planner_counters`), which main() sums.
+    """
+    if args.trace_dir:
+        telemetry.configure(True)
+    with telemetry.span("setup", worker=worker_id):
+        env = build_env(args)
+        planner = build_planner(args)
+        executor = build_executor(env, args.executor, args)
+        encoder = build_encoder(args)
+        catalog_builder = CatalogBuilder(token_budget=args.catalog_tokens)
+        progress = build_progress(env, args)
+        speculator = build_speculator(args)
+        loop = BackgroundLoop() if args.stream else None
+
+    reported: Dict[str, Any] = {}
+
+    def run(ep):
+        nonlocal reported
+        try:
+            out = run_episode(env, planner, executor, encoder, catalog_builder, args, episode=ep, progress=progress,
+                              speculator=speculator, loop=loop)
+            counters = planner_counters(planner)
+            out["planner_counters"] = add_counters(add_counters({}, counters), reported, sign=-1)
+            reported = counters
+            return out
+        finally:
+            if args.trace_dir:
+                telemetry.get_tracer().flush_jsonl(_trace_file(args, worker_id))
+    return run
+
+
+def run_serial(args, planner) -> List[Dict[str, Any]]:
+    print("[info] Environment setup...")
+    with telemetry.span("setup"):
+        env = build_env(args)
+        executor = build_executor(env, args.executor, args)
+        encoder = build_encoder(args)
+        catalog_builder = CatalogBuilder(token_budget=args.catalog_tokens)
+        progress = build_progress(env, args)
+
+    speculator = build_speculator(args)
+    loop = None
+    if args.pipeline or args.stream:
+        set_async_concurrency(args.max_concurrency)
+        loop = BackgroundLoop()
+    prefetcher = PlanPrefetcher(planner, loop, args.episodes) if args.pipeline else None
+    try:
+        return [dict(run_episode(env, planner, executor, encoder, catalog_builder, args, episode=ep,
+                                 progress=progress, speculator=speculator, loop=loop, prefetcher=prefetcher),
+                     episode=ep)
+                for ep in trange(args.episodes, desc="episodes")]
+    finally:
+        if prefetcher is not None:
+            prefetcher.close()
+        encoder.close()
+        if speculator is not None:
+            speculator.close()
+        if loop is not None:
+            loop.run(aclose_async_clients())
+            loop.close()
+
+
+def run_parallel(args) -> List[Dict[str, Any]]:
+    pool = WorkerPool(_worker_setup, n_workers=args.workers, payload=args, episode_timeout_s=args.episode_timeout,
+                      setup_timeout_s=args.setup_timeout,
+                      fatal_errors=(PlanCacheMiss,))
+    results = []
+    with tqdm(total=args.episodes, desc="episodes") as bar:
+        for res in pool.run(list(range(args.episodes))):
+            if res.get("failed"):
+                print(f"[warn] episode {res['episode']} failed on worker {res['worker']}: {res['error']}")
+            results.append(res)
+            bar.update(1)
+    if pool.restarts:
+        print(f"[warn] {pool.restarts} worker restart(s)")
+    return sorted(results, key=lambda r: r["episode"])
+
+
+def plan_only(args):
+    if not args.contexts:
+        raise SystemExit("--plan-only requires --contexts")
+    contexts = load_contexts(args.contexts, args.activity, args.image_file)
+    set_async_concurrency(args.max_concurrency)
+    planner = build_planner(args)
+    with tqdm(total=len(contexts) * args.plan_repeats, desc="plans") as bar:
+        stats = run_plan_only(planner, contexts, args.plans_out, repeats=args.plan_repeats,
+                              on_result=lambda rec: bar.update(1), validate=args.validate_plans)
+    summary = {
+        "contexts": len(contexts),
+        "provider": args.provider,
+        "model": args.model,
+        "plans_out": args.plans_out,
+        **stats,
+    }
+    cache = getattr(planner, "cache", None)
+    if cache is not None:
+        summary["plan_cache"] = {"mode": cache.mode, "hits": cache.hits, "misses": cache.misses}
+    print(json.dumps(summary, indent=2))
+
+
+def check_args(args):
+    """Reject flag combinations run_eval does not support (shared with run_sweep and the benchmarks)."""
+    if args.stream and args.pipeline:
+        raise SystemExit("--stream and --pipeline cannot be combined")
+    if args.pipeline and args.workers > 1:
+        raise SystemExit("--pipeline runs episodes in this process and cannot be combined with --workers > 1")
+    if args.speculative and (args.stream or args.pipeline or args.plan_only):
+        raise SystemExit("--speculative cannot be combined with --stream, --pipeline or --plan-only")
+
+
+def main():
+    args = build_parser().parse_args()
+    if args.trace_dir:
+        start_trace(args)
+
+    check_args(args)
+    if args.plan_only:
+        plan_only(args)
+        if args.trace_dir:
+            finish_trace(args)
+        return
+
+    planner = None
+    if args.workers > 1:
+        results = run_parallel(args)
+        counters: Dict[str, Any] = {}
+        for r in results:
+            add_counters(counters, r.pop("planner_counters", {}))
+    else:
+        print("[info] Initializing planner...")
+        planner = build_planner(args)
+        try:
+            results = run_serial(args, planner)
+        finally:
+            if isinstance(planner, HedgedPlanner):
+                planner.close()
+        counters = planner_counters(planner)
+
+    # evaluate by BDDL fraction over every episode; episodes that raised count as 0 and are also listed
+    failed = [r["episode"] for r in results if r.get("failed")]
+    scored = [r for r in results if not r.get("failed")]
+    success = sum(1 for r in scored if r["bddl_fraction"] >= 0.999)
+    frac_sum = sum(r["bddl_fraction"] for r in scored)
+    timed = [r["episode_s"] for r in results if "episode_s" in r]
+    imaged = [r for r in results if "image_bytes" in r]
+
+    summary = {
         "activity": args.activity,
         "episodes": args.episodes,
         "success_rate": success / args.episodes,
         "avg_bddl_fraction": frac_sum / args.episodes,
+        "failed": len(failed),
         "provider": args.provider,
         "model": args.model,
         "executor": args.executor,
         "robot": args.robot,
-    }, indent=2))
+        "avg_episode_s": sum(timed) / len(timed) if timed else None,
+        "pipeline": args.pipeline,
+        "workers": args.workers,
+        "image": {
+            "codec": args.image_codec,
+            "avg_upload_bytes": sum(r["image_bytes"] for r in imaged) / len(imaged) if imaged else None,
+            "avg_encode_ms": 1e3 * sum(r["image_encode_s"] for r in imaged) / len(imaged) if imaged else None,
+        },
+    }
+    if "plan_cache" in counters:
+        summary["plan_cache"] = dict(mode=args.plan_cache_mode, **counters["plan_cache"])
+    if counters.get("usage"):
+        # cached_tokens: input tokens served from the provider's prompt cache
+        summary["usage"] = {kind: dict(row, avg_input_tokens=row["input_tokens"] / row["requests"])
+                            for kind, row in counters["usage"].items()}
+    if isinstance(planner, HedgedPlanner):
+        summary["hedging"] = planner.report()
+    elif "hedging" in counters:
+        # Summed over workers; latency quantiles and breaker states are per process
+        summary["hedging"] = counters["hedging"]
+    if args.pipeline:
+        summary["plans_prefetched"] = sum(1 for r in results if r.get("plan_prefetched"))
+    streamed = [r["first_step_s"] for r in results if r.get("first_step_s") is not None]
+    if streamed:
+        summary["avg_first_step_s"] = sum(streamed) / len(streamed)
+    tracked = [r for r in results if "progress" in r]
+    if tracked:
+        summary["progress"] = {
+            "early_stops": sum(1 for r in tracked if r.get("early_stop")),
+            "avg_steps_executed": sum(r["steps_executed"] for r in tracked) / len(tracked),
+        }
+    replanned = [r for r in results if "replans" in r]
+    if replanned:
+        n_replans = sum(r["replans"] for r in replanned)
+        summary["replan"] = {
+            "episodes_replanned": sum(1 for r in replanned if r["replans"]),
+            "replans": n_replans,
+            "avg_replan_s": sum(r["replan_s"] for r in replanned) / n_replans if n_replans else None,
+        }
+    speculated = [r for r in results if "spec_chosen" in r]
+    if speculated:
+        screen_s = sum(r["spec_screen_s"] for r in speculated)
+        avoided_s = sum(r["spec_avoided_s"] for r in speculated)
+        summary["speculative"] = {
+            "temperatures": speculated[0]["spec_temperatures"],
+            # Episodes where another candidate replaced the base-temperature plan
+            "episodes_switched": sum(1 for r in speculated if r["spec_chosen"] != 0),
+            "avg_plan_s": sum(r["spec_plan_s"] for r in speculated) / len(speculated),
+            "avg_screen_s": screen_s / len(speculated),
+            "avg_execute_s": sum(r["execute_s"] for r in speculated) / len(speculated),
+            "screen_s": screen_s,
+            "avoided_primitive_s_est": avoided_s,
+            "screen_to_avoided": screen_s / avoided_s if avoided_s else None,
+        }
+    validated = [r for r in results if "plan_repairs" in r]
+    if validated:
+        summary["validation"] = {
+            "plans_rejected": sum(1 for r in validated if r.get("plan_rejected")),
+            "repairs": sum(r["plan_repairs"] for r in validated),
+        }
+    if failed:
+        summary["failed_episodes"] = failed
+    print(json.dumps(summary, indent=2))
+
+    if args.trace_dir:
+        finish_trace(args)
+    if failed:
+        raise SystemExit(f"{len(failed)} episode(s) failed: {failed}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,190 @@
+import argparse
+import copy
+import json
+import os
+import time
+import traceback
+from typing import Any, Dict, Optional, Tuple
+
+from tqdm import tqdm
+
+import run_eval
+from og_vlm_planning.catalog import CatalogBuilder
+from og_vlm_planning.hedging import HedgedPlanner
+from og_vlm_planning.og_env import close_env, update_env_task
+from og_vlm_planning.plan_cache import PlanCacheMiss
+from og_vlm_planning.scene_compat import SceneCompatCache
+from og_vlm_planning.sweep import Job, ResultStore, expand_grid, schedule
+
+
+def build_parser() -> argparse.ArgumentParser:
+    ap = argparse.ArgumentParser(
+        description="Sweep activities x providers x models x executors. Other arguments are passed to run_eval "
+                    "(e.g. --catalog-tokens, --image-codec, --plan-cache, --trace-dir)."
+    )
+    ap.add_argument("--activities", type=str, nargs="+", required=True)
+    ap.add_argument("--providers", type=str, nargs="+", default=["openai"], choices=["openai", "gemini"])
+    ap.add_argument("--models", type=str, nargs="+", default=["gpt-5"],
+                    help="Model names; 'provider:model' pairs a model with one provider only")
+    ap.add_argument("--executors", type=str, nargs="+", default=["primitives"], choices=["primitives", "teleport"])
+    ap.add_argument("--robots", type=str, nargs="+", default=["R1Pro"])
+    ap.add_argument("--episodes", type=int, default=5, help="Episodes per job")
+    ap.add_argument("--store", type=str, default="sweep_results.jsonl",
+                    help="Per-episode JSONL result store; finished episodes in it are skipped on resume")
+    ap.add_argument("--dry-run", action="store_true", help="Print the schedule and exit")
+    return ap
+
+
+class EnvSlot:
+    """
+    The single live environment of the sweep. Jobs on the same scene, robot and activity reuse it as is;
+    a new activity on the same scene goes through `update_env_task` when possible; otherwise the scene is
+    released and rebuilt. A new build tries the activity's candidate scenes in order (make_env); `loaded`
+    records the scene each activity actually loaded in, and later builds of the activity go straight to it.
+    An activity that could not be loaded is not built again in this sweep (`failed` keeps the error).
+    """
+    def __init__(self, args):
+        self.args = args
+        self.env = None
+        self.key: Optional[Tuple[str, str, str]] = None
+        self.catalog_builder = CatalogBuilder(token_budget=args.catalog_tokens)
+        self.progress = None
+        self.executors: Dict[str, Any] = {}
+        self.loads = 0
+        self.loaded: Dict[str, str] = {}
+        self.failed: Dict[Tuple[str, str], str] = {}
+
+    @property
+    def scene_model(self) -> Optional[str]:
+        return None if self.key is None else self.key[0]
+
+    def acquire(self, job: Job, scene_model: str, job_args):
+        """Environment for `job`, scheduled on `scene_model`; raises RuntimeError if it cannot be loaded."""
+        if self.env is not None and self.key[1:] == (job.robot, job.activity):
+            return self.env
+        if (job.robot, job.activity) in self.failed:
+            raise RuntimeError(self.failed[(job.robot, job.activity)])
+        switched = False
+        if self.env is not None and self.key[:2] == (scene_model, job.robot) and not self.args.snapshot_dir:
+            switched = update_env_task(self.env, job.activity, self.args.instance_id)
+        if not switched:
+            self.release()
+            pinned = None if self.args.env_factory else self.loaded.get(job.activity)
+            try:
+                self.env = run_eval.build_env(job_args, scene_model=pinned)
+            except Exception as e:
+                self.failed[(job.robot, job.activity)] = f"{job.activity} could not be loaded: {e}"
+                raise
+            self.loads += 1
+            scene_model = getattr(self.env, "_og_vlm_scene_model", scene_model)
+        self.loaded[job.activity] = scene_model
+        self.key = (scene_model, job.robot, job.activity)
+        self.catalog_builder.invalidate()
+        self.executors = {}
+        self.progress = run_eval.build_progress(self.env, job_args)
+        return self.env
+
+    def executor(self, kind: str, job_args):
+        if kind not in self.executors:
+            self.executors[kind] = run_eval.build_executor(self.env, kind, job_args)
+        return self.executors[kind]
+
+    def release(self):
+        if self.env is not None and not self.args.env_factory:
+            close_env(self.env)
+        self.env = None
+        self.key = None
+
+
+def job_args(base, job: Job):
+    args = copy.copy(base)
+    args.activity, args.provider, args.model = job.activity, job.provider, job.model
+    args.executor, args.robot = job.executor, job.robot
+    if base.record_dir:
+        args.record_dir = os.path.join(base.record_dir, job.key.replace("|", "__").replace("/", "_"))
+    return args
+
+
+def main():
+    sweep_args, rest = build_parser().parse_known_args()
+    base = run_eval.build_parser().parse_args(rest)
+    run_eval.check_args(base)
+    if base.workers > 1 or base.pipeline or base.plan_only:
+        raise SystemExit("run_sweep runs episodes serially; --workers, --pipeline and --plan-only are not supported")
+    if base.trace_dir:
+        run_eval.start_trace(base)
+
+    jobs = expand_grid(sweep_args.activities, sweep_args.providers, sweep_args.models, sweep_args.executors,
+                       sweep_args.robots)
+    store = ResultStore(sweep_args.store)
+    scene_cache = SceneCompatCache(base.scene_cache) if base.scene_cache else None
+    plan = schedule(jobs, scene_cache, base.instance_id)
+    pending = {job: store.pending(job, sweep_args.episodes) for _, group in plan for job in group}
+    total = sum(len(v) for v in pending.values())
+    print(f"[info] {len(jobs)} job(s) on {len(plan)} scene(s); {total} episode(s) pending, "
+          f"{len(jobs) * sweep_args.episodes - total} already in {sweep_args.store}")
+    for scene_model, group in plan:
+        print(f"[info] scene {scene_model}: " + ", ".join(f"{j.key} ({len(pending[j])})" for j in group))
+    if sweep_args.dry_run:
+        return
+
+    slot = EnvSlot(base)
+    encoder = run_eval.build_encoder(base)
+    planners: Dict[Tuple[str, str], Any] = {}
+    speculator = run_eval.build_speculator(base)
+    t0 = time.perf_counter()
+    remaining = [job for _, group in plan for job in group if pending[job]]
+    try:
+        with tqdm(total=total, desc="episodes") as bar:
+            while remaining:
+                # Rescheduled after every load, with the scenes the activities actually loaded in
+                plan = schedule(remaining, scene_cache, base.instance_id, slot.loaded)
+                scene_model, group = next(((s, g) for s, g in plan if s == slot.scene_model), plan[0])
+                job = group[0]
+                remaining.remove(job)
+                args = job_args(base, job)
+                try:
+                    env = slot.acquire(job, scene_model, args)
+                except Exception as e:
+                    print(f"[warn] {job.key}: {e}; recording its {len(pending[job])} episode(s) as failed")
+                    error = traceback.format_exc()
+                    for ep in pending[job]:
+                        store.append(job, ep, {"failed": True, "error": error})
+                        bar.update(1)
+                    continue
+                if (job.provider, job.model) not in planners:
+                    planners[(job.provider, job.model)] = run_eval.build_planner(args)
+                planner = planners[(job.provider, job.model)]
+                executor = slot.executor(job.executor, args)
+                for ep in pending[job]:
+                    try:
+                        res = run_eval.run_episode(env, planner, executor, encoder, slot.catalog_builder, args,
+                                                   episode=ep, progress=slot.progress, speculator=speculator)
+                    except PlanCacheMiss:
+                        raise
+                    except Exception as e:
+                        print(f"[warn] {job.key} episode {ep} failed: {e}")
+                        res = {"failed": True, "error": traceback.format_exc()}
+                    store.append(job, ep, res, scene_model=slot.scene_model)
+                    bar.update(1)
+    finally:
+        encoder.close()
+        if speculator is not None:
+            speculator.close()
+        for planner in planners.values():
+            if isinstance(planner, HedgedPlanner):
+                planner.close()
+        slot.release()
+        if base.trace_dir:
+            run_eval.finish_trace(base)
+
+    print(json.dumps({
+        "store": sweep_args.store,
+        "scene_loads": slot.loads,
+        "wall_s": time.perf_counter() - t0,
+        "jobs": store.summary(),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+import numpy as np
+import pytest
+
+from benchmarks import stub_omnigibson
+from og_vlm_planning.executors import PrimitiveExecutor, StepBudget, TeleportExecutor
+from og_vlm_planning.og_env import bddl_success_fraction
+from og_vlm_planning.vlm_clients import Plan, PlanStep
+
+STEPS = 5
+
+
+@pytest.fixture
+def env(monkeypatch):
+    stub_omnigibson.install()
+    for key, value in {"n_objects": 50, "steps_per_primitive": STEPS, "step_time_s": 0.0}.items():
+        monkeypatch.setitem(stub_omnigibson.CONFIG, key, value)
+    return stub_omnigibson.make_stub_env()
+
+
+def place(op, obj, receptacle):
+    return PlanStep(op=op, object=obj, receptacle=receptacle)
+
+
+def top_center(obj, offset=0.05):
+    lo, hi = obj.aabb
+    return np.array([(lo[0] + hi[0]) / 2, (lo[1] + hi[1]) / 2, hi[2] + offset])
+
+
+def test_teleport_places_on_top_and_inside(env):
+    item0, rec0 = env.scene.goals[0]
+    item1, rec1 = env.scene.goals[1]
+    expected = [top_center(rec0), top_center(rec1)]
+    executor = TeleportExecutor(env)
+    sim = stub_omnigibson.install().sim
+    sim_steps = sim.steps
+    results = executor.execute_plan(Plan(plan=[
+        PlanStep(op="NAVIGATE_TO", target="item_0"), PlanStep(op="GRASP", target="item_0"),
+        place("PLACE_ON_TOP", "item_0", "receptacle_0"), place("PLACE_INSIDE", "item_1", "receptacle_1"),
+    ]))
+    assert [r.success for r in results] == [True] * 4
+    assert results[3].info == {"op": "PLACE_INSIDE", "object": "item_1", "receptacle": "receptacle_1"}
+    np.testing.assert_allclose(item0.get_position(), expected[0])
+    np.testing.assert_allclose(item1.get_position(), expected[1])
+    assert bddl_success_fraction(env) == 0.5
+    # All teleports are written before a single settle step
+    assert sim.steps == sim_steps + 1
+
+
+def test_teleport_onto_an_object_moved_earlier_in_the_plan(env):
+    item0, _ = env.scene.goals[0]
+    item1, rec1 = env.scene.goals[1]
+    executor = TeleportExecutor(env)
+    compiled = executor.compile(Plan(plan=[place("PLACE_ON_TOP", "item_1", "receptacle_1"),
+                                           place("PLACE_ON_TOP", "item_0", "item_1"),
+                                           place("PLACE_ON_TOP", "item_1", "receptacle_1")]))
+    # compile() does not touch the scene; item_1 is listed once with its final target
+    assert compiled.objects == [item1, item0]
+    executor.apply(compiled)
+    np.testing.assert_allclose(item1.get_position(), top_center(rec1))
+    # item_0's target uses item_1's AABB after its move
+    np.testing.assert_allclose(item0.get_position(), top_center(item1))
+
+
+def test_teleport_reports_unresolved_names_and_unknown_ops(env):
+    before = env.scene.dump_state()
+    results = TeleportExecutor(env).execute_plan(Plan(plan=[
+        place("PLACE_ON_TOP", "item_0", "fridge_1"), place("PLACE_INSIDE", "toaster_1", "receptacle_0"),
+        PlanStep(op="JUMP", target="item_0"),
+    ]))
+    assert [r.success for r in results[:2]] == [False, False]
+    assert results[0].info == {"reason": "object or receptacle not found"}
+    assert results[2] is None
+    np.testing.assert_array_equal(env.scene.dump_state(), before)
+
+
+def robot_at_item(env):
+    return np.allclose(env.robots[0].get_position(), env.scene.goals[0][0].get_position() + [0.5, 0.0, 0.0])
+
+
+def test_primitive_finishing_exactly_at_its_step_limit_succeeds(env):
+    executor = PrimitiveExecutor(env, primitive_budgets={"NAVIGATE_TO": StepBudget(max_steps=STEPS)})
+    res = executor.navigate_to("item_0")
+    assert res.success and res.info["steps"] == STEPS and env.steps == STEPS
+    assert robot_at_item(env)
+
+
+def test_primitive_over_its_step_limit_is_stopped(env):
+    executor = PrimitiveExecutor(env, primitive_budgets={"NAVIGATE_TO": StepBudget(max_steps=STEPS - 1)})
+    res = executor.navigate_to("item_0")
+    assert not res.success and res.info["reason"] == f"stopped: step limit ({STEPS - 1})"
+    assert res.info["steps"] == STEPS - 1 and env.steps == STEPS - 1
+    # The generator was closed before its last action, so the primitive's effect never happened
+    assert not robot_at_item(env)
+
+
+def test_episode_budget_spans_primitives(env):
+    executor = PrimitiveExecutor(env, episode_budget=StepBudget(max_steps=2 * STEPS + 2))
+    assert executor.navigate_to("item_0").success
+    assert executor.grasp("item_0").success
+    res = executor.grasp("item_0")
+    assert not res.success and res.info["reason"] == f"stopped: episode step limit ({2 * STEPS + 2})"
+    assert res.info["steps"] == 2 and executor.episode_steps == 2 * STEPS + 2
+
+
+def test_exhausted_episode_budget_stops_before_stepping(env):
+    executor = PrimitiveExecutor(env, episode_budget=StepBudget(max_steps=STEPS))
+    assert executor.navigate_to("item_0").success
+    res = executor.grasp("item_0")
+    assert not res.success and res.info["steps"] == 0 and env.steps == STEPS
+    executor.reset_episode()
+    assert executor.grasp("item_0").success
@@ -0,0 +1,159 @@
+import asyncio
+
+import pytest
+
+from og_vlm_planning import hedging
+from og_vlm_planning.hedging import CircuitBreaker, CircuitOpen, HedgedPlanner, parse_planner_spec
+from og_vlm_planning.vlm_clients import Plan, PlanStep, _cached_plan
+
+STEPS = [{"op": "GRASP", "target": "apple_1"}]
+
+
+class Clock:
+    def __init__(self):
+        self.t = 1000.0
+
+    def __call__(self):
+        return self.t
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    c = Clock()
+    monkeypatch.setattr(hedging.time, "monotonic", c)
+    return c
+
+
+class FakePlanner:
+    def __init__(self, name, latency_s=0.0, fail=False, cached=False):
+        self.provider, self.model, self.temperature = "fake", name, 0.1
+        self.latency_s = latency_s
+        self.fail = fail
+        self.cached = cached
+        self.calls = []
+
+    async def plan_async(self, activity, catalog, notes="", image_b64=None, image_mime="image/png", temperature=None):
+        self.calls.append("plan")
+        await asyncio.sleep(self.latency_s)
+        if self.fail:
+            raise RuntimeError(f"{self.model} is down")
+        if self.cached:
+            return _cached_plan({"plan": STEPS})
+        return Plan(plan=[PlanStep(**s) for s in STEPS], response_id=f"{self.model}-{len(self.calls)}")
+
+    def replan(self, activity, catalog, previous, delta, notes="", image_b64=None, image_mime="image/png"):
+        self.calls.append(("replan", previous.response_id))
+        if self.fail:
+            raise RuntimeError(f"{self.model} is down")
+        return Plan(plan=[PlanStep(**s) for s in STEPS])
+
+
+def hedged(*planners, **kwargs):
+    kwargs.setdefault("retries", 0)
+    kwargs.setdefault("backoff_base_s", 0.0)
+    return HedgedPlanner(planners, **kwargs)
+
+
+def test_breaker_opens_after_consecutive_failures(clock):
+    b = CircuitBreaker(max_failures=2, reset_s=10)
+    b.failure()
+    assert b.state == "closed" and b.allow()
+    b.failure()
+    assert b.state == "open" and not b.allow()
+    clock.t += 10
+    assert b.state == "half-open"
+
+
+def test_half_open_admits_a_single_trial(clock):
+    b = CircuitBreaker(max_failures=1, reset_s=5)
+    b.failure()
+    clock.t += 5
+    assert b.allow()
+    assert not b.allow()
+    b.success()
+    assert b.state == "closed" and b.allow() and b.allow()
+
+
+def test_failed_trial_reopens_and_released_trial_admits_another(clock):
+    b = CircuitBreaker(max_failures=1, reset_s=5)
+    b.failure()
+    clock.t += 5
+    assert b.allow()
+    b.release()
+    assert b.allow()
+    b.failure()
+    assert b.state == "open" and b.trips == 2
+
+
+def test_parse_planner_spec():
+    url = "http://localhost:8000/v1"
+    assert parse_planner_spec(f"openai:gpt-5@{url}") == ("openai", "gpt-5", url)
+    assert parse_planner_spec("gemini:gemini-2.5-pro") == ("gemini", "gemini-2.5-pro", None)
+    with pytest.raises(ValueError):
+        parse_planner_spec("gpt-5")
+
+
+def test_failover_to_the_next_planner():
+    down, up = FakePlanner("down", fail=True), FakePlanner("up")
+    hp = hedged(down, up)
+    try:
+        assert hp.plan("a", []).plan
+        assert hp.stats["failovers"] == 1 and hp.wins == [0, 1]
+    finally:
+        hp.close()
+
+
+def test_slow_primary_is_hedged():
+    slow, fast = FakePlanner("slow", latency_s=0.5), FakePlanner("fast")
+    hp = hedged(slow, fast, hedge_after_s=0.01)
+    try:
+        assert hp.plan("a", []).response_id.startswith("fast")
+        assert hp.stats["hedges"] == 1 and hp.stats["hedge_wins"] == 1
+    finally:
+        hp.close()
+
+
+def test_cache_hits_do_not_enter_the_latency_window():
+    hp = hedged(FakePlanner("cached", cached=True), hedge_min_samples=1)
+    try:
+        for _ in range(3):
+            hp.plan("a", [])
+        assert not hp.latencies
+        assert hp.hedge_delay_s() == hp.hedge_after_s
+    finally:
+        hp.close()
+
+
+def test_open_breakers_refuse_requests(clock):
+    hp = hedged(FakePlanner("down", fail=True), breaker_failures=1)
+    try:
+        with pytest.raises(RuntimeError):
+            hp.plan("a", [])
+        with pytest.raises(CircuitOpen):
+            hp.plan("a", [])
+    finally:
+        hp.close()
+
+
+def test_replan_continues_on_the_planner_that_answered():
+    first, second = FakePlanner("first", fail=True), FakePlanner("second")
+    hp = hedged(first, second)
+    try:
+        previous = hp.plan("a", [])
+        first.fail = False
+        hp.replan("a", [], previous, "delta")
+        assert previous.response_id.startswith("second")
+        assert second.calls == ["plan", ("replan", previous.response_id)]
+        assert first.calls == ["plan"]
+    finally:
+        hp.close()
+
+
+def test_replan_of_an_unknown_response_drops_the_response_id():
+    primary = FakePlanner("primary")
+    hp = hedged(primary)
+    try:
+        hp.replan("a", [], Plan(plan=[PlanStep(**STEPS[0])], response_id="elsewhere"), "delta")
+        assert primary.calls == [("replan", None)]
+    finally:
+        hp.close()
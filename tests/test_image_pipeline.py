@@ -0,0 +1,28 @@
+import base64
+
+import numpy as np
+import pytest
+
+from og_vlm_planning.image_pipeline import ImageEncoder
+
+pytest.importorskip("cv2")
+
+
+@pytest.mark.parametrize("codec", ["png", "jpeg", "webp"])
+def test_nbytes_is_the_size_of_the_uploaded_payload(codec):
+    rng = np.random.default_rng(0)
+    frame = {"rgb": rng.integers(0, 255, (64, 96, 3), dtype=np.uint8)}
+    encoder = ImageEncoder(codec=codec)
+    out = encoder.encode(frame)
+    assert out.nbytes == len(out.b64)
+    assert out.raw_bytes == len(base64.b64decode(out.b64)) < out.nbytes
+    assert encoder.stats["bytes"] == out.nbytes
+
+
+def test_identical_frame_is_reused():
+    frame = {"rgb": np.zeros((32, 32, 3), dtype=np.uint8)}
+    encoder = ImageEncoder(max_size=16)
+    first, second = encoder.encode(frame), encoder.encode(frame)
+    assert second.reused and second.b64 == first.b64
+    assert (second.nbytes, second.raw_bytes) == (first.nbytes, first.raw_bytes)
+    assert encoder.stats["encoded"] == 1 and encoder.stats["reused"] == 1
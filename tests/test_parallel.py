@@ -0,0 +1,36 @@
+import time
+
+import pytest
+
+from og_vlm_planning.parallel import WorkerError, WorkerPool
+
+
+def slow_setup(worker_id, setup_s):
+    time.sleep(setup_s)
+    return lambda ep: {"value": ep * 10}
+
+
+def failing_episodes(worker_id, payload):
+    def run(ep):
+        if ep == 1:
+            raise ValueError("bad episode")
+        return {"value": ep}
+    return run
+
+
+def test_episode_timeout_does_not_apply_to_setup():
+    pool = WorkerPool(slow_setup, n_workers=2, payload=1.0, episode_timeout_s=0.5)
+    results = sorted(pool.run([0, 1, 2]), key=lambda r: r["episode"])
+    assert [r["value"] for r in results] == [0, 10, 20] and pool.restarts == 0
+
+
+def test_setup_timeout_stops_the_run():
+    pool = WorkerPool(slow_setup, n_workers=1, payload=5.0, setup_timeout_s=0.5, max_episode_retries=0)
+    with pytest.raises(WorkerError, match="setup exceeded"):
+        list(pool.run([0]))
+
+
+def test_episode_errors_are_reported_as_failed_records():
+    results = sorted(WorkerPool(failing_episodes, n_workers=2).run([0, 1, 2]), key=lambda r: r["episode"])
+    assert [r.get("failed", False) for r in results] == [False, True, False]
+    assert "bad episode" in results[1]["error"]
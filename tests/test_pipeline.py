@@ -0,0 +1,56 @@
+import time
+
+import pytest
+
+from benchmarks import stub_omnigibson
+from benchmarks.stub_planner import StubPlanner
+from og_vlm_planning.async_utils import BackgroundLoop, PlanPrefetcher
+
+LATENCY_S = 0.3
+CTX = {"activity": "a", "catalog": ["item_1", "receptacle_1"], "notes": ""}
+
+
+@pytest.fixture
+def loop():
+    with BackgroundLoop() as loop:
+        yield loop
+
+
+def test_next_request_is_sent_before_this_plan_is_used(loop):
+    planner = StubPlanner(latency_s=LATENCY_S)
+    prefetcher = PlanPrefetcher(planner, loop, episodes=2)
+    first, prefetched = prefetcher.take(CTX)
+    assert not prefetched and planner.calls == 0
+    first.result()
+    time.sleep(0.05)
+    second, prefetched = prefetcher.take(dict(CTX))
+    assert prefetched and second.done() and prefetcher.hits == 1
+    # No request beyond the last episode
+    assert prefetcher._next is None
+
+
+def test_prefetch_for_a_different_context_is_not_used(loop):
+    prefetcher = PlanPrefetcher(StubPlanner(), loop, episodes=3)
+    first, _ = prefetcher.take(CTX)
+    first.result()
+    ahead = prefetcher._next[1]
+    ahead.result()
+    second, prefetched = prefetcher.take(dict(CTX, catalog=["item_2"]))
+    assert not prefetched and second is not ahead and prefetcher.hits == 0
+    second.result()
+    prefetcher._next[1].result()
+
+
+def test_pipelined_episodes_do_not_wait_for_their_plan(monkeypatch):
+    import run_eval
+    stub_omnigibson.install()
+    for key, value in {"n_objects": 50, "steps_per_primitive": 20, "step_time_s": 0.01}.items():
+        monkeypatch.setitem(stub_omnigibson.CONFIG, key, value)
+    args = run_eval.build_parser().parse_args([
+        "--activity", "stub", "--episodes", "3", "--pipeline",
+        "--env-factory", "benchmarks.stub_omnigibson:make_stub_env"])
+    results = run_eval.run_serial(args, StubPlanner(latency_s=LATENCY_S, plan_length=4))
+    # Episode 0 waits for its request; the later ones were planned while the previous episode executed
+    assert results[0]["plan_wait_s"] >= 0.8 * LATENCY_S and not results[0]["plan_prefetched"]
+    for r in results[1:]:
+        assert r["plan_prefetched"] and r["plan_wait_s"] < 0.5 * LATENCY_S
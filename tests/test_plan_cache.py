@@ -0,0 +1,80 @@
+import os
+import time
+
+import pytest
+
+from og_vlm_planning.plan_cache import PlanCache, PlanCacheMiss
+
+PLAN = {"plan": [{"op": "GRASP", "target": "apple_1"}]}
+
+
+def key(i):
+    return PlanCache.make_key("openai", "gpt-5", 0.1, "system", f"user {i}")
+
+
+def entry_bytes(cache):
+    return sum(st.st_size for _, st in cache._entries())
+
+
+def test_key_covers_every_field_without_aliasing():
+    base = PlanCache.make_key("openai", "gpt-5", 0.1, "system", "user", "aW1n")
+    assert base == PlanCache.make_key("openai", "gpt-5", 0.1, "system", "user", "aW1n")
+    assert base != PlanCache.make_key("openai", "gpt-5", 0.2, "system", "user", "aW1n")
+    assert base != PlanCache.make_key("openai", "gpt-5", 0.1, "system", "user", None)
+    assert (PlanCache.make_key("openai", "gpt-5", 0.1, "ab", "c")
+            != PlanCache.make_key("openai", "gpt-5", 0.1, "a", "bc"))
+
+
+def test_modes(tmp_path):
+    root = str(tmp_path)
+    cache = PlanCache(root)
+    assert cache.lookup(key(0)) is None
+    cache.put(key(0), PLAN)
+    assert cache.lookup(key(0)) == PLAN and (cache.hits, cache.misses) == (1, 1)
+    assert PlanCache(root, mode="record").lookup(key(0)) is None
+    replay = PlanCache(root, mode="replay")
+    assert replay.lookup(key(0)) == PLAN
+    with pytest.raises(PlanCacheMiss):
+        replay.lookup(key(1))
+    with pytest.raises(ValueError):
+        PlanCache(root, mode="write-only")
+
+
+def test_expired_entries_are_dropped_except_in_replay(tmp_path):
+    cache = PlanCache(str(tmp_path), max_age_s=60)
+    cache.put(key(0), PLAN)
+    path = cache._path(key(0))
+    old = time.time() - 120
+    os.utime(path, (old, old))
+    assert PlanCache(str(tmp_path), mode="replay", max_age_s=60).lookup(key(0)) == PLAN
+    PlanCache(str(tmp_path), max_age_s=60)
+    assert not os.path.exists(path)
+
+
+def test_size_limit_evicts_the_oldest_entries(tmp_path):
+    cache = PlanCache(str(tmp_path))
+    cache.put(key(0), PLAN)
+    size = entry_bytes(cache)
+    cache = PlanCache(str(tmp_path), max_bytes=10 * size)
+    for i in range(1, 30):
+        cache.put(key(i), PLAN)
+        os.utime(cache._path(key(i)), (1000 + i, 1000 + i))
+    assert entry_bytes(cache) <= 10 * size
+    assert cache.get(key(29)) == PLAN
+    assert cache.get(key(1)) is None
+
+
+def test_puts_do_not_rescan_the_directory(tmp_path, monkeypatch):
+    cache = PlanCache(str(tmp_path), max_bytes=10 ** 9, evict_every=50)
+    scans = []
+    monkeypatch.setattr(cache, "evict", lambda: scans.append(1))
+    for i in range(100):
+        cache.put(key(i), PLAN)
+    assert len(scans) == 2
+
+
+def test_overwrites_are_not_counted_twice(tmp_path):
+    cache = PlanCache(str(tmp_path), max_bytes=10 ** 9)
+    for _ in range(5):
+        cache.put(key(0), PLAN)
+    assert cache._total_bytes == entry_bytes(cache)
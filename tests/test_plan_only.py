@@ -0,0 +1,45 @@
+import asyncio
+import json
+
+import pytest
+
+from og_vlm_planning.plan_cache import PlanCacheMiss
+from og_vlm_planning.plan_only import run_plan_only
+from og_vlm_planning.vlm_clients import Plan, PlanStep
+
+
+class FakePlanner:
+    """Plans by activity name: "miss" raises PlanCacheMiss, "broken" a request error, "slow" takes a while."""
+    def __init__(self):
+        self.finished = []
+
+    async def plan_async(self, activity, catalog, notes="", image_b64=None, image_mime="image/png"):
+        await asyncio.sleep(1.0 if activity == "slow" else 0.01)
+        if activity == "miss":
+            raise PlanCacheMiss("key")
+        if activity == "broken":
+            raise RuntimeError("unparsable plan")
+        self.finished.append(activity)
+        return Plan(plan=[PlanStep(op="GRASP", target=catalog[0])])
+
+
+def contexts(*activities):
+    return [{"activity": a, "catalog": ["apple_1"], "notes": "", "image_b64": None, "image_mime": "image/png"}
+            for a in activities]
+
+
+def test_request_errors_are_recorded(tmp_path):
+    out = tmp_path / "plans.jsonl"
+    stats = run_plan_only(FakePlanner(), contexts("ok", "broken"), str(out))
+    assert (stats["requests"], stats["errors"]) == (2, 1)
+    recs = {r["activity"]: r for r in map(json.loads, out.read_text().splitlines())}
+    assert recs["broken"]["error"] == "RuntimeError: unparsable plan"
+    assert recs["ok"]["plan"] == [{"op": "GRASP", "target": "apple_1", "object": None, "receptacle": None}]
+
+
+def test_replay_cache_miss_stops_the_run(tmp_path):
+    planner = FakePlanner()
+    with pytest.raises(PlanCacheMiss):
+        run_plan_only(planner, contexts("ok", "miss", "slow"), str(tmp_path / "plans.jsonl"))
+    # Requests still in flight are cancelled
+    assert planner.finished == ["ok"]
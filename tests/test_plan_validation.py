@@ -0,0 +1,73 @@
+import pytest
+
+from og_vlm_planning.plan_validation import PlanRejected, PlanValidator, fragment_match
+from og_vlm_planning.vlm_clients import Plan, PlanStep
+
+CATALOG = ["apple_1", "apple_2", "countertop_1", "fridge_1", "kitchen_cabinet_3", "bowl_7"]
+
+
+def plan(*steps):
+    return Plan(plan=[PlanStep(**s) for s in steps])
+
+
+def test_exact_and_case_insensitive_names_are_kept():
+    v = PlanValidator(CATALOG)
+    out = v.validate(plan({"op": "navigate_to", "target": "Fridge_1"}))
+    assert out.plan == [PlanStep(op="NAVIGATE_TO", target="fridge_1")]
+
+
+@pytest.mark.parametrize("name", ["e", "o", "pp", "1"])
+def test_short_fragments_are_not_accepted(name):
+    v = PlanValidator(CATALOG)
+    with pytest.raises(PlanRejected):
+        v.validate(plan({"op": "NAVIGATE_TO", "target": name}))
+
+
+def test_inner_substring_is_not_accepted():
+    assert not fragment_match("ntert", "countertop_1")
+    v = PlanValidator(CATALOG, resolves=lambda name: False)
+    with pytest.raises(PlanRejected):
+        v.validate(plan({"op": "NAVIGATE_TO", "target": "xyzzy"}))
+
+
+def test_unique_token_match_expands_to_the_catalog_name():
+    v = PlanValidator(CATALOG)
+    out = v.validate(plan({"op": "OPEN", "target": "kitchen_cabinet"}))
+    assert out.plan[0].target == "kitchen_cabinet_3"
+
+
+def test_category_token_match_is_kept_for_the_executors():
+    v = PlanValidator(CATALOG)
+    out = v.validate(plan({"op": "GRASP", "target": "apple"}))
+    assert out.plan[0].target == "apple"
+
+
+def test_unique_prefix_expands_and_ambiguous_prefix_is_not_kept():
+    v = PlanValidator(CATALOG)
+    assert v.validate(plan({"op": "GRASP", "target": "bow"})).plan[0].target == "bowl_7"
+    assert v._match_name("app") != "app"
+
+
+def test_misspelling_is_repaired_by_fuzzy_match():
+    v = PlanValidator(CATALOG)
+    out = v.validate(plan({"op": "NAVIGATE_TO", "target": "countertp_1"}))
+    assert out.plan[0].target == "countertop_1"
+    assert v.repairs
+
+
+def test_resolver_confirms_names_outside_the_catalog():
+    v = PlanValidator(CATALOG, resolves=lambda name: name == "sink_2")
+    assert v.validate(plan({"op": "NAVIGATE_TO", "target": "sink_2"})).plan[0].target == "sink_2"
+
+
+def test_preconditions_are_inserted():
+    v = PlanValidator(CATALOG)
+    out = v.validate(plan({"op": "PLACE_INSIDE", "object": "bowl_7", "receptacle": "fridge_1"}))
+    assert [s.op for s in out.plan] == ["OPEN", "GRASP", "PLACE_INSIDE"]
+
+
+def test_unknown_op_and_missing_argument_are_rejected():
+    v = PlanValidator(CATALOG)
+    with pytest.raises(PlanRejected) as e:
+        v.validate(plan({"op": "JUGGLE", "target": "apple_1"}, {"op": "PLACE_ON_TOP", "object": "apple_1"}))
+    assert len(e.value.errors) == 2
@@ -0,0 +1,94 @@
+from types import SimpleNamespace
+
+from og_vlm_planning.progress import GoalProgress
+
+NAMES = ["apple_1", "apple_2", "fridge_1", "countertop_1", "bowl_7"]
+
+
+class Atom:
+    """BDDL atomic formula over object-scope instances; `holds` decides its truth value."""
+    def __init__(self, *inputs, holds=lambda: False):
+        self.input = list(inputs)
+        self.children = []
+        self.holds = holds
+        self.calls = 0
+
+    def evaluate(self):
+        self.calls += 1
+        return self.holds()
+
+
+class Conjunction:
+    def __init__(self, *children):
+        self.input = None
+        self.children = list(children)
+
+    def evaluate(self):
+        return all(c.evaluate() for c in self.children)
+
+
+def make_env(conditions):
+    objects = [SimpleNamespace(name=n) for n in NAMES]
+    scope = {f"{n.rsplit('_', 1)[0]}.n.01_{n.rsplit('_', 1)[1]}": SimpleNamespace(wrapped_obj=o)
+             for n, o in zip(NAMES, objects)}
+    scope["agent.n.01_1"] = SimpleNamespace(wrapped_obj=SimpleNamespace(name="robot0"))
+    task = SimpleNamespace(activity_goal_conditions=conditions, object_scope=scope)
+    return SimpleNamespace(task=task, scene=SimpleNamespace(objects=objects))
+
+
+def test_disabled_without_goal_conditions():
+    progress = GoalProgress(SimpleNamespace(task=SimpleNamespace(), scene=SimpleNamespace(objects=[])))
+    assert not progress.enabled
+    assert progress.update({"op": "GRASP", "target": "apple_1"}) == 0.0
+
+
+def test_dependencies_are_mapped_to_scene_objects():
+    apple = Atom("apple.n.01_1", "fridge.n.01_1")
+    agent = Atom("agent.n.01_1", "bowl.n.01_7")
+    unbound = Atom("?apple.n.01", "countertop.n.01_1")
+    progress = GoalProgress(make_env([apple, agent, Conjunction(unbound)]))
+    assert progress.deps[0] == {"apple_1", "fridge_1"}
+    assert progress.always == [1, 2]
+    assert progress.by_object == {"apple_1": [0], "fridge_1": [0]}
+
+
+def test_update_evaluates_only_touched_conditions():
+    state = {"apple_in_fridge": False}
+    apple = Atom("apple.n.01_1", "fridge.n.01_1", holds=lambda: state["apple_in_fridge"])
+    bowl = Atom("bowl.n.01_7", "countertop.n.01_1")
+    progress = GoalProgress(make_env([apple, bowl]))
+    assert progress.reset() == 0.0
+    assert (apple.calls, bowl.calls) == (1, 1)
+
+    progress.update({"op": "NAVIGATE_TO", "target": "fridge_1"})
+    assert (apple.calls, bowl.calls) == (2, 1)
+    state["apple_in_fridge"] = True
+    assert progress.update({"op": "PLACE_INSIDE", "object": "apple_1", "receptacle": "fridge_1"}) == 0.5
+    assert bowl.calls == 1
+    assert progress.curve == [0.0, 0.5]
+
+
+def test_held_objects_are_rechecked_until_released():
+    apple = Atom("apple.n.01_1", "countertop.n.01_1")
+    progress = GoalProgress(make_env([apple]))
+    progress.reset()
+    progress.update({"op": "GRASP", "target": "apple_1"})
+    assert progress.held == {"apple_1"}
+    progress.update({"op": "NAVIGATE_TO", "target": "bowl_7"})
+    assert apple.calls == 3
+    progress.update({"op": "RELEASE"})
+    progress.update({"op": "NAVIGATE_TO", "target": "bowl_7"})
+    assert progress.held == set() and apple.calls == 4
+
+
+def test_confirm_catches_side_effects_not_tracked_by_update():
+    state = {"bowl_on_counter": True}
+    bowl = Atom("bowl.n.01_7", "countertop.n.01_1", holds=lambda: state["bowl_on_counter"])
+    progress = GoalProgress(make_env([bowl]))
+    progress.reset()
+    assert progress.done
+    state["bowl_on_counter"] = False
+    progress.update({"op": "NAVIGATE_TO", "target": "fridge_1"})
+    assert progress.done
+    assert not progress.confirm(record=True)
+    assert progress.curve == [1.0, 0.0]
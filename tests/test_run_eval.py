@@ -0,0 +1,72 @@
+import json
+import re
+import sys
+
+import pytest
+
+from benchmarks import stub_omnigibson
+from benchmarks.stub_planner import serve_openai_stub
+
+
+def make_flaky_env(activity="stub", robot="r1pro", **kwargs):
+    """Stub environment whose second reset raises, so each worker fails its second episode."""
+    stub_omnigibson.install(n_objects=50, steps_per_primitive=1)
+    env = stub_omnigibson.make_stub_env(activity, robot)
+    reset = env.reset
+    calls = []
+
+    def flaky_reset(*args, **kw):
+        calls.append(1)
+        if len(calls) == 2:
+            raise RuntimeError("simulator crashed")
+        return reset(*args, **kw)
+    env.reset = flaky_reset
+    return env
+
+
+@pytest.fixture
+def run_main(monkeypatch, capsys):
+    monkeypatch.setenv("OPENAI_API_KEY", "x")
+    server, url = serve_openai_stub(latency_s=0.0, plan_length=4)
+
+    def run(*argv):
+        import run_eval
+        monkeypatch.setattr(sys, "argv", ["run_eval", "--activity", "stub", "--model", "stub", "--base-url", url,
+                                          *argv])
+        exit_code = 0
+        try:
+            run_eval.main()
+        except SystemExit as e:
+            exit_code = e.code
+        out = capsys.readouterr().out
+        # The summary is the only JSON block printed starting at column 0
+        return json.loads(re.search(r"^\{$.*?^\}$", out, re.M | re.S).group()), exit_code
+    try:
+        yield run
+    finally:
+        server.shutdown()
+
+
+def test_failed_episodes_count_as_zero(run_main):
+    summary, exit_code = run_main("--episodes", "4", "--workers", "2", "--exec", "teleport",
+                                  "--env-factory", "test_run_eval:make_flaky_env")
+    assert exit_code == "2 episode(s) failed: [2, 3]"
+    assert summary["failed"] == 2 and summary["failed_episodes"] == [2, 3]
+    clean, exit_code = run_main("--episodes", "4", "--workers", "2", "--exec", "teleport",
+                                "--env-factory", "benchmarks.stub_omnigibson:make_stub_env")
+    assert not exit_code and clean["failed"] == 0
+    # Stub episodes all score the same; the failed ones count as 0
+    assert summary["avg_bddl_fraction"] == pytest.approx(clean["avg_bddl_fraction"] / 2)
+
+
+@pytest.mark.parametrize("workers", ["1", "2"])
+def test_planner_counters_are_reported(run_main, tmp_path, workers):
+    summary, _ = run_main("--episodes", "4", "--workers", workers, "--exec", "teleport",
+                          "--env-factory", "benchmarks.stub_omnigibson:make_stub_env",
+                          "--plan-cache", str(tmp_path / "cache"))
+    # Every episode has the same context: the first request of each worker may miss, the rest hit the cache
+    cache = summary["plan_cache"]
+    assert cache["mode"] == "readthrough" and cache["hits"] + cache["misses"] == 4
+    assert 1 <= cache["misses"] <= int(workers)
+    assert summary["usage"]["plan"]["requests"] == cache["misses"]
+    assert summary["usage"]["plan"]["input_tokens"] > 0
@@ -0,0 +1,115 @@
+import json
+import multiprocessing
+
+import pytest
+
+from og_vlm_planning import scene_compat
+from og_vlm_planning.scene_compat import SceneCompatCache
+
+SCENES = ["house_single_floor", "house_double_floor_lower", "Rs_int"]
+
+
+def test_unknown_combinations_keep_their_order(tmp_path):
+    cache = SceneCompatCache(str(tmp_path / "scenes.json"))
+    assert cache.status("a", "Rs_int") is None
+    assert cache.order("a", SCENES) == SCENES
+
+
+def test_known_good_scenes_come_first(tmp_path):
+    cache = SceneCompatCache(str(tmp_path / "scenes.json"))
+    cache.record("a", "Rs_int", 0, True)
+    assert cache.order("a", SCENES) == ["Rs_int", "house_single_floor", "house_double_floor_lower"]
+    assert cache.order("a", SCENES, instance_id=1) == SCENES
+
+
+def test_a_scene_fails_only_after_repeated_failures(tmp_path):
+    cache = SceneCompatCache(str(tmp_path / "scenes.json"), max_failures=2)
+    cache.record("a", "Rs_int", 0, False, error="CUDA out of memory")
+    assert cache.status("a", "Rs_int") is None
+    cache.record("a", "Rs_int", 0, False, error="sampling failed")
+    assert cache.status("a", "Rs_int") is False
+    assert "Rs_int" not in cache.order("a", SCENES)
+    cache.record("a", "Rs_int", 0, True)
+    cache.record("a", "Rs_int", 0, False)
+    assert cache.status("a", "Rs_int") is None
+
+
+def test_failures_expire(tmp_path, monkeypatch):
+    cache = SceneCompatCache(str(tmp_path / "scenes.json"), max_failures=1, retry_after_s=60)
+    cache.record("a", "Rs_int", 0, False)
+    assert cache.status("a", "Rs_int") is False
+    now = scene_compat.time.time()
+    monkeypatch.setattr(scene_compat.time, "time", lambda: now + 61)
+    assert cache.status("a", "Rs_int") is None
+
+
+def test_entries_of_other_writers_are_kept(tmp_path):
+    path = str(tmp_path / "scenes.json")
+    first, second = SceneCompatCache(path), SceneCompatCache(path)
+    first.record("a", "Rs_int", 0, True)
+    second.record("b", "Rs_int", 0, True)
+    assert set(json.load(open(path))) == {"a|Rs_int|0", "b|Rs_int|0"}
+
+
+def _record_many(path, activity):
+    cache = SceneCompatCache(path)
+    for scene in SCENES * 5:
+        cache.record(activity, scene, 0, True)
+
+
+@pytest.mark.skipif(scene_compat.fcntl is None, reason="no file locks on this platform")
+def test_concurrent_writers_do_not_lose_entries(tmp_path):
+    path = str(tmp_path / "scenes.json")
+    ctx = multiprocessing.get_context("spawn")
+    procs = [ctx.Process(target=_record_many, args=(path, f"activity_{i}")) for i in range(4)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join(60)
+    assert all(p.exitcode == 0 for p in procs)
+    assert len(SceneCompatCache(path).entries) == 4 * len(SCENES)
+
+
+def test_make_env_records_outcomes_and_skips_failing_scenes(tmp_path, monkeypatch):
+    from benchmarks import stub_omnigibson
+    from og_vlm_planning import og_env
+    stub_omnigibson.install()
+    monkeypatch.setitem(stub_omnigibson.CONFIG, "failing_scenes", ("house_single_floor",))
+    path = str(tmp_path / "scenes.json")
+    assert og_env.make_env("making_tea", scene_cache=path)._og_vlm_scene_model == "house_double_floor_lower"
+    cache = SceneCompatCache(path)
+    assert cache.status("making_tea", "house_single_floor") is None
+    assert cache.order("making_tea", SCENES)[0] == "house_double_floor_lower"
+
+    with pytest.raises(RuntimeError, match="No candidate scene"):
+        og_env.make_env("making_tea", scene_model="house_single_floor", scene_cache=path)
+    with pytest.raises(RuntimeError, match="recorded as failing"):
+        og_env.make_env("making_tea", scene_model="house_single_floor", scene_cache=path)
+    assert SceneCompatCache(path).entries["making_tea|house_single_floor|0"]["failures"] == 2
+
+
+def test_a_decisive_failure_marks_the_scene_failing_at_once(tmp_path):
+    cache = SceneCompatCache(str(tmp_path / "scenes.json"), max_failures=2)
+    cache.record("a", "Rs_int", 0, False, error="sampling failed", decisive=True)
+    assert cache.status("a", "Rs_int") is False
+    cache.record("a", "Rs_int", 0, True)
+    assert cache.status("a", "Rs_int") is True
+
+
+def test_scene_failing_in_preflight_is_skipped_on_the_next_lookup(tmp_path, monkeypatch):
+    from benchmarks import stub_omnigibson
+    from og_vlm_planning import og_env
+    stub_omnigibson.install()
+    monkeypatch.setitem(stub_omnigibson.CONFIG, "failing_scenes", ("house_single_floor",))
+    path = str(tmp_path / "scenes.json")
+    cache = SceneCompatCache(path)
+    assert og_env.get_compatible_scene_model("cooking", scene_cache=cache) == "house_single_floor"
+    assert og_env.preflight_scenes("cooking", cache) == {"house_single_floor": False, "Rs_int": True,
+                                                         "house_double_floor_lower": True}
+    assert og_env.get_compatible_scene_model("cooking", scene_cache=cache) == "Rs_int"
+    # make_env does not load the failing scene again
+    assert og_env.make_env("cooking", scene_cache=path)._og_vlm_scene_model == "Rs_int"
+    assert SceneCompatCache(path).entries["cooking|house_single_floor|0"]["failures"] == 1
+    for scene in ("Rs_int", "house_double_floor_lower"):
+        cache.record("cooking", scene, 0, False, decisive=True)
+    assert og_env.get_compatible_scene_model("cooking", scene_cache=cache) is None
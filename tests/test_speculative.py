@@ -0,0 +1,63 @@
+import asyncio
+import json
+
+import pytest
+
+from og_vlm_planning.hedging import CircuitOpen
+from og_vlm_planning.plan_cache import PlanCacheMiss
+from og_vlm_planning.speculative import Speculator, candidate_temperatures, is_transient
+from og_vlm_planning.vlm_clients import Plan, PlanStep
+
+
+class StatusError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+
+
+class FailingPlanner:
+    """Answers every temperature except `fail_at`, which raises `error`."""
+    def __init__(self, error, fail_at=1.0):
+        self.error = error
+        self.fail_at = fail_at
+
+    async def plan_async(self, activity, catalog, notes="", image_b64=None, image_mime="image/png", temperature=None):
+        await asyncio.sleep(0)
+        if temperature == self.fail_at:
+            raise self.error
+        return Plan(plan=[PlanStep(op="RELEASE")])
+
+
+def test_candidate_temperatures():
+    assert candidate_temperatures(1, 0.1) == [0.1]
+    assert candidate_temperatures(3, 0.2) == [0.2, 0.6, 1.0]
+
+
+@pytest.mark.parametrize("error", [ConnectionError("reset"), asyncio.TimeoutError(), CircuitOpen("all open"),
+                                   StatusError(429), StatusError(503), json.JSONDecodeError("bad", "{", 0)])
+def test_transient_errors(error):
+    assert is_transient(error)
+
+
+@pytest.mark.parametrize("error", [PlanCacheMiss("key"), StatusError(401), StatusError(400), TypeError("bug")])
+def test_errors_that_fail_every_candidate(error):
+    assert not is_transient(error)
+
+
+@pytest.mark.parametrize("error", [PlanCacheMiss("key"), StatusError(401)])
+def test_choose_raises_non_transient_candidate_errors(error):
+    spec = Speculator([0.1, 1.0])
+    try:
+        with pytest.raises(type(error)):
+            spec.choose(None, FailingPlanner(error), {"activity": "a", "catalog": []})
+    finally:
+        spec.close()
+
+
+def test_choose_raises_when_every_candidate_fails_transiently():
+    spec = Speculator([1.0])
+    try:
+        with pytest.raises(ConnectionError):
+            spec.choose(None, FailingPlanner(ConnectionError("reset")), {"activity": "a", "catalog": []})
+    finally:
+        spec.close()
@@ -0,0 +1,117 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+from og_vlm_planning.plan_validation import PlanValidator
+from og_vlm_planning.streaming import PlanStreamParser, StepStream
+from og_vlm_planning.vlm_clients import PlanStep
+
+STEPS = [{"op": "NAVIGATE_TO", "target": "fridge_1"}, {"op": "GRASP", "target": "apple_1"},
+         {"op": "PLACE_INSIDE", "object": "apple_1", "receptacle": "fridge_1"}]
+
+
+def feed_all(parser, text, size):
+    out = []
+    for i in range(0, len(text), size):
+        out.extend(parser.feed(text[i:i + size]))
+    return out
+
+
+@pytest.mark.parametrize("size", [1, 3, 7, 1000])
+def test_steps_are_returned_across_chunk_boundaries(size):
+    text = json.dumps({"plan": STEPS})
+    parser = PlanStreamParser()
+    assert feed_all(parser, text, size) == STEPS
+    assert parser.n_steps == 3 and parser.finish() == {"plan": STEPS}
+
+
+def test_each_step_is_returned_when_its_closing_brace_arrives():
+    parser = PlanStreamParser()
+    assert parser.feed('{"plan": [{"op": "GRASP", "target": "apple_1"') == []
+    assert parser.feed('}, {"op": "RELEASE"') == [{"op": "GRASP", "target": "apple_1"}]
+    assert parser.feed("}]}") == [{"op": "RELEASE"}]
+
+
+def test_braces_and_escapes_inside_strings():
+    steps = [{"op": "GRASP", "target": 'odd}{name"]', "note": "back\\slash \\\" ["}, {"op": "RELEASE"}]
+    text = json.dumps({"reasoning": "a } before the plan", "plan": steps})
+    assert feed_all(PlanStreamParser(), text, 2) == steps
+
+
+def test_nested_objects_are_part_of_their_step():
+    steps = [{"op": "GRASP", "target": "apple_1", "meta": {"pose": [0, 1]}}]
+    assert feed_all(PlanStreamParser(), json.dumps({"plan": steps}), 4) == steps
+
+
+def test_finish_raises_on_malformed_json():
+    parser = PlanStreamParser()
+    assert parser.feed('{"plan": [{"op": "RELEASE"}') == [{"op": "RELEASE"}]
+    with pytest.raises(json.JSONDecodeError):
+        parser.finish()
+
+
+class FakeStreamPlanner:
+    def __init__(self, delay_s=0.0, fail_after=None):
+        self.delay_s = delay_s
+        self.fail_after = fail_after
+        self.sent = 0
+        self.closed = False
+
+    async def plan_stream_async(self, activity, catalog, notes="", image_b64=None, image_mime="image/png"):
+        try:
+            for i, s in enumerate(STEPS * 10):
+                if i == self.fail_after:
+                    raise RuntimeError("stream broke")
+                await asyncio.sleep(self.delay_s)
+                self.sent += 1
+                yield PlanStep(**s)
+        finally:
+            self.closed = True
+
+
+CTX = {"activity": "a", "catalog": ["apple_1", "fridge_1"]}
+
+
+def test_steps_are_handed_over_in_order():
+    planner = FakeStreamPlanner()
+    stream = StepStream(planner, CTX)
+    try:
+        assert [s.op for s in stream][:3] == ["NAVIGATE_TO", "GRASP", "PLACE_INSIDE"]
+        assert len(stream.steps) == 30 and stream.first_step_s is not None and stream.plan_s is not None
+    finally:
+        stream.close()
+
+
+def test_planner_errors_are_raised_in_the_caller():
+    stream = StepStream(FakeStreamPlanner(fail_after=2), CTX)
+    try:
+        with pytest.raises(RuntimeError, match="stream broke"):
+            list(stream)
+        assert len(stream.steps) == 2
+    finally:
+        stream.close()
+
+
+def test_close_cancels_the_request():
+    planner = FakeStreamPlanner(delay_s=0.05)
+    stream = StepStream(planner, CTX)
+    next(iter(stream))
+    t0 = time.perf_counter()
+    stream.close()
+    assert time.perf_counter() - t0 < 1.0
+    assert planner.closed
+    sent = planner.sent
+    time.sleep(0.2)
+    assert planner.sent == sent < 30
+
+
+def test_validator_repairs_streamed_steps():
+    planner = FakeStreamPlanner()
+    stream = StepStream(planner, CTX, validator=PlanValidator(CTX["catalog"]))
+    try:
+        # PLACE_INSIDE a fridge gets an OPEN first
+        assert [s.op for s in stream][:4] == ["NAVIGATE_TO", "GRASP", "OPEN", "PLACE_INSIDE"]
+    finally:
+        stream.close()
@@ -0,0 +1,65 @@
+import sys
+
+import pytest
+
+from benchmarks import stub_omnigibson
+from benchmarks.stub_planner import serve_openai_stub
+from og_vlm_planning.sweep import Job, ResultStore, schedule
+
+
+@pytest.fixture
+def sweep(tmp_path, monkeypatch):
+    stub_omnigibson.install()
+    for key, value in {"n_objects": 50, "steps_per_primitive": 1, "failing_scenes": (),
+                       "failing_activities": ()}.items():
+        monkeypatch.setitem(stub_omnigibson.CONFIG, key, value)
+    monkeypatch.setenv("OPENAI_API_KEY", "x")
+    server, url = serve_openai_stub(latency_s=0.0, plan_length=4)
+    store = str(tmp_path / "store.jsonl")
+
+    def run(*activities, models=("stub",)):
+        import run_sweep
+        monkeypatch.setattr(sys, "argv", ["run_sweep", "--activities", *activities, "--models", *models,
+                                          "--executors", "teleport", "--episodes", "2", "--store", store,
+                                          "--base-url", url])
+        run_sweep.main()
+        return ResultStore(store)
+    try:
+        yield run
+    finally:
+        server.shutdown()
+
+
+def test_schedule_groups_by_loaded_scene():
+    jobs = [Job("cooking", "openai", "m", "teleport", "R1Pro"), Job("turning_on_radio", "openai", "m", "teleport",
+                                                                    "R1Pro")]
+    assert [s for s, _ in schedule(jobs)] == ["house_single_floor", "house_double_floor_lower"]
+    plan = schedule(jobs, loaded={"cooking": "house_double_floor_lower"})
+    assert plan == [("house_double_floor_lower", jobs)]
+
+
+def test_failing_scene_falls_back_to_the_next_candidate(sweep):
+    stub_omnigibson.CONFIG["failing_scenes"] = ("house_single_floor",)
+    store = sweep("cooking", "turning_on_radio")
+    scenes = {r["activity"]: r["scene_model"] for r in store.records}
+    assert not any(r.get("failed") for r in store.records) and len(store.records) == 4
+    assert scenes == {"cooking": "Rs_int", "turning_on_radio": "house_double_floor_lower"}
+
+
+def test_activity_that_cannot_load_is_recorded_and_the_sweep_continues(sweep, monkeypatch):
+    import run_eval
+    builds = []
+    build_env = run_eval.build_env
+    monkeypatch.setattr(run_eval, "build_env", lambda args, **kw: builds.append(args.activity) or build_env(args, **kw))
+    stub_omnigibson.CONFIG["failing_activities"] = ("cooking",)
+    store = sweep("cooking", "turning_on_radio", models=("stub", "openai:stub2"))
+    failed = [r for r in store.records if r.get("failed")]
+    assert {r["activity"] for r in failed} == {"cooking"} and len(failed) == 4
+    assert "No candidate scene could load cooking" in failed[0]["error"]
+    assert sum(r["activity"] == "turning_on_radio" and not r.get("failed") for r in store.records) == 4
+    # The second cooking job does not try to load the activity again
+    assert builds.count("cooking") == 1
+    # A resumed sweep retries only the failed jobs
+    stub_omnigibson.CONFIG["failing_activities"] = ()
+    store = sweep("cooking", "turning_on_radio", models=("stub", "openai:stub2"))
+    assert len(store.records) == 12 and all(r["failed"] == 0 for r in store.summary())
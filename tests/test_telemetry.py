@@ -0,0 +1,56 @@
+import json
+
+from og_vlm_planning import telemetry
+from og_vlm_planning.telemetry import Tracer
+
+
+def traced(pid, wall_origin, ts_us):
+    t = Tracer(enabled=True)
+    t.pid = pid
+    t._wall_origin = wall_origin
+    t._records.append({"type": "span", "name": "step", "ts_us": ts_us, "dur_us": 5.0, "pid": pid, "tid": 1,
+                       "attrs": {}})
+    return t
+
+
+def test_flush_writes_one_meta_line_per_file(tmp_path):
+    t = Tracer(enabled=True)
+    path = str(tmp_path / "trace.jsonl")
+    for _ in range(3):
+        with t.span("x"):
+            pass
+        t.flush_jsonl(path)
+    lines = [json.loads(line) for line in open(path)]
+    assert [r["type"] for r in lines] == ["meta", "span", "span", "span"]
+    assert lines[0]["pid"] == t.pid
+
+
+def test_flush_anchors_a_recreated_file(tmp_path):
+    t = Tracer(enabled=True)
+    path = tmp_path / "trace.jsonl"
+    t.flush_jsonl(str(path))
+    path.unlink()
+    t.flush_jsonl(str(path))
+    assert json.loads(path.read_text().splitlines()[0])["type"] == "meta"
+
+
+def test_processes_are_merged_on_the_wall_clock(tmp_path):
+    # Process 2 started 1.5 s after process 1; both record a span 1 ms after their start
+    a, b = traced(1, 100.0, 1000.0), traced(2, 101.5, 1000.0)
+    a.flush_jsonl(str(tmp_path / "trace.jsonl"))
+    b.flush_jsonl(str(tmp_path / "trace.w0.jsonl"))
+    records = telemetry.load_jsonl(str(tmp_path / "trace.jsonl")) + telemetry.load_jsonl(
+        str(tmp_path / "trace.w0.jsonl"))
+    assert all(r["type"] != "meta" for r in records)
+    out = tmp_path / "trace.chrome.json"
+    telemetry.write_chrome_trace(records, str(out))
+    ts = {e["pid"]: e["ts"] for e in json.loads(out.read_text())["traceEvents"]}
+    assert ts[1] == 0 and abs(ts[2] - 1.5e6) < 1
+
+
+def test_summary_ignores_ids_and_bools():
+    t = Tracer(enabled=True)
+    with t.span("vlm.request", episode=3, input_tokens=10, cached=True):
+        pass
+    totals = telemetry.summarize(t.records)["totals"]["vlm.request"]
+    assert totals == {"count": 1, "input_tokens": 10}